@@ -0,0 +1,260 @@
+"""Throughput and latency benchmarks for plogging, stdlib logging and QueueHandler + QueueListener.
+
+Every case runs in a fresh interpreter, because plogging keeps global logging processes. The results are written as
+JSON, so they can be compared between commits.
+
+Example:
+
+    python benchmarks/bench.py --quick --output bench.json
+    python benchmarks/bench.py --backend plogging --scenario disabled --records 200000
+
+Measured for every case:
+    * Producer call latency (p50, p99, p999 and mean in nanoseconds)
+    * End-to-end records per second (first call until every record was written)
+    * Bytes per second written to the log file
+    * Parent and child CPU seconds and peak RSS (POSIX only)
+"""
+import os
+import sys
+import json
+import time
+import queue
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+from array import array
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+# ========== Cases ==========
+BACKENDS = {
+    'logging': {},
+    'queuehandler': {},
+    'plogging': {},
+    'plogging-nobatch': {'batch': {'max_count': 1}},
+    'plogging-ring': {'transport': 'ring'},
+    'plogging-buffered': {'buffered': True},
+    'plogging-ring-buffered': {'transport': 'ring', 'buffered': True},
+    }
+
+SCENARIOS = {
+    'baseline': {},
+    'small-msg': {'msg_size': 16},
+    'large-msg': {'msg_size': 4096},
+    'int-args': {'args': 'int'},
+    'str-args': {'args': 'str'},
+    'dict-args': {'args': 'dict'},
+    'many-loggers': {'loggers': 64},
+    'disabled': {'disabled': True},
+    'slow-sink': {'slow_sink': 0.00005, 'records': 2000},
+    }
+
+DEFAULT_SCENARIO = {'records': 50000, 'msg_size': 64, 'args': 'none', 'loggers': 1, 'disabled': False,
+                    'slow_sink': 0}
+
+
+class SlowFormatter(object):
+    """Formatter that sleeps to simulate a slow sink. It is pickled to the logging process."""
+    def __init__(self, delay):
+        self.delay = delay
+
+    def format(self, record):
+        time.sleep(self.delay)
+        return record.getMessage()
+
+
+def make_args(kind, i):
+    if kind == 'int':
+        return (i, i * 2)
+    elif kind == 'str':
+        return ('value-%d' % i, 'abc')
+    elif kind == 'dict':
+        return ({'index': i, 'name': 'abc', 'values': [1, 2, 3]},)
+    return ()
+
+
+def make_msg(kind, size):
+    fmt = {'none': '', 'int': ' %d %d', 'str': ' %s %s', 'dict': ' %s'}[kind]
+    return 'x' * size + fmt
+
+
+def percentile(ordered, pct):
+    if not ordered:
+        return 0
+    return ordered[min(int(len(ordered) * pct / 100.0), len(ordered) - 1)]
+
+
+def usage(who):
+    if resource is None:
+        return None, None
+    ru = resource.getrusage(who)
+    scale = 1024 if sys.platform != 'darwin' else 1  # ru_maxrss is KiB on Linux and bytes on macOS
+    return ru.ru_utime + ru.ru_stime, ru.ru_maxrss * scale
+
+
+# ========== Run one case ==========
+def setup_backend(backend, options, filename, scenario):
+    """Configure the backend and return (loggers, finish function)."""
+    level = 'WARNING' if scenario['disabled'] else 'DEBUG'
+    names = ['bench.logger%d' % i for i in range(scenario['loggers'])]
+
+    if backend == 'logging' or backend == 'queuehandler':
+        import logging
+        import logging.handlers
+
+        handler = logging.FileHandler(filename)
+        if scenario['slow_sink']:
+            handler.setFormatter(SlowFormatter(scenario['slow_sink']))
+        root = logging.getLogger()
+        root.setLevel(level)
+        if backend == 'logging':
+            root.addHandler(handler)
+            return [logging.getLogger(name) for name in names], handler.close
+
+        q = queue.SimpleQueue()
+        root.addHandler(logging.handlers.QueueHandler(q))
+        listener = logging.handlers.QueueListener(q, handler)
+        listener.start()
+
+        def finish():
+            listener.stop()
+            handler.close()
+        return [logging.getLogger(name) for name in names], finish
+
+    import plogging
+    if 'transport' in options:
+        plogging.setTransport(options['transport'])
+    if 'batch' in options:
+        plogging.setBatchOptions(**options['batch'])
+
+    handler = plogging.FileHandler(filename)
+    if options.get('buffered'):
+        handler.setBuffering()
+    if scenario['slow_sink']:
+        handler.setFormatter(SlowFormatter(scenario['slow_sink']))
+    root = plogging.getLogger()
+    root.setLevel(level)
+    root.addHandler(handler)
+    root.start_process()
+    return [plogging.getLogger(name) for name in names], plogging.Logger.manager.stopProcesses
+
+
+def run_case(backend, scenario):
+    options = BACKENDS[backend]
+    tmpdir = tempfile.mkdtemp(prefix='plogging-bench-')
+    filename = os.path.join(tmpdir, 'bench.log')
+    try:
+        loggers, finish = setup_backend(backend, options, filename, scenario)
+        count = scenario['records']
+        msg = make_msg(scenario['args'], scenario['msg_size'])
+        all_args = [make_args(scenario['args'], i) for i in range(count)]
+        nloggers = len(loggers)
+        latencies = array('q', bytes(8 * count))
+        clock = time.perf_counter_ns
+
+        cpu_start, _ = usage(resource.RUSAGE_SELF) if resource else (None, None)
+        start = clock()
+        for i in range(count):
+            logger = loggers[i % nloggers]
+            args = all_args[i]
+            t0 = clock()
+            logger.info(msg, *args)
+            latencies[i] = clock() - t0
+        produced = clock()
+        finish()
+        end = clock()
+
+        ordered = sorted(latencies)
+        seconds = (end - start) / 1e9
+        size = os.path.getsize(filename) if os.path.exists(filename) else 0
+        result = {
+            'backend': backend,
+            'scenario': scenario,
+            'records': count,
+            'latency_ns': {'p50': percentile(ordered, 50), 'p99': percentile(ordered, 99),
+                           'p999': percentile(ordered, 99.9), 'mean': sum(ordered) / max(count, 1)},
+            'produce_seconds': (produced - start) / 1e9,
+            'total_seconds': seconds,
+            'records_per_second': count / seconds if seconds else 0,
+            'bytes_written': size,
+            'bytes_per_second': size / seconds if seconds else 0,
+            }
+
+        if resource is not None:
+            parent_cpu, parent_rss = usage(resource.RUSAGE_SELF)
+            child_cpu, child_rss = usage(resource.RUSAGE_CHILDREN)  # Only the logging processes that exited
+            result.update({'parent_cpu_seconds': parent_cpu - cpu_start, 'parent_max_rss': parent_rss,
+                           'child_cpu_seconds': child_cpu, 'child_max_rss': child_rss})
+        return result
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+# ========== Runner ==========
+def machine_info():
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(__file__),
+                                         stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {'python': sys.version, 'implementation': platform.python_implementation(),
+            'platform': platform.platform(), 'cpu_count': os.cpu_count(), 'commit': commit,
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+
+def run_in_subprocess(backend, scenario, timeout=600):
+    cmd = [sys.executable, os.path.abspath(__file__), '--run-one', json.dumps({'backend': backend,
+                                                                              'scenario': scenario})]
+    out = subprocess.check_output(cmd, timeout=timeout)
+    return json.loads(out.decode().strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--backend', action='append', choices=sorted(BACKENDS), help='Backends to run (default all)')
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                        help='Scenarios to run (default all)')
+    parser.add_argument('--records', type=int, default=None, help='Override the number of records')
+    parser.add_argument('--quick', action='store_true', help='Run 10 times fewer records')
+    parser.add_argument('--output', default=None, help='JSON file to write the results to (default stdout)')
+    parser.add_argument('--run-one', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run_one:
+        case = json.loads(args.run_one)
+        print(json.dumps(run_case(case['backend'], case['scenario'])))
+        return
+
+    results = []
+    for scenario_name in (args.scenario or list(SCENARIOS)):
+        for backend in (args.backend or list(BACKENDS)):
+            scenario = dict(DEFAULT_SCENARIO, **SCENARIOS[scenario_name])
+            if args.records:
+                scenario['records'] = args.records
+            if args.quick:
+                scenario['records'] = max(scenario['records'] // 10, 1)
+            result = run_in_subprocess(backend, scenario)
+            result['name'] = scenario_name
+            results.append(result)
+            print('%-12s %-24s %10.0f rec/s  p50 %7d ns  p99 %8d ns  p999 %9d ns' % (
+                scenario_name, backend, result['records_per_second'], result['latency_ns']['p50'],
+                result['latency_ns']['p99'], result['latency_ns']['p999']), file=sys.stderr)
+
+    report = json.dumps({'machine': machine_info(), 'results': results}, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report)
+    else:
+        print(report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""Microbenchmark of the per-call overhead of plogging.Logger in the application process.
+
+The LogProcess is replaced with a stub that discards every command, so only the cost of the logging call itself
+(level check, record capture and dispatch) is measured. The "baseline" cases use a logger with the methods of earlier
+versions (see make_baseline_logger) to compare with.
+
+Example:
+
+    python benchmarks/bench_calls.py
+    python benchmarks/bench_calls.py --number 500000 --json
+"""
+import os
+import sys
+import json
+import timeit
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import plogging
+from plogging.logger import LOGGER_COMMANDS
+
+
+class NullProcess(object):
+    """LogProcess stand in that discards every command."""
+    def put(self, command):
+        pass
+
+    def backlog(self):
+        return 0
+
+
+def _baseline_info(self, msg, *args, **kwargs):
+    if self.isEnabledFor(plogging.INFO):
+        self._log(plogging.INFO, msg, args, **kwargs)
+
+
+def _baseline_log(self, level, msg, *args, **kwargs):
+    if not isinstance(level, int):
+        raise TypeError("level must be an integer")
+    if self.isEnabledFor(level):
+        self._log(level, msg, args, **kwargs)
+
+
+def _baseline_getattr(self, item):
+    def func(*args, **kwargs):
+        self._add_command(item, *args, **kwargs)
+    return func
+
+
+def make_baseline_logger(name):
+    """Return a logger with the methods of earlier versions of plogging.Logger.
+
+    info and log pass a kwargs dict to _log and the commands (addFilter, ...) are not on the class, so every command
+    call creates a closure in __getattr__.
+    """
+    namespace = {key: value for key, value in vars(plogging.Logger).items()
+                 if key not in LOGGER_COMMANDS and key not in ('__dict__', '__weakref__')}
+    namespace.update(info=_baseline_info, log=_baseline_log, __getattr__=_baseline_getattr)
+    logger = type('BaselineLogger', (object,), namespace)(name)
+    logger.parent = plogging.root
+    return logger
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--number', type=int, default=200000, help='Number of calls per measurement')
+    parser.add_argument('--repeat', type=int, default=5, help='Number of measurements (the best is reported)')
+    parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+    args = parser.parse_args(argv)
+
+    logger = plogging.getLogger('bench_calls')
+    logger.setLevel(plogging.INFO)
+    baseline = make_baseline_logger('bench_calls_baseline')
+    baseline.setLevel(plogging.INFO)
+    null = NullProcess()
+    plogging.Logger.manager.getProcess = lambda name: null
+    plogging.Logger.manager._clear_cache()
+
+    cases = {
+        'disabled debug()': lambda: logger.debug('message %s', 1),
+        'enabled info()': lambda: logger.info('message %s', 1),
+        'enabled info() no args': lambda: logger.info('message'),
+        'enabled log()': lambda: logger.log(plogging.INFO, 'message %s', 1),
+        'isEnabledFor()': lambda: logger.isEnabledFor(plogging.DEBUG),
+        'command (addFilter)': lambda: logger.addFilter(None),
+        'baseline enabled info()': lambda: baseline.info('message %s', 1),
+        'baseline enabled log()': lambda: baseline.log(plogging.INFO, 'message %s', 1),
+        'baseline command (addFilter)': lambda: baseline.addFilter(None),
+        }
+    plogging.Logger.manager.sendCommand = lambda *args, **kwargs: None  # Do not keep the commands
+
+    results = {}
+    for name, func in cases.items():
+        best = min(timeit.repeat(func, number=args.number, repeat=args.repeat))
+        results[name] = best / args.number * 1e9
+
+    if args.json:
+        print(json.dumps({'ns_per_call': results}, indent=2))
+    else:
+        for name, ns in results.items():
+            print('%-30s %8.0f ns/call' % (name, ns))
+
+
+if __name__ == '__main__':
+    main()
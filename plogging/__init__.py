@@ -1,12 +1,26 @@
 import warnings
 from logging import *
+from logging import _checkLevel
 
 # ========== Override logging ==========
-from .log_process import is_parent_process_alive, run_process, stop_process
+from .log_process import is_parent_process_alive, run_process, stop_process, LogProcess
 from .logger import Logger
 from .manager import Manager
 from . import config
 from . import handlers
+from . import transport
+from . import record
+from . import overflow
+from .overflow import OverflowPolicy
+from . import serialize
+from .serialize import SerializationPolicy
+from . import ratelimit
+from .ratelimit import RateLimitPolicy
+from . import formatters
+from . import health
+from . import collector
+from . import aio
+from .formatters import FastFormatter, JsonFormatter
 
 # ========== Override config ==========
 basicConfig = config.basicConfig
@@ -26,6 +40,42 @@ root = None
 Logger.manager = Manager(root)
 Logger.manager.setLoggerClass(Logger)
 setLoggerClass = Logger.manager.setLoggerClass
+setProcessCount = Logger.manager.setProcessCount
+pinLogger = Logger.manager.pinLogger
+unpinLogger = Logger.manager.unpinLogger
+setLogRecordFactory = Logger.manager.setLogRecordFactory
+setBatchOptions = Logger.manager.setBatchOptions
+setTransport = Logger.manager.setTransport
+setOverflowPolicy = Logger.manager.setOverflowPolicy
+setSerializationPolicy = Logger.manager.setSerializationPolicy
+setAsyncMode = Logger.manager.setAsyncMode
+setRateLimit = Logger.manager.setRateLimit
+configureHandler = Logger.manager.configureHandler
+setShutdownTimeout = Logger.manager.setShutdownTimeout
+flush = Logger.manager.barrier
+setHealthCallback = Logger.manager.setHealthCallback
+setRestartPolicy = Logger.manager.setRestartPolicy
+setForkMode = Logger.manager.setForkMode
+startProcesses = Logger.manager.startProcesses
+serve = Logger.manager.serve
+connect = Logger.manager.connect
+
+
+def disable(level=CRITICAL):
+    """
+    Disable all logging calls of severity 'level' and below.
+
+    The records are dropped before they are sent to the logging process.
+    """
+    Logger.manager.disable = _checkLevel(level)
+    Logger.manager._clear_cache()
+
+
+def getLogRecordFactory():
+    """
+    Return the factory to be used when instantiating a log record.
+    """
+    return Logger.manager.logRecordFactory or LogRecord
 
 
 def getLoggerClass():
@@ -61,6 +111,10 @@ STANDARD_FMT = {'format': '%(asctime)s,%(msecs)d %(name)s %(levelname)s %(messag
 STANDARD_FORMATTER = {'fmt': STANDARD_FMT['format'],
                       'datefmt': STANDARD_FMT['datefmt']}
 
+# Presets for basicConfig that use the plogging formatters (see plogging.formatters)
+FAST_FMT = dict(STANDARD_FMT, formatter='fast')
+JSON_FMT = {'formatter': 'json'}
+
 
 def critical(msg, *args, **kwargs):
     """
@@ -0,0 +1,130 @@
+"""Log from an asyncio event loop without blocking it.
+
+A logger in async mode (Logger.setAsyncMode, plogging.setAsyncMode) that logs in a running event loop only captures
+the record and appends it to the list of the current loop tick. At the end of the tick the list is put on a
+queue.SimpleQueue, which never blocks, and a sender thread gives the records to the LogProcess with the overflow
+policy of the logger like the sync path. A 'block' policy blocks the sender thread instead of the event loop.
+
+Outside of a running event loop the records are sent like the records of any other logger.
+"""
+import os
+import sys
+import queue
+import asyncio
+import threading
+import traceback
+
+from .serialize import detach_buffers
+
+
+__all__ = ['AsyncSender', 'SENDER']
+
+
+class AsyncSender(object):
+    """Collect the records of every event loop tick and send them from a thread."""
+    def __init__(self):
+        self.ticks = 0
+        self.sent = 0
+        self._queue = queue.SimpleQueue()
+        self._open = {}  # Thread id to the (loop, records) of the tick that did not end yet
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+    def add(self, logger, record):
+        """Add a record of the logger to the current tick. Return False if no event loop is running in this thread."""
+        entry = self._open.get(threading.get_ident())
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if entry is None or entry[0] is not loop:
+            if loop is None:
+                if entry is not None:
+                    self.end_tick()  # The loop stopped before the end of the tick
+                return False
+            entry = self._start_tick(loop)
+        detach_buffers(record)
+        entry[1].append((logger, record))
+        return True
+
+    def _start_tick(self, loop):
+        ident = threading.get_ident()
+        if ident in self._open:
+            self.end_tick()
+        records = []
+        entry = self._open[ident] = (loop, records)
+        loop.call_soon(self._end_tick, ident, records)
+        return entry
+
+    def _end_tick(self, ident, records):
+        """Send the records at the end of the tick unless end_tick or flush already sent them."""
+        entry = self._open.get(ident)
+        if entry is not None and entry[1] is records:
+            del self._open[ident]
+            self._put(records)
+
+    def end_tick(self):
+        """Send the records of the current tick of this thread now."""
+        entry = self._open.pop(threading.get_ident(), None)
+        if entry is not None:
+            self._put(entry[1])
+
+    def _put(self, item):
+        self.ticks += 1
+        self._queue.put(item)
+        if self._thread is None:
+            with self._thread_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='plogging-async', daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if callable(item):
+                    item()
+                    continue
+                for logger, record in item:
+                    logger._send(record)
+                    self.sent += 1
+            except Exception:
+                sys.stderr.write('--- Logging error ---\n')
+                traceback.print_exc(file=sys.stderr)
+
+    def flush(self, timeout=None, all_threads=False):
+        """Wait until the sender thread sent every record of the ended ticks.
+
+        Args:
+            timeout (float)[None]: Maximum seconds to wait. None waits forever.
+            all_threads (bool)[False]: Also end the open ticks of the other threads (when the logging process stops).
+
+        Returns:
+            success (bool): False if the records were not sent within timeout seconds.
+        """
+        self.end_tick()
+        if all_threads:
+            for ident in list(self._open):
+                entry = self._open.pop(ident, None)
+                if entry is not None:
+                    self._put(entry[1])
+        if self._thread is None or self._thread is threading.current_thread():
+            return True
+        done = threading.Event()
+        self._queue.put(done.set)
+        return done.wait(timeout)
+
+    def after_fork(self):
+        """Reset the sender in a forked child process. The records that were waiting belong to the parent."""
+        self._queue = queue.SimpleQueue()
+        self._open = {}
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+
+# Sender of every logger in async mode
+SENDER = AsyncSender()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=SENDER.after_fork)
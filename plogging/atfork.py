@@ -0,0 +1,24 @@
+"""Reset the objects of the application process in a forked child."""
+import os
+import weakref
+
+
+__all__ = ['register_after_fork']
+
+
+# Objects whose after_fork method is called in a forked child
+_objects = weakref.WeakSet()
+
+
+def register_after_fork(obj):
+    """Call obj.after_fork() in every forked child of this process while obj is alive."""
+    _objects.add(obj)
+
+
+def _after_fork_in_child():
+    for obj in list(_objects):
+        obj.after_fork()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
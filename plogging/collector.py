@@ -0,0 +1,308 @@
+"""Collect the records of many application processes in one logging process.
+
+A LogProcess that serves an address (LogProcess.serve, plogging.serve) listens on a Unix domain socket. A process that
+calls plogging.connect(address) sends its record batches over its own connection instead of starting logging
+processes, so a pool of workers shares one set of handlers. The producers do not share a lock or a queue and every
+connection is read in order, so the records of one producer keep their order.
+
+Every frame is a 4 byte length and a batch from a RecordBatcher. The collector answers a barrier with a pickled
+('flushed', token) frame on the same connection.
+
+The collector is configured by the process that serves it. Only the records and barriers of a connection are run, the
+configuration commands (setLevel, addHandler, ...) of the connected processes are not.
+"""
+import os
+import sys
+import time
+import errno
+import pickle
+import socket
+import struct
+import logging
+import selectors
+import threading
+import traceback
+from multiprocessing.connection import wait
+
+
+__all__ = ['FRAME', 'create_listener', 'SocketTransport', 'Collector']
+
+
+# Length of the batch before every frame
+FRAME = struct.Struct('<I')
+
+# Maximum number of bytes read from a connection at once
+RECV_SIZE = 262144
+
+
+def create_listener(address, backlog=128):
+    """Bind a listening Unix domain socket to address.
+
+    A socket file that is left over from a collector that exited is removed. A socket that is still served raises
+    an OSError (EADDRINUSE).
+    """
+    if os.path.exists(address):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(address)
+        except OSError:
+            os.unlink(address)
+        else:
+            raise OSError(errno.EADDRINUSE, 'A collector is serving %s' % address)
+        finally:
+            probe.close()
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.bind(address)
+        sock.listen(backlog)
+    except BaseException:
+        sock.close()
+        raise
+    return sock
+
+
+class SocketTransport(object):
+    """Send the batches of a RecordBatcher to a collector over a Unix domain socket.
+
+    The connection is opened with the first batch and opened again after an error and in a forked child. While the
+    collector does not read, sending blocks (the socket buffer is the backlog). A batch that cannot be sent because
+    the collector is not serving is dropped and counted.
+
+    Args:
+        address (str): Path of the socket the collector listens on.
+        timeout (float)[5.0]: Maximum seconds to wait for a connection.
+    """
+    def __init__(self, address, timeout=5.0):
+        self.address = address
+        self.timeout = timeout
+        self.dropped = 0
+        self.connections = 0
+        self._sock = None
+        self._pid = os.getpid()
+        self._read_lock = threading.Lock()
+        self._replies = bytearray()
+        self._acked = 0
+
+    def __repr__(self):
+        return '<%s %s (connections=%d, dropped=%d)>' % (self.__class__.__name__, self.address, self.connections,
+                                                         self.dropped)
+
+    def _connect(self):
+        if self._pid != os.getpid():
+            # The connection of the parent process is not shared
+            self._pid = os.getpid()
+            self._read_lock = threading.Lock()
+            self._close()
+        if self._sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.address)
+            except OSError:
+                sock.close()
+                raise
+            sock.settimeout(None)
+            self._sock = sock
+            self._replies = bytearray()
+            self.connections += 1
+        return self._sock
+
+    def _close(self):
+        sock, self._sock = self._sock, None
+        if sock is not None:
+            sock.close()
+
+    def put_nowait(self, batch):
+        """Send a batch (bytes) to the collector. Other objects are pickled."""
+        if not isinstance(batch, (bytes, bytearray)):
+            batch = pickle.dumps(batch, pickle.HIGHEST_PROTOCOL)
+        header = FRAME.pack(len(batch))
+        for _ in range(2):  # Connect again once if the collector was restarted
+            try:
+                sock = self._connect()
+                sock.sendall(header)
+                sock.sendall(batch)
+                return
+            except OSError:
+                self._close()
+
+        self.dropped += 1
+        if self.dropped == 1 and logging.raiseExceptions:
+            sys.stderr.write('--- Logging error ---\nCannot send records to the collector at %s. Records are dropped '
+                             'until it serves again.\n' % self.address)
+
+    put = put_nowait
+
+    def wait_flushed(self, token, timeout=None, interval=1.0):
+        """Wait for the ('flushed', token) reply of a barrier.
+
+        Args:
+            token (int): Token of the barrier.
+            timeout (float)[None]: Maximum seconds to wait. None waits forever.
+            interval (float)[1.0]: Maximum seconds between checks that the connection is still open.
+
+        Returns:
+            success (bool): False if the collector did not reply in time or the connection was closed.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        sock = self._sock
+        while self._acked < token:
+            if sock is None or sock is not self._sock or self._pid != os.getpid():
+                return False
+            wait_time = interval
+            if deadline is not None:
+                wait_time = min(wait_time, deadline - time.monotonic())
+                if wait_time <= 0:
+                    return False
+            if not self._read_lock.acquire(timeout=wait_time):
+                continue
+            try:
+                if self._acked < token and wait([sock], wait_time):
+                    self._read_replies(sock)
+            finally:
+                self._read_lock.release()
+        return True
+
+    def _read_replies(self, sock):
+        try:
+            data = sock.recv(4096)
+        except OSError:
+            data = b''
+        if not data:
+            if sock is self._sock:
+                self._close()
+            return
+
+        replies = self._replies
+        replies += data
+        start = 0
+        while len(replies) - start >= FRAME.size:
+            end = start + FRAME.size + FRAME.unpack_from(replies, start)[0]
+            if end > len(replies):
+                break
+            message = pickle.loads(replies[start + FRAME.size:end])
+            if message[0] == 'flushed':
+                self._acked = max(self._acked, message[1])
+            start = end
+        del replies[:start]
+
+    def close(self):
+        """Close the connection. The next batch opens a new connection."""
+        self._close()
+
+
+class _Connection(object):
+    """Connection of a producer in the collector. put sends a message back to the producer."""
+    def __init__(self, sock):
+        self.sock = sock
+        self.buffer = bytearray()
+
+    def put(self, message):
+        data = pickle.dumps(message, pickle.HIGHEST_PROTOCOL)
+        try:
+            self.sock.setblocking(True)
+            self.sock.sendall(FRAME.pack(len(data)) + data)
+        except OSError:
+            pass  # The producer closed the connection
+        finally:
+            self.sock.setblocking(False)
+
+
+class Collector(object):
+    """Accept the connections of a listening socket and run their batches in a thread of the logging process.
+
+    Args:
+        listener (socket): Listening Unix domain socket (see create_listener).
+        run_batch (callable): Called as run_batch(batch, connection) with every batch in the order of the
+            connection. connection.put(message) sends a reply to the producer.
+    """
+    def __init__(self, listener, run_batch):
+        self.listener = listener
+        self.run_batch = run_batch
+        self.connections = 0
+        self.batches = 0
+        self._selector = selectors.DefaultSelector()
+        self._wake_read, self._wake_write = socket.socketpair()
+        self._closing = False
+        self._thread = None
+
+    def start(self):
+        """Start accepting connections."""
+        self.listener.setblocking(False)
+        self._selector.register(self.listener, selectors.EVENT_READ)
+        self._selector.register(self._wake_read, selectors.EVENT_READ)
+        self._thread = threading.Thread(target=self._run, name='plogging-collector', daemon=True)
+        self._thread.start()
+
+    def close(self, timeout=None):
+        """Stop accepting connections, run the batches that were received and close the connections.
+
+        The listening socket is not closed. It belongs to the LogProcess, which starts a new collector with it.
+        """
+        self._closing = True
+        self._wake_write.send(b'\0')
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        try:
+            while not self._closing:
+                for key, _ in self._selector.select():
+                    if key.data is not None:
+                        self._read(key.data)
+                    elif key.fileobj is self.listener:
+                        self._accept()
+
+            # Run what the producers sent before closing
+            for key in list(self._selector.get_map().values()):
+                if key.data is not None:
+                    while self._read(key.data):
+                        pass
+                    key.data.sock.close()
+        finally:
+            self._selector.close()
+            self._wake_read.close()
+            self._wake_write.close()
+
+    def _accept(self):
+        try:
+            sock, _ = self.listener.accept()
+        except OSError:
+            return
+        sock.setblocking(False)
+        self._selector.register(sock, selectors.EVENT_READ, _Connection(sock))
+        self.connections += 1
+
+    def _read(self, connection):
+        """Read from a connection and run every complete batch. Return False if nothing was read."""
+        try:
+            data = connection.sock.recv(RECV_SIZE)
+        except BlockingIOError:
+            return False
+        except OSError:
+            data = b''
+        if not data:
+            self._selector.unregister(connection.sock)
+            connection.sock.close()
+            return False
+
+        buffer = connection.buffer
+        buffer += data
+        start = 0
+        size = len(buffer)
+        while size - start >= FRAME.size:
+            end = start + FRAME.size + FRAME.unpack_from(buffer, start)[0]
+            if end > size:
+                break
+            try:
+                self.run_batch(bytes(buffer[start + FRAME.size:end]), connection)
+            except Exception:
+                if logging.raiseExceptions:
+                    sys.stderr.write('--- Logging error ---\n')
+                    traceback.print_exc(file=sys.stderr)
+            self.batches += 1
+            start = end
+        if start:
+            del buffer[:start]
+        return True
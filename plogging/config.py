@@ -46,16 +46,55 @@ def set_config_function(config_name, func, *args, **kwargs):
     CONFIGS[config_name] = (func, args, kwargs)
 
 
-def basicConfig(**kwargs):
-    set_config_function('basic_config', 'basicConfig', **kwargs)
+def _levels_changed():
+    """Clear the cached levels of the plogging loggers after the logging levels in this process changed."""
+    from .logger import Logger
+    if Logger.manager is not None:
+        Logger.manager._clear_cache()
+
+
+def basic_config_formatter(formatter, **kwargs):
+    """Run logging.basicConfig and give the handlers it created a formatter from plogging.formatters."""
+    from .formatters import create_formatter
+
+    handlers = list(logging.root.handlers)
     logging.basicConfig(**kwargs)
+    fmt = create_formatter(formatter, kwargs.get('format'), kwargs.get('datefmt'), kwargs.get('style', '%'))
+    for handler in logging.root.handlers:
+        if handler not in handlers:
+            handler.setFormatter(fmt)
+
+
+def basicConfig(overflow=None, capacity=None, formatter=None, **kwargs):
+    """Do basic configuration for the logging system (see logging.basicConfig).
+
+    Args:
+        overflow (str/OverflowPolicy)[None]: Default overflow policy name (see plogging.overflow.POLICIES).
+        capacity (int)[None]: Maximum number of records waiting for the logging process with the overflow policy.
+        formatter (str/logging.Formatter)[None]: 'fast', 'json' or a formatter for the created handlers
+            (see plogging.formatters.FORMATTERS). format, datefmt and style are given to the formatter.
+        **kwargs (dict): Keyword arguments for logging.basicConfig.
+    """
+    if formatter is None:
+        set_config_function('basic_config', 'basicConfig', **kwargs)
+        logging.basicConfig(**kwargs)
+    else:
+        set_config_function('basic_config', basic_config_formatter, formatter, **kwargs)
+        basic_config_formatter(formatter, **kwargs)
+    _levels_changed()
+
+    if overflow is not None:
+        from .logger import Logger
+        Logger.manager.setOverflowPolicy(overflow, capacity)
 
 
 def fileConfig(fname, defaults=None, disable_existing_loggers=True):
     set_config_function('file_config', 'config.fileConfig', fname, defaults, disable_existing_loggers)
     logging.config.fileConfig(fname, defaults, disable_existing_loggers)
+    _levels_changed()
 
 
 def dictConfig(config):
     set_config_function('dict_config', 'config.dictConfig', config.copy())
     logging.config.dictConfig(config)
+    _levels_changed()
@@ -0,0 +1,180 @@
+"""Formatters that do less work per record than logging.Formatter.
+
+FastFormatter compiles a '%' style format string once into a plain format string and an attribute getter, and
+formats the asctime of a second only once. JsonFormatter writes every record as one JSON line with its fields and
+extra attributes.
+
+Both are picklable, so they can be given to Handler.setFormatter and are created again in the logging process.
+"""
+import re
+import json
+import time
+import logging
+from operator import attrgetter
+
+
+__all__ = ['FORMATTERS', 'RECORD_ATTRS', 'FastFormatter', 'JsonFormatter', 'create_formatter']
+
+
+# Attributes of every LogRecord. The other attributes of a record came from the extra argument.
+RECORD_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_FIELD = re.compile(r'%%|%\((\w+)\)([#0+ -]*\d*(?:\.\d+)?[diouxXeEfFgGcrsa])')
+
+
+def _tuple_getter(getter):
+    return lambda record: (getter(record),)
+
+
+class FastFormatter(logging.Formatter):
+    """logging.Formatter that compiles the format string once.
+
+    A '%' style format string is turned into a format string with positional fields and an attrgetter, so a record
+    is formatted with one tuple lookup and one % operation. The formatted time is cached for the current second.
+    The '{' and '$' styles and format strings with defaults are formatted like logging.Formatter, with the cached
+    time.
+
+    Args:
+        fmt (str)[None]: Format string. Default '%(message)s'.
+        datefmt (str)[None]: time.strftime format of asctime. Default '%Y-%m-%d %H:%M:%S,<msecs>'.
+        style (str)['%']: Format style.
+        **kwargs (dict): Other logging.Formatter arguments (validate, defaults).
+    """
+    def __init__(self, fmt=None, datefmt=None, style='%', **kwargs):
+        super().__init__(fmt, datefmt, style, **kwargs)
+        self._compile()
+
+    def _compile(self):
+        self._uses_time = self._style.usesTime()
+        self._time_cache = (None, None, None)
+        self._template = self._getter = None
+        if type(self._style) is not logging.PercentStyle or getattr(self._style, '_defaults', None):
+            return
+
+        fields = []
+
+        def replace(match):
+            if match.group(1) is None:
+                return '%%'
+            fields.append(match.group(1))
+            return '%' + match.group(2)
+
+        self._template = _FIELD.sub(replace, self._fmt)
+        if len(fields) == 1:
+            self._getter = _tuple_getter(attrgetter(fields[0]))
+        elif fields:
+            self._getter = attrgetter(*fields)
+        else:
+            self._getter = lambda record: ()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_template'] = state['_getter'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._compile()
+
+    def usesTime(self):
+        return self._uses_time
+
+    def formatTime(self, record, datefmt=None):
+        """Return the formatted created time. strftime is called once per second."""
+        second = int(record.created)
+        cached_second, cached_datefmt, text = self._time_cache
+        if second != cached_second or datefmt != cached_datefmt:
+            text = time.strftime(datefmt or self.default_time_format, self.converter(record.created))
+            self._time_cache = (second, datefmt, text)
+        if datefmt or not self.default_msec_format:
+            return text
+        return self.default_msec_format % (text, record.msecs)
+
+    def formatMessage(self, record):
+        if self._template is None:
+            return super().formatMessage(record)
+        try:
+            values = self._getter(record)
+        except AttributeError:
+            return super().formatMessage(record)  # Let logging.Formatter report the missing field
+        return self._template % values
+
+
+def _json_default(obj):
+    if isinstance(obj, (bytes, bytearray, memoryview)):
+        return bytes(obj).decode('utf-8', 'replace')
+    try:
+        return str(obj)
+    except Exception:
+        return '<unprintable %s object>' % type(obj).__name__
+
+
+class JsonFormatter(FastFormatter):
+    """Format every record as one line of JSON.
+
+    The object has the record attributes in fields, then exc_text and stack_info when the record has them, then
+    every extra attribute of the record sorted by name. Values that are not JSON types are written as strings.
+
+    Args:
+        fields (tuple)[('asctime', 'levelname', 'name', 'message')]: Record attributes to write.
+        datefmt (str)[None]: time.strftime format of asctime.
+        extra (bool)[True]: Write the attributes that were given with the extra argument.
+        ensure_ascii (bool)[False]: Escape non-ASCII characters.
+    """
+    def __init__(self, fields=('asctime', 'levelname', 'name', 'message'), datefmt=None, extra=True,
+                 ensure_ascii=False):
+        self.fields = tuple(fields)
+        self.extra = extra
+        self.ensure_ascii = ensure_ascii
+        super().__init__(' '.join('%%(%s)s' % field for field in self.fields), datefmt)
+
+    def _compile(self):
+        super()._compile()
+        self._encode = json.JSONEncoder(ensure_ascii=self.ensure_ascii, separators=(',', ':'),
+                                        default=_json_default).encode
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        state.pop('_encode', None)
+        return state
+
+    def format(self, record):
+        record.message = record.getMessage()
+        if self._uses_time:
+            record.asctime = self.formatTime(record, self.datefmt)
+        attrs = record.__dict__
+        obj = {field: attrs.get(field) for field in self.fields}
+
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            obj['exc_text'] = record.exc_text
+        if record.stack_info:
+            obj['stack_info'] = record.stack_info
+        if self.extra:
+            extra = attrs.keys() - RECORD_ATTRS
+            if extra:
+                for key in sorted(extra):
+                    obj.setdefault(key, attrs[key])
+        return self._encode(obj)
+
+
+# Formatter name to the formatter class
+FORMATTERS = {
+    'standard': logging.Formatter,
+    'fast': FastFormatter,
+    'json': JsonFormatter,
+    }
+
+
+def create_formatter(formatter='fast', fmt=None, datefmt=None, style='%'):
+    """Create a formatter by name (see FORMATTERS). The json formatter ignores fmt and style."""
+    if isinstance(formatter, logging.Formatter):
+        return formatter
+    try:
+        formatter_class = FORMATTERS[formatter]
+    except KeyError:
+        raise ValueError('Invalid formatter %r. Use one of %s' % (formatter, ', '.join(FORMATTERS))) from None
+    if formatter_class is JsonFormatter:
+        return formatter_class(datefmt=datefmt)
+    return formatter_class(fmt, datefmt, style)
@@ -1,6 +1,9 @@
 import logging
 import logging.handlers
 import sys
+import weakref
+
+from . import sinks
 
 
 RESERVED_KEYS = vars(object).keys()
@@ -15,6 +18,7 @@ class Handler(object):
         self.name = None
         self.level = level
         self.formatter = None
+        self.worker = None
 
     def get_name(self):
         return self.name
@@ -31,6 +35,21 @@ class Handler(object):
     def format(self, record):
         return logging.Handler.format(self, record)
 
+    def setWorker(self, mode='thread', maxsize=1000, block=True, timeout=None):
+        """Run the handler on its own worker in the logging process, so it does not hold back the other handlers.
+
+        Args:
+            mode (str)['thread']: 'thread' for a dedicated thread, 'asyncio' for a task in a shared event loop thread
+                or None to run the handler with the logger (the default).
+            maxsize (int)[1000]: Maximum number of records waiting for the handler.
+            block (bool)[True]: Wait for room when the worker queue is full. If False the record is dropped.
+            timeout (float)[None]: Seconds to wait for room before dropping the record.
+        """
+        if mode is None:
+            self.worker = None
+        else:
+            self.worker = {'mode': mode, 'maxsize': maxsize, 'block': block, 'timeout': timeout}
+
     def flush(self):
         pass
 
@@ -54,55 +73,21 @@ class Handler(object):
         return self._pickle.copy()
 
     def __setstate__(self, state):
-        self.__dict__['_pickle'] = {}
-
-        type_ = state.get('TYPE', 'Handler')
-        try:
-            del state['TYPE']
-        except KeyError:
-            pass
-        try:
-            self._pickle['TYPE'] = type_
-        except (AttributeError, ValueError, TypeError):
-            pass
-
-        try:
-            self.set_name(state['name'])
-            del state['name']
-        except:
-            pass
-        try:
-            self.setLevel(state['level'])
-            del state['level']
-        except:
-            pass
-        try:
-            self.setFormatter(state['formatter'])
-            del state['formatter']
-        except:
-            pass
-
-        for key in state:
-            setattr(self, key, state[key])
+        state.setdefault('TYPE', 'Handler')
+        self.__dict__['_pickle'] = state
 
     def create_handler(self):
-        """Create and return the handler from the settings in this class.
+        """Create and return the handler from the settings in this class with its HandlerType (see HANDLERS).
 
         This is used in the separate process.
         """
-        try:
-            handler_class = getattr(logging, self.TYPE)
-        except AttributeError:
-            handler_class = getattr(logging.handlers, self.TYPE)
-
-        handler = handler_class()
-        if self.level is not None:
-            handler.setLevel(self.level)
-        if self.name is not None:
-            handler.name = self.name
-        if self.formatter is not None:
-            handler.setFormatter(self.formatter)
-        return handler
+        return get_handler_type(self.TYPE).create(self)
+
+    def configure(self, **changes):
+        """Change settings that the handler of this TYPE can change in place (see Manager.configureHandler)."""
+        get_handler_type(self.TYPE).validate(changes)
+        for key, value in changes.items():
+            setattr(self, key, value)
 
 
 class StreamHandler(Handler):
@@ -113,24 +98,6 @@ class StreamHandler(Handler):
         self.terminator = None
         self.stream = stream
 
-    def create_handler(self):
-        """Create and return the handler from the settings in this class.
-
-        This is used in the separate process.
-        """
-        handler = logging.StreamHandler(stream=self.stream)
-        if self.level is not None:
-            handler.setLevel(self.level)
-        if self.name is not None:
-            handler.name = self.name
-        if self.formatter is not None:
-            handler.setFormatter(self.formatter)
-
-        if self.terminator is not None:
-            handler.terminator = self.terminator
-
-        return handler
-
     def __getstate__(self):
         state = super().__getstate__()
         if state['stream'] == sys.stdout:
@@ -156,43 +123,102 @@ class FileHandler(StreamHandler):
         self.mode = mode
         self.encoding = encoding
         self.delay = delay
+        self.buffering = None
+        self.compression = None
+
+    def setBuffering(self, buffer_size=65536, flush_interval=1.0, flush_level=logging.ERROR, fsync=False):
+        """Gather the formatted records in a buffer and write them to the file in batches.
+
+        Args:
+            buffer_size (int)[65536]: Write when this many characters are buffered.
+            flush_interval (float)[1.0]: Maximum seconds a record stays in the buffer.
+            flush_level (int)[ERROR]: Records at or above this level are written immediately.
+            fsync (bool/float)[False]: False never calls os.fsync, True calls it after every write and a number calls
+                it at most every fsync seconds.
+        """
+        self.buffering = {'buffer_size': buffer_size, 'flush_interval': flush_interval,
+                          'flush_level': flush_level, 'fsync': fsync}
 
-    def create_handler(self):
-        """Create and return the handler from the settings in this class.
+    def setCompression(self, codec='gzip', level=None, on_rotate=False):
+        """Compress the log file.
 
-        This is used in the separate process.
-        """
-        handler = logging.FileHandler(self.filename, self.mode, self.encoding, self.delay)
-        if self.level is not None:
-            handler.setLevel(self.level)
-        if self.name is not None:
-            handler.name = self.name
-        if self.formatter is not None:
-            handler.setFormatter(self.formatter)
+        By default the records are buffered (see setBuffering) and every buffer is written as one compressed frame, so
+        the file stays readable up to the last frame after a crash. Read it with plogging.sinks.read_compressed.
 
-        if self.terminator is not None:
-            handler.terminator = self.terminator
+        Args:
+            codec (str)['gzip']: 'gzip', 'zstd' (needs zstandard) or 'lz4' (needs lz4).
+            level (int)[None]: Compression level. None uses the codec's default.
+            on_rotate (bool)[False]: Write the file uncompressed and compress the rotated files in a helper thread
+                instead. Only for RotatingFileHandler and TimedRotatingFileHandler.
+        """
+        if codec is None:
+            self.compression = None
+            return
+        sinks.get_codec(codec)
+        if on_rotate and self.TYPE not in ('RotatingFileHandler', 'TimedRotatingFileHandler'):
+            raise ValueError('Only the rotating file handlers can compress on rotate')
+        if not on_rotate and self.TYPE not in ('FileHandler', 'RotatingFileHandler', 'TimedRotatingFileHandler'):
+            raise ValueError('%s cannot write compressed files' % self.TYPE)
+        self.compression = {'codec': codec, 'level': level, 'on_rotate': on_rotate}
+
+    def _create_file_handler(self, handler_class, *args):
+        """Create the file handler or its buffered or compressed version."""
+        compression = self.compression
+        if compression is not None and not compression['on_rotate']:
+            handler = sinks.COMPRESSED_CLASSES[handler_class](*args)
+            handler.setCompression(compression['codec'], compression['level'])
+            if self.buffering is not None:
+                handler.setBuffering(**self.buffering)
+            return handler
+
+        if self.buffering is None:
+            handler = handler_class(*args)
+        else:
+            handler = sinks.BUFFERED_CLASSES[handler_class](*args)
+            handler.setBuffering(**self.buffering)
 
+        if compression is not None:
+            compressor = sinks.RotationCompressor(compression['codec'], compression['level'])
+            handler.rotator = compressor
+            handler.namer = compressor.namer
         return handler
 
 
 class NullHandler(Handler):
     TYPE = "NullHandler"
 
-    def create_handler(self):
-        """Create and return the handler from the settings in this class.
 
-        This is used in the separate process.
+class BinaryFileHandler(Handler):
+    TYPE = "BinaryFileHandler"
+
+    def __init__(self, filename, mode='ab', buffer_size=1048576, flush_interval=1.0, delay=False):
+        """Append the binary data of Logger.log_data records to a file (see plogging.sinks.BinaryFileHandler).
+
+        Read the file back with plogging.sinks.iter_data_file.
         """
-        handler = logging.NullHandler()
-        if self.level is not None:
-            handler.setLevel(self.level)
-        if self.name is not None:
-            handler.name = self.name
-        if self.formatter is not None:
-            handler.setFormatter(self.formatter)
+        super().__init__()
+        self.filename = filename
+        self.mode = mode
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.delay = delay
 
-        return handler
+
+class SegmentFileHandler(Handler):
+    TYPE = "SegmentFileHandler"
+
+    def __init__(self, filename, segment_size=16777216, backupCount=0, encoding='utf-8', sync=False):
+        """Write records into pre-allocated memory mapped segment files (see plogging.sinks.SegmentFileHandler).
+
+        Read or recover the segments with python -m plogging.recover.
+        """
+        super().__init__()
+        self.filename = filename
+        self.segment_size = segment_size
+        self.backupCount = backupCount
+        self.encoding = encoding
+        self.sync = sync
+        self.terminator = None
 
 
 # ========== Handler file ==========
@@ -214,29 +240,6 @@ class BaseRotatingHandler(FileHandler):
         self.namer = None
         self.rotator = None
 
-    def create_handler(self):
-        """Create and return the handler from the settings in this class.
-
-        This is used in the separate process.
-        """
-        handler = logging.handlers.BaseRotatingHandler(self.filename, self.mode, self.encoding, self.delay)
-        if self.level is not None:
-            handler.setLevel(self.level)
-        if self.name is not None:
-            handler.name = self.name
-        if self.formatter is not None:
-            handler.setFormatter(self.formatter)
-
-        if self.terminator is not None:
-            handler.terminator = self.terminator
-
-        if self.namer is not None:
-            handler.namer = self.namer
-        if self.rotator is not None:
-            handler.rotator = self.rotator
-
-        return handler
-
 
 class RotatingFileHandler(BaseRotatingHandler):
     TYPE = 'RotatingFileHandler'
@@ -246,34 +249,6 @@ class RotatingFileHandler(BaseRotatingHandler):
         self.maxBytes = maxBytes
         self.backupCount = backupCount
 
-    def create_handler(self):
-        """Create and return the handler from the settings in this class.
-
-        This is used in the separate process.
-        """
-        handler = logging.handlers.BaseRotatingHandler(self.filename, self.mode, self.encoding, self.delay)
-        if self.level is not None:
-            handler.setLevel(self.level)
-        if self.name is not None:
-            handler.name = self.name
-        if self.formatter is not None:
-            handler.setFormatter(self.formatter)
-
-        if self.terminator is not None:
-            handler.terminator = self.terminator
-
-        if self.namer is not None:
-            handler.namer = self.namer
-        if self.rotator is not None:
-            handler.rotator = self.rotator
-
-        if self.maxBytes != 0:
-            handler.maxBytes = self.maxBytes
-        if self.backupCount != 0:
-            handler.backupCount = self.backupCount
-
-        return handler
-
 
 class TimedRotatingFileHandler(BaseRotatingHandler):
     TYPE = 'TimedRotatingFileHandler'
@@ -288,30 +263,6 @@ class TimedRotatingFileHandler(BaseRotatingHandler):
         self.atTime = atTime
         self.interval = interval
 
-    def create_handler(self):
-        """Create and return the handler from the settings in this class.
-
-        This is used in the separate process.
-        """
-        handler = logging.handlers.TimedRotatingFileHandler(self.filename, self.when, self.interval, self.backupCount,
-                                                            self.encoding, self.delay, self.utc)
-        if self.level is not None:
-            handler.setLevel(self.level)
-        if self.name is not None:
-            handler.name = self.name
-        if self.formatter is not None:
-            handler.setFormatter(self.formatter)
-
-        if self.terminator is not None:
-            handler.terminator = self.terminator
-
-        if self.namer is not None:
-            handler.namer = self.namer
-        if self.rotator is not None:
-            handler.rotator = self.rotator
-
-        return handler
-
 
 class WatchedFileHandler(FileHandler):
     TYPE = 'WatchedFileHandler'
@@ -319,24 +270,6 @@ class WatchedFileHandler(FileHandler):
     def __init__(self, filename, mode='a', encoding=None, delay=False):
         super().__init__(filename, mode, encoding, delay)
 
-    def create_handler(self):
-        """Create and return the handler from the settings in this class.
-
-        This is used in the separate process.
-        """
-        handler = logging.handlers.WatchedFileHandler(self.filename, self.mode, self.encoding, self.delay)
-        if self.level is not None:
-            handler.setLevel(self.level)
-        if self.name is not None:
-            handler.name = self.name
-        if self.formatter is not None:
-            handler.setFormatter(self.formatter)
-
-        if self.terminator is not None:
-            handler.terminator = self.terminator
-
-        return handler
-
 
 class SocketHandler(Handler):
     TYPE = 'SocketHandler'
@@ -346,21 +279,6 @@ class SocketHandler(Handler):
         self.host = host
         self.port = port
 
-    def create_handler(self):
-        """Create and return the handler from the settings in this class.
-
-        This is used in the separate process.
-        """
-        handler = logging.handlers.SocketHandler(self.host, self.port)
-        if self.level is not None:
-            handler.setLevel(self.level)
-        if self.name is not None:
-            handler.name = self.name
-        if self.formatter is not None:
-            handler.setFormatter(self.formatter)
-
-        return handler
-
 
 class DatagramHandler(SocketHandler):
     TYPE = 'DatagramHandler'
@@ -369,24 +287,6 @@ class DatagramHandler(SocketHandler):
         super().__init__(host, port)
         self.closeOnError = False
 
-    def create_handler(self):
-        """Create and return the handler from the settings in this class.
-
-        This is used in the separate process.
-        """
-        handler = logging.handlers.DatagramHandler(self.host, self.port)
-        if self.level is not None:
-            handler.setLevel(self.level)
-        if self.name is not None:
-            handler.name = self.name
-        if self.formatter is not None:
-            handler.setFormatter(self.formatter)
-
-        if self.closeOnError is not None:
-            handler.closeOnError = self.closeOnError
-
-        return handler
-
 
 class SysLogHandler(Handler):
     TYPE = 'SysLogHandler'
@@ -479,22 +379,7 @@ class SysLogHandler(Handler):
         super().__init__()
         self.address = address
         self.facility = facility
-        self.socktype = self.socktype
-
-    def create_handler(self):
-        """Create and return the handler from the settings in this class.
-
-        This is used in the separate process.
-        """
-        handler = logging.handlers.SysLogHandler(self.address, self.facility, self.socktype)
-        if self.level is not None:
-            handler.setLevel(self.level)
-        if self.name is not None:
-            handler.name = self.name
-        if self.formatter is not None:
-            handler.setFormatter(self.formatter)
-
-        return handler
+        self.socktype = socktype
 
 
 class SMTPHandler(Handler):
@@ -511,22 +396,6 @@ class SMTPHandler(Handler):
         self.secure = secure
         self.timeout = timeout
 
-    def create_handler(self):
-        """Create and return the handler from the settings in this class.
-
-        This is used in the separate process.
-        """
-        handler = logging.handlers.SMTPHandler(self.mailhost, self.fromaddr, self.toaddrs, self.subject,
-                                                 self.credentials, self.secure, self.timeout)
-        if self.level is not None:
-            handler.setLevel(self.level)
-        if self.name is not None:
-            handler.name = self.name
-        if self.formatter is not None:
-            handler.setFormatter(self.formatter)
-
-        return handler
-
 
 class NTEventLogHandler(Handler):
     TYPE = 'NTEventLogHandler'
@@ -538,21 +407,6 @@ class NTEventLogHandler(Handler):
         self.dllname = dllname
         self.logtype = logtype
 
-    def create_handler(self):
-        """Create and return the handler from the settings in this class.
-
-        This is used in the separate process.
-        """
-        handler = logging.handlers.NTEventLogHandler(self.appname, self.dllname, self.logtype)
-        if self.level is not None:
-            handler.setLevel(self.level)
-        if self.name is not None:
-            handler.name = self.name
-        if self.formatter is not None:
-            handler.setFormatter(self.formatter)
-
-        return handler
-
 
 class HTTPHandler(Handler):
     TYPE = 'HTTPHandler'
@@ -568,22 +422,6 @@ class HTTPHandler(Handler):
         self.credentials = credentials
         self.context = context
 
-    def create_handler(self):
-        """Create and return the handler from the settings in this class.
-
-        This is used in the separate process.
-        """
-        handler = logging.handlers.HTTPHandler(self.host, self.url, self.method, self.secure, self.credentials,
-                                                 self.context)
-        if self.level is not None:
-            handler.setLevel(self.level)
-        if self.name is not None:
-            handler.name = self.name
-        if self.formatter is not None:
-            handler.setFormatter(self.formatter)
-
-        return handler
-
 
 class BufferingHandler(Handler):
     TYPE = 'BufferingHandler'
@@ -593,21 +431,6 @@ class BufferingHandler(Handler):
 
         self.capacity = capacity
 
-    def create_handler(self):
-        """Create and return the handler from the settings in this class.
-
-        This is used in the separate process.
-        """
-        handler = logging.handlers.BufferingHandler(self.capacity)
-        if self.level is not None:
-            handler.setLevel(self.level)
-        if self.name is not None:
-            handler.name = self.name
-        if self.formatter is not None:
-            handler.setFormatter(self.formatter)
-
-        return handler
-
 
 class MemoryHandler(BufferingHandler):
     TYPE = 'MemoryHandler'
@@ -620,21 +443,6 @@ class MemoryHandler(BufferingHandler):
         self.target = target
         self.flushOnClose = flushOnClose
 
-    def create_handler(self):
-        """Create and return the handler from the settings in this class.
-
-        This is used in the separate process.
-        """
-        handler = logging.handlers.MemoryHandler(self.capacity, self.flushLevel, self.target, self.flushOnClose)
-        if self.level is not None:
-            handler.setLevel(self.level)
-        if self.name is not None:
-            handler.name = self.name
-        if self.formatter is not None:
-            handler.setFormatter(self.formatter)
-
-        return handler
-
 
 class QueueHandler(Handler):
     TYPE = 'QueueHandler'
@@ -653,17 +461,156 @@ class QueueHandler(Handler):
         """
         self.queue.put_nowait(record)
 
-    def create_handler(self):
-        """Create and return the handler from the settings in this class.
 
-        This is used in the separate process.
-        """
-        handler = logging.handlers.QueueHandler(self.queue)
-        if self.level is not None:
-            handler.setLevel(self.level)
-        if self.name is not None:
-            handler.name = self.name
-        if self.formatter is not None:
-            handler.setFormatter(self.formatter)
+# ========== Handler registry ==========
+class HandlerType(object):
+    """Factory and schema of a handler TYPE.
+
+    Args:
+        factory (callable): Creates the logging.Handler from the values of args.
+        args (tuple)[()]: Names of the settings that are given to the factory in order. Changing one needs a new
+            handler.
+        attrs (tuple)[()]: Names of the settings that are set on the created handler when they are not None. They
+            and the level and formatter can be changed in place (see configure_handler).
+        file (bool)[False]: Create the handler with FileHandler._create_file_handler (buffering and compression).
+    """
+    def __init__(self, factory, args=(), attrs=(), file=False):
+        self.factory = factory
+        self.args = tuple(args)
+        self.attrs = tuple(attrs)
+        self.file = file
+        self.settable = frozenset(('level', 'formatter') + self.attrs)
 
+    def __repr__(self):
+        return '<%s %s(%s)>' % (self.__class__.__name__, getattr(self.factory, '__name__', self.factory),
+                                ', '.join(self.args))
+
+    def create(self, config):
+        """Create the handler from a Handler configuration."""
+        settings = config._pickle
+        values = [settings.get(name) for name in self.args]
+        if self.file:
+            handler = config._create_file_handler(self.factory, *values)
+        else:
+            handler = self.factory(*values)
+
+        if settings.get('level') is not None:
+            handler.setLevel(settings['level'])
+        if settings.get('name') is not None:
+            handler.name = settings['name']
+        if settings.get('formatter') is not None:
+            handler.setFormatter(settings['formatter'])
+        for name in self.attrs:
+            value = settings.get(name)
+            if value is not None:
+                setattr(handler, name, value)
+        if handler.name is not None:
+            CREATED.setdefault(handler.name, weakref.WeakSet()).add(handler)
         return handler
+
+    def validate(self, changes):
+        """Raise a ValueError if a setting cannot be changed in place."""
+        invalid = sorted(set(changes) - self.settable)
+        if invalid:
+            raise ValueError('%s cannot be changed in place (%s). Add a new handler instead.'
+                             % (', '.join(invalid), ', '.join(sorted(self.settable))))
+
+
+# Handler TYPE to the HandlerType that creates it in the logging process
+HANDLERS = {}
+
+# Handler name to the live handlers that were created from a configuration with that name (see configure_handler)
+CREATED = {}
+
+
+def register_handler(type_name, factory, args=(), attrs=(), file=False):
+    """Register the factory and schema of a handler TYPE. Return the HandlerType.
+
+    A Handler configuration with this TYPE is created in the logging process by calling the factory with the
+    settings named in args. Register the TYPE in the module that defines the configuration class, so the logging
+    process registers it when the configuration is unpickled.
+
+    Example:
+
+        class ListHandler(plogging.Handler):
+            TYPE = 'ListHandler'
+
+            def __init__(self, maxlen=100):
+                super().__init__()
+                self.maxlen = maxlen
+
+        register_handler('ListHandler', my_handlers.ListHandler, ('maxlen',))
+    """
+    handler_type = HANDLERS[type_name] = HandlerType(factory, args, attrs, file)
+    return handler_type
+
+
+def get_handler_type(type_name):
+    """Return the HandlerType of a TYPE. A TYPE that is not registered is a logging class without arguments."""
+    try:
+        return HANDLERS[type_name]
+    except KeyError:
+        pass
+    factory = getattr(logging, type_name, None) or getattr(logging.handlers, type_name, None)
+    if factory is None:
+        raise ValueError('Handler TYPE %r is not registered' % type_name)
+    return HandlerType(factory)
+
+
+def configure_handler(name, changes):
+    """Change the settings of the named handlers in this process in place. This runs in the logging process.
+
+    Every handler that was created from a configuration with the name is changed (a configuration that was added to
+    several loggers creates several handlers). The level, formatter and other attributes are set under the lock of
+    the handler, so its file stays open. A handler that runs on a worker is changed inside the worker.
+    """
+    handlers = list(CREATED.get(name, ()))
+    if not handlers:
+        raise ValueError('No handler named %r' % name)
+
+    for handler in handlers:
+        handler.acquire()
+        try:
+            for key, value in changes.items():
+                if key == 'level':
+                    handler.setLevel(value)
+                elif key == 'formatter':
+                    handler.setFormatter(value)
+                else:
+                    setattr(handler, key, value)
+        finally:
+            handler.release()
+
+
+_ROTATING_ATTRS = ('terminator', 'namer', 'rotator')
+
+register_handler('StreamHandler', logging.StreamHandler, ('stream',), ('terminator',))
+register_handler('FileHandler', logging.FileHandler, ('filename', 'mode', 'encoding', 'delay'), ('terminator',),
+                 file=True)
+register_handler('NullHandler', logging.NullHandler)
+register_handler('BinaryFileHandler', sinks.BinaryFileHandler,
+                 ('filename', 'mode', 'buffer_size', 'flush_interval', 'delay'))
+register_handler('SegmentFileHandler', sinks.SegmentFileHandler,
+                 ('filename', 'segment_size', 'backupCount', 'encoding', 'sync'), ('terminator',))
+register_handler('BaseRotatingHandler', logging.handlers.BaseRotatingHandler,
+                 ('filename', 'mode', 'encoding', 'delay'), _ROTATING_ATTRS)
+register_handler('RotatingFileHandler', logging.handlers.RotatingFileHandler,
+                 ('filename', 'mode', 'maxBytes', 'backupCount', 'encoding', 'delay'),
+                 _ROTATING_ATTRS + ('maxBytes', 'backupCount'), file=True)
+register_handler('TimedRotatingFileHandler', logging.handlers.TimedRotatingFileHandler,
+                 ('filename', 'when', 'interval', 'backupCount', 'encoding', 'delay', 'utc', 'atTime'),
+                 _ROTATING_ATTRS + ('backupCount',), file=True)
+register_handler('WatchedFileHandler', logging.handlers.WatchedFileHandler, ('filename', 'mode', 'encoding', 'delay'),
+                 ('terminator',), file=True)
+register_handler('SocketHandler', logging.handlers.SocketHandler, ('host', 'port'))
+register_handler('DatagramHandler', logging.handlers.DatagramHandler, ('host', 'port'), ('closeOnError',))
+register_handler('SysLogHandler', logging.handlers.SysLogHandler, ('address', 'facility', 'socktype'))
+register_handler('SMTPHandler', logging.handlers.SMTPHandler,
+                 ('mailhost', 'fromaddr', 'toaddrs', 'subject', 'credentials', 'secure', 'timeout'))
+register_handler('NTEventLogHandler', logging.handlers.NTEventLogHandler, ('appname', 'dllname', 'logtype'))
+register_handler('HTTPHandler', logging.handlers.HTTPHandler,
+                 ('host', 'url', 'method', 'secure', 'credentials', 'context'))
+register_handler('BufferingHandler', logging.handlers.BufferingHandler, ('capacity',), ('capacity',))
+register_handler('MemoryHandler', logging.handlers.MemoryHandler, ('capacity', 'flushLevel', 'target', 'flushOnClose'),
+                 ('capacity', 'flushLevel'))
+register_handler('QueueHandler', logging.handlers.QueueHandler, ('queue',))
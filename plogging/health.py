@@ -0,0 +1,183 @@
+"""Measure the handlers and the resources of the logging process and report them back to the parent process.
+
+The ProcessMonitor runs in the logging process. It counts the emits, errors and time of every handler, keeps the lag
+between logging a record and handling it and reports them with the memory and CPU use of the process on the reply
+queue of the LogProcess. The parent keeps the last report (LogProcess.stats) and calls the health callback when a
+handler keeps failing.
+"""
+import os
+import sys
+import time
+import logging
+import traceback
+from collections import deque
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+__all__ = ['HandlerStats', 'ProcessMonitor', 'get_rss']
+
+
+# Maximum number of errors that are kept and sent with each report
+MAX_ERRORS = 20
+
+
+def get_rss():
+    """Return the resident memory of this process in bytes or None if it cannot be read."""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def _error_text(exc_info=None):
+    exc_type, exc, _ = exc_info or sys.exc_info()
+    if exc_type is None:
+        return None
+    return ''.join(traceback.format_exception_only(exc_type, exc)).strip()
+
+
+class HandlerStats(object):
+    """Emit counters of one handler in the logging process.
+
+    The handle and handleError methods of the handler instance are replaced by methods that count and time them.
+    A handler is failing from its first error until it handles a record without an error. The monitor is told when
+    the handler starts failing.
+
+    Args:
+        handler (logging.Handler): Handler to measure. None for a handler that could not be created.
+        name (str)[None]: Name of the handler. Default the handler name or class name.
+        monitor (ProcessMonitor)[None]: Monitor that reports the failures.
+    """
+    def __init__(self, handler, name=None, monitor=None):
+        self.monitor = monitor
+        self.name = name or getattr(handler, 'name', None) or handler.__class__.__name__
+        self.type = handler.__class__.__name__ if handler is not None else None
+        self.emitted = 0
+        self.errors = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.last_error = None
+        self.failing_since = None
+
+        if handler is not None:
+            self._handle = handler.handle
+            self._handle_error = handler.handleError
+            handler.handle = self.handle
+            handler.handleError = self.handleError
+
+    def handle(self, record):
+        errors = self.errors
+        start = time.perf_counter()
+        rv = self._handle(record)
+        elapsed = time.perf_counter() - start
+        self.total_time += elapsed
+        if elapsed > self.max_time:
+            self.max_time = elapsed
+        if self.errors == errors:
+            if rv:
+                self.emitted += 1
+            self.failing_since = None
+        return rv
+
+    def handleError(self, record):
+        self.error(_error_text())
+        self._handle_error(record)
+
+    def error(self, text):
+        """Count an error of the handler."""
+        self.errors += 1
+        self.last_error = text
+        if self.failing_since is None:
+            self.failing_since = time.time()
+            if self.monitor is not None:
+                self.monitor.send_error({'handler': self.name, 'command': 'emit', 'error': text,
+                                         'time': self.failing_since})
+
+    def snapshot(self):
+        """Return the counters as a dict."""
+        return {'name': self.name, 'type': self.type, 'emitted': self.emitted, 'errors': self.errors,
+                'avg_time': self.total_time / max(self.emitted + self.errors, 1), 'max_time': self.max_time,
+                'last_error': self.last_error, 'failing_since': self.failing_since}
+
+
+class ProcessMonitor(object):
+    """Measure the logging process and send reports to the parent process.
+
+    Messages on the replies queue are ('error', error_dict) when a command fails or a handler starts failing and
+    ('stats', report_dict) from report().
+
+    Args:
+        replies (Queue)[None]: Queue of the messages back to the parent process.
+        processed (RawValue)[None]: Shared counter of the commands that were run.
+    """
+    def __init__(self, replies=None, processed=None):
+        self.replies = replies
+        self.processed = processed
+        self.handlers = []
+        self.errors = deque(maxlen=MAX_ERRORS)
+        self.lag = 0.0
+        self._cpu = self._cpu_time()
+        self._wall = time.monotonic()
+
+    @staticmethod
+    def _cpu_time():
+        times = os.times()
+        return times.user + times.system
+
+    def add_handler(self, handler):
+        """Measure a handler that was created in this process."""
+        stats = HandlerStats(handler, monitor=self)
+        self.handlers.append(stats)
+        return stats
+
+    def command_failed(self, item):
+        """Report the exception of a command or record that could not be run."""
+        text = _error_text()
+        if type(item) is tuple:
+            name, cmd = item[0], 'record'
+        else:
+            name, cmd = item[0], item[1]
+        error = {'logger': name, 'command': cmd, 'error': text, 'time': time.time()}
+
+        if cmd == 'addHandler':
+            # Keep the handler that could not be created in the stats, so it stays unhealthy
+            config = item[2][0]
+            stats = HandlerStats(None, getattr(config, 'name', None) or getattr(config, 'TYPE', None))
+            stats.type = getattr(config, 'TYPE', None)
+            stats.error(text)
+            self.handlers.append(stats)
+            error['handler'] = stats.name
+
+        if logging.raiseExceptions:
+            sys.stderr.write('--- Logging error ---\n')
+            traceback.print_exc(file=sys.stderr)
+            sys.stderr.write('Command %r of logger %r failed\n' % (cmd, name))
+        self.send_error(error)
+
+    def send_error(self, error):
+        """Keep the error dict and send it to the parent process."""
+        self.errors.append(error)
+        if self.replies is not None:
+            self.replies.put(('error', error))
+
+    def report(self):
+        """Return the stats of the process and its handlers as a dict and send it to the parent process."""
+        cpu, wall = self._cpu_time(), time.monotonic()
+        elapsed = wall - self._wall
+        report = {'pid': os.getpid(), 'time': time.time(),
+                  'processed': self.processed.value if self.processed is not None else None,
+                  'lag': self.lag, 'rss': get_rss(), 'cpu_time': cpu,
+                  'cpu_percent': 100.0 * (cpu - self._cpu) / elapsed if elapsed > 0 else 0.0,
+                  'handlers': [stats.snapshot() for stats in self.handlers],
+                  'errors': list(self.errors)}
+        self._cpu, self._wall = cpu, wall
+        if self.replies is not None:
+            self.replies.put(('stats', report))
+        return report
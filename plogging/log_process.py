@@ -1,9 +1,32 @@
 import os
+import sys
+import time
+import queue
+import atexit
+import socket
+import asyncio
+import weakref
+import tempfile
+import traceback
 
 import logging
 import logging.config
 
-from multiprocessing import Queue, Process, Event
+import threading
+from collections import deque
+from multiprocessing import Queue, Process, Event, RawValue
+from multiprocessing import process as mp_process
+from multiprocessing.connection import wait
+
+from .config import CONFIGS
+from .transport import RecordBatcher, RingBuffer, iter_batch
+from .record import make_record, capture_record
+from .workers import wrap_handler
+from .handlers import configure_handler
+from .health import ProcessMonitor, MAX_ERRORS
+from .collector import Collector, SocketTransport, create_listener
+from .logger import RECORD_COMMANDS, CONFIG_COMMANDS
+from .aio import SENDER
 
 try:
     import psutil
@@ -14,30 +37,88 @@ except ImportError as err:
     psutil = None
 
 
-__all__ = ['is_parent_process_alive', 'stop_process', 'run_process']
+__all__ = ['is_parent_process_alive', 'stop_process', 'run_process', 'LogProcess', 'TRANSPORTS', 'FORK_MODES']
+
+
+# Maximum number of seconds between checks that the parent process is alive
+LIVENESS_INTERVAL = 1.0
+
+# Default maximum number of seconds LogProcess.stop waits for the logging process before terminating it
+SHUTDOWN_TIMEOUT = 10.0
+
+# Default number of seconds a handler keeps failing before the health callback is called
+UNHEALTHY_AFTER = 5.0
+
+# Seconds to wait before restarting a crashed logging process. The delay doubles for every crash up to
+# MAX_RESTART_DELAY and starts over after a process ran for MAX_RESTART_DELAY seconds.
+RESTART_DELAY = 0.1
+MAX_RESTART_DELAY = 30.0
+
+# What a forked child of the application does with the logging processes of its parent (see LogProcess.after_fork)
+FORK_MODES = ('attach', 'new')
+
+QUIT_COMMAND = [None, 'quit', (), {}]
+
+# Commands without a logger name that are not logging module functions
+PROCESS_COMMANDS = {
+    'configureHandler': configure_handler,
+    }
+
+# Commands that a forked child does not send to the logging process of its parent (see LogProcess.put)
+ATTACHED_SKIPPED = CONFIG_COMMANDS | frozenset(PROCESS_COMMANDS)
 
 
-def is_parent_process_alive():
-    """Return if the parent process is alive. This relies on psutil, but is optional."""
+def is_parent_process_alive(parent_pid=None):
+    """Return if the parent process is alive.
+
+    On POSIX the process is re-parented when its parent dies, so the parent is alive while os.getppid() is still
+    parent_pid. Otherwise this relies on psutil, but is optional.
+
+    Args:
+        parent_pid (int)[None]: Process id of the parent when this process started. Default os.getppid().
+    """
+    if parent_pid is not None and os.name != 'nt':
+        return os.getppid() == parent_pid
     if psutil is None:
         return True
-    return psutil.pid_exists(os.getppid())
+    return psutil.pid_exists(parent_pid if parent_pid is not None else os.getppid())
 
 
-def stop_process(process, alive_event, process_queue):
+def stop_process(process, alive_event, process_queue, timeout=None, sequence=None):
     """Stop the process.
 
+    The quit command carries the number of commands that were sent before it. The process runs every one of them
+    before it exits, even if they arrive after the quit command. If the process does not exit within timeout seconds
+    it is terminated (and killed if it does not terminate).
+
     Args:
         process (Process): Multiprocessing process to join and quit
         alive_event (Event): Event to signal that the process is closing and exit the loop.
-        process_queue (Queue): Queue of events. Push a 'quit' command to exit out of the queue.get wait.
+        process_queue (Queue): Queue of command batches. Push a 'quit' command to exit out of the queue.get wait.
+        timeout (float)[None]: Maximum seconds to wait for the process to exit. None waits forever.
+        sequence (int)[None]: Number of commands that were sent to the process before the quit command.
+
+    Returns:
+        terminated (bool): True if the process did not exit in time and was terminated.
     """
     try:
         alive_event.clear()
-        process_queue.put_nowait(['quit', (), {}])
-        process.join()
+        command = [None, 'quit', () if sequence is None else (sequence,), {}]
+        # A full transport must not block past the timeout. A thread may still be sending into the single producer
+        # ring of a RingBuffer, so the quit command goes to its shared ring.
+        put = getattr(process_queue, 'put_shared', process_queue.put_nowait)
+        threading.Thread(target=put, args=(command,), name='plogging-quit', daemon=True).start()
+        process.join(timeout)
+        if process.is_alive():
+            process.terminate()
+            process.join(1.0)
+            if process.is_alive():
+                process.kill()
+                process.join()
+            return True
     except AttributeError:
         pass
+    return False
 
 
 def _run_configs(configs=None, config_funcs=None):
@@ -66,7 +147,25 @@ def _run_configs(configs=None, config_funcs=None):
                 func(*args, **kwargs)
 
 
-def _run_cmd(logger, cmd, args, kwargs):
+def _get_logger(name, loggers):
+    """Return the real logging.Logger for the given name using the loggers dictionary as a cache.
+
+    Args:
+        name (str): Name of the logger that sent the command. 'root' or None is the root logger.
+        loggers (dict): Cache of logger name to logging.Logger.
+    """
+    try:
+        return loggers[name]
+    except KeyError:
+        if name is None or name == 'root':
+            logger = logging.root
+        else:
+            logger = logging.getLogger(name)
+        loggers[name] = logger
+        return logger
+
+
+def _run_cmd(logger, cmd, args, kwargs, monitor=None):
     """Get a command from the process queue and run the command with the logger.
 
     Args:
@@ -74,13 +173,17 @@ def _run_cmd(logger, cmd, args, kwargs):
         cmd (str): Logger method name to run
         args (tuple): Positional arguments for the method
         kwargs (dict): Key word arguments for the method.
+        monitor (ProcessMonitor)[None]: Monitor that measures the handlers that are added.
 
     Returns:
         was_command (bool): True if the cmd name was a logger function.
     """
     if cmd == 'addHandler':
         # Recreate the handler in this process (Handlers have a RLock which is not serializable/pickleable)
-        args = (args[0].create_handler(), ) + args[1:]
+        handler = args[0].create_handler()
+        if monitor is not None:
+            monitor.add_handler(handler)
+        args = (wrap_handler(handler, args[0].worker), ) + args[1:]
 
     func = getattr(logger, cmd, None)
     if func:
@@ -89,26 +192,816 @@ def _run_cmd(logger, cmd, args, kwargs):
     return False
 
 
-def run_process(alive_event, process_queue, name=None, configs=None):
-    """Run the logging commands in a separate process."""
+def _handle_record(compact, loggers):
+    """Rebuild a compact record tuple (see plogging.record) and handle it with the logger that has the record's name.
+
+    Args:
+        compact (tuple): Record tuple from capture_record.
+        loggers (dict): Cache of logger name to logging.Logger.
+    """
+    logger = _get_logger(compact[0], loggers)
+    if logger.isEnabledFor(compact[2]):
+        logger.handle(make_record(compact))
+
+
+def _run_item(item, loggers, monitor=None):
+    """Run a command or handle a record from the process queue.
+
+    Commands are lists of [logger_name, cmd, args, kwargs]. Commands without a logger name run a function of
+    PROCESS_COMMANDS or of the logging module (setLogRecordFactory, ...). Records are tuples (see plogging.record).
+    An exception is reported with the monitor and does not stop the process.
+    """
+    try:
+        if isinstance(item, tuple):
+            _handle_record(item, loggers)
+            return
+
+        name, cmd, args, kwargs = item
+        if name is None:
+            func = PROCESS_COMMANDS.get(cmd) or getattr(logging, cmd, None)
+            if func:
+                func(*args, **kwargs)
+        else:
+            _run_cmd(_get_logger(name, loggers), cmd, args, kwargs, monitor)
+    except Exception:
+        (monitor or ProcessMonitor()).command_failed(item)
+
+
+def _flush_handlers():
+    """Flush every handler in this process. Handlers with a worker wait for their waiting records."""
+    for wr in reversed(logging._handlerList[:]):
+        try:
+            h = wr()
+            if h:
+                h.acquire()
+                try:
+                    h.flush()
+                finally:
+                    h.release()
+        except Exception:
+            if logging.raiseExceptions:
+                sys.stderr.write('--- Logging error ---\n')
+                traceback.print_exc(file=sys.stderr)
+
+
+def _send_ack(address, token):
+    """Acknowledge a barrier of a forked child of the application on its datagram socket."""
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+            sock.sendto(b'%d' % token, address)
+    except OSError:
+        pass  # The child stopped waiting
+
+
+def _broadcast(compact):
+    """Handle a compact record once with every handler of every logger in this process."""
+    record = make_record(compact)
+    handlers = dict.fromkeys(logging.root.handlers)
+    for logger in list(logging.root.manager.loggerDict.values()):
+        if isinstance(logger, logging.Logger):
+            handlers.update(dict.fromkeys(logger.handlers))
+    for h in handlers:
+        if record.levelno >= h.level:
+            h.handle(record)
+
+
+def _run_batch(batch, loggers, processed=None, replies=None, monitor=None, records_only=False):
+    """Run every command in a batch of commands from the process queue.
+
+    A barrier command flushes every handler and replies ('flushed', token) when the commands before it were run. The
+    barrier of a forked child of the application has the address of the socket to acknowledge the token on.
+    A broadcast command handles its record with every handler (the note of a restart of the logging process).
+
+    Args:
+        batch (bytes/list): Batch from the process queue.
+        loggers (dict): Cache of logger name to logging.Logger.
+        processed (RawValue)[None]: Shared counter of the commands that were run.
+        replies (Queue)[None]: Queue of the messages back to the parent process.
+        monitor (ProcessMonitor)[None]: Monitor that reports errors and keeps the lag of the last record.
+        records_only (bool)[False]: Only run the records and barriers (a batch of a connection to the collector).
+
+    Returns:
+        quit_sequence (int): None or the number of commands to run before exiting if the batch contained the quit
+            command. A quit command without a sequence returns 0.
+    """
+    quit_sequence = None
+    created = None
+    for item in iter_batch(batch):
+        if type(item) is tuple:
+            _run_item(item, loggers, monitor)
+            created = item[1]
+        elif item[0] is None and item[1] == 'barrier':
+            _flush_handlers()
+            if len(item[2]) > 1:
+                _send_ack(item[2][1], item[2][0])
+            elif replies is not None:
+                replies.put(('flushed', item[2][0]))
+        elif records_only and item[1] not in RECORD_COMMANDS:
+            continue
+        elif item[0] is None and item[1] == 'quit':
+            quit_sequence = item[2][0] if item[2] else 0
+            continue
+        elif item[0] is None and item[1] == 'broadcast':
+            try:
+                _broadcast(item[2][0])
+            except Exception:
+                (monitor or ProcessMonitor()).command_failed(item)
+        else:
+            _run_item(item, loggers, monitor)
+        if processed is not None:
+            processed.value += 1
+
+    if created is not None and monitor is not None:
+        monitor.lag = time.time() - created
+    return quit_sequence
+
+
+def run_process(alive_event, process_queue, configs=None, commands=None, liveness_interval=None, processed=None,
+                replies=None, listener=None):
+    """Run the logging commands for every logger in a separate process.
+
+    Each item in the queue is a batch of [logger_name, cmd, args, kwargs] commands and compact records (see
+    RecordBatcher and plogging.record). Every command and record is routed to the real logging.Logger with that name,
+    so one process can serve the whole Logger hierarchy.
+
+    Args:
+        alive_event (Event): Event that is cleared when the process should exit.
+        process_queue (Queue): Queue of command batches.
+        configs (dict)[None]: Configuration functions to run before any command (see CONFIGS).
+        commands (list)[None]: Commands that were sent before this process started (addHandler, setLevel, ...).
+        liveness_interval (float)[LIVENESS_INTERVAL]: Maximum seconds between checks that the alive_event is set and
+            the parent process is alive. The checks do not run for every batch.
+        processed (RawValue)[None]: Shared counter of the commands that were run from the process queue.
+        replies (Queue)[None]: Queue of the messages back to the parent process (barrier acknowledgements, errors
+            and a stats report every liveness_interval seconds, see plogging.health).
+        listener (socket)[None]: Listening socket of a collector. The records of the processes that connect to it
+            are run with the records from the process_queue (see plogging.collector).
+    """
+    parent_pid = os.getppid()
+    if liveness_interval is None:
+        liveness_interval = LIVENESS_INTERVAL
+    if processed is None:
+        processed = RawValue('Q', 0)
+    monitor = ProcessMonitor(replies, processed)
+
     # ===== Configure logging =====
     _run_configs(configs)
 
-    # ===== get the logger =====
-    if name == 'root':
-        logger = logging.root
-    else:
-        logger = logging.getLogger(name)
+    loggers = {}
+    for command in (commands or ()):
+        _run_item(command, loggers, monitor)
+
+    collector = None
+    if listener is not None:
+        collector = Collector(listener, lambda batch, connection: _run_batch(batch, loggers, None, connection, monitor,
+                                                                             records_only=True))
+        collector.start()
 
     # ===== Run the logging event loop =====
-    while alive_event.is_set() and is_parent_process_alive():
-        cmd, args, kwargs = process_queue.get()
-        _run_cmd(logger, cmd, args, kwargs)
+    # A quit command is only accepted after the alive_event was cleared, so a stale quit command cannot stop a
+    # restarted process. After the quit command the loop runs until every command sent before it was run.
+    quit_sequence = None
+    next_check = time.monotonic() + liveness_interval
+    while True:
+        try:
+            batch = process_queue.get(timeout=liveness_interval)
+            sequence = _run_batch(batch, loggers, processed, replies, monitor)
+            if sequence is not None and not alive_event.is_set():
+                quit_sequence = sequence
+        except queue.Empty:
+            pass
+
+        if quit_sequence is not None and processed.value >= quit_sequence:
+            break
+
+        now = time.monotonic()
+        if now >= next_check:
+            if not is_parent_process_alive(parent_pid):
+                break
+            if replies is not None:
+                monitor.report()
+            next_check = now + liveness_interval
 
     # ===== Finish logging before closing =====
-    # Only handle the number of events at this point. Otherwise could run forever if queue.put is fast enough.
-    for _ in range(process_queue.qsize()):
-        cmd, args, kwargs = process_queue.get()
-        _run_cmd(logger, cmd, args, kwargs)
+    # Without a quit sequence (the parent died) run what is already waiting. The parent cannot add more.
+    if not quit_sequence:
+        while True:
+            try:
+                batch = process_queue.get_nowait()
+            except (queue.Empty, OSError, ValueError):
+                break
+            _run_batch(batch, loggers, processed, replies, monitor)
+
+    if collector is not None:
+        collector.close(liveness_interval)
 
+    # Flush and close the handlers (atexit does not run in the multiprocessing child)
+    logging.shutdown()
+    if replies is not None:
+        monitor.report()
     alive_event.clear()
+
+
+# Transport name to the class of the queue that carries command batches to the logging process
+TRANSPORTS = {
+    'queue': Queue,
+    'ring': RingBuffer,
+    }
+
+
+class LogProcess(object):
+    """Separate process that runs the logging commands for any number of loggers.
+
+    A child of the application that is forked while the process runs keeps sending its records to the same process
+    (see after_fork).
+
+    Args:
+        name (str)['plogging']: Name of the process.
+        commands (list)[None]: Shared list of configuration commands to replay when the process starts.
+        transport (str)['queue']: Name of the transport in TRANSPORTS ('queue' or the shared memory 'ring').
+        transport_options (dict)[None]: Keyword arguments for the transport (maxsize, capacity, ...).
+        **batch_options (dict): max_count, max_bytes and max_latency options for the RecordBatcher.
+    """
+    def __init__(self, name='plogging', commands=None, transport='queue', transport_options=None, **batch_options):
+        self.name = name
+        self.commands = commands if commands is not None else []
+        self.transport = transport
+        self.process_alive = Event()
+        self.process_queue = TRANSPORTS[transport](**(transport_options or {}))
+        self.process = None
+        self.transport_options = transport_options
+        self.liveness_interval = LIVENESS_INTERVAL
+        self.shutdown_timeout = SHUTDOWN_TIMEOUT
+        self.batcher = RecordBatcher(self.process_queue.put_nowait, **batch_options)
+
+        # Backlog of the logging process and the overflow policies that hold records until it has room
+        self.processed = RawValue('Q', 0)
+        self._sent_offset = 0
+        self._holding = set()
+        self._holding_lock = threading.Lock()
+        self._release_thread = None
+
+        # Messages back from the logging process and the barriers they acknowledge
+        self.replies = Queue()
+        self._replied = threading.Condition()
+        self._reply_thread = None
+        self._barrier_lock = threading.Lock()
+        self._barriers = 0
+        self._acked = 0
+
+        # Health of the logging process (see plogging.health)
+        self.last_stats = None
+        self.errors = deque(maxlen=MAX_ERRORS)
+        self.health_callback = None
+        self.unhealthy_after = UNHEALTHY_AFTER
+        self._unhealthy = set()
+
+        # Supervision of the logging process. A process that exits without being stopped is restarted.
+        self.restart = True
+        self.restart_delay = RESTART_DELAY
+        self.max_restart_delay = MAX_RESTART_DELAY
+        self.restarts = 0
+        self.lost = 0
+        self._crashes = 0
+        self._crashed = None
+        self._lost = 0
+        self._started_at = None
+        self._lock = threading.RLock()
+
+        # Forked children of the application attach to the process of this generation (see after_fork)
+        self.fork_mode = 'attach'
+        self.generation = RawValue('Q', 0)
+        self._attached = None
+        _instances.add(self)
+
+        # Collector socket this process serves or the collector this process sends its records to (see serve, connect)
+        self.listen_address = None
+        self.connect_address = None
+        self._listener = None
+
+    def backlog(self):
+        """Return the number of commands that were sent but were not processed by the logging process yet.
+
+        In a forked child that is attached to the logging process of its parent the records of the other processes
+        are not known, so the backlog is only an estimate. A process that is connected to a collector has no backlog,
+        sending blocks while the collector is busy.
+        """
+        if self.connect_address is not None:
+            return 0
+        return max(self.batcher.added - self._sent_offset - self.processed.value, 0)
+
+    def is_running(self):
+        """Return if the process was started and has not been stopped."""
+        return self.process is not None or self._attached is not None or self.connect_address is not None
+
+    def start(self):
+        """Start running the separate process which does the actual logging."""
+        with self._lock:
+            self.stop()
+            self._sent_offset = self.batcher.added
+            self._crashes = 0
+            self._spawn()
+            atexit.register(self.stop)
+
+    def _spawn(self):
+        """Create the separate Process. It replays CONFIGS and the configuration commands before any record."""
+        self.processed.value = 0
+        self.process_alive.set()
+        process = Process(name=self.name, target=run_process,
+                          args=(self.process_alive, self.process_queue),
+                          kwargs={'configs': CONFIGS, 'commands': list(self.commands),
+                                  'liveness_interval': self.liveness_interval,
+                                  'processed': self.processed, 'replies': self.replies,
+                                  'listener': self._listener})
+        process.daemon = True
+        global _spawning
+        _spawning += 1
+        try:
+            process.start()
+        finally:
+            _spawning -= 1
+        self.process = process  # Barriers and forked children only see a started process
+        self.generation.value += 1
+
+        self._started_at = time.monotonic()
+
+        self._reply_thread = threading.Thread(target=self._run_replies, args=(self.replies,),
+                                              name=self.name + '-replies', daemon=True)
+        self._reply_thread.start()
+        threading.Thread(target=self._supervise, args=(self.process,), name=self.name + '-supervisor',
+                         daemon=True).start()
+
+    def _supervise(self, process):
+        """Wait for the process to exit and restart it if it was not stopped."""
+        wait([process.sentinel])
+        process.join()
+        if self.restart:
+            self._restart(process)
+
+    def _restart(self, process, backoff=True):
+        """Restart a crashed logging process with a new transport and send a note of the lost commands.
+
+        The commands that were in the transport or being run are lost. Batched commands that were not sent yet are
+        sent to the new process.
+        """
+        with self._lock:
+            if self.process is not process or not self.process_alive.is_set():
+                return  # Stopped or already restarted
+            if self._crashed is not process:
+                self._crashed = process
+                if time.monotonic() - self._started_at >= self.max_restart_delay:
+                    self._crashes = 0
+                self._crashes += 1
+
+                with self.batcher._lock:
+                    pending = self.batcher._count
+                    self._lost = max(self.batcher.added - pending - self._sent_offset - self.processed.value, 0)
+                    self._replace_queues()
+                    self._sent_offset = self.batcher.added - pending
+                    self.processed.value = 0
+
+                self.lost += self._lost
+                self.errors.append({'command': 'restart', 'exitcode': process.exitcode, 'lost': self._lost,
+                                    'time': time.time(),
+                                    'error': 'Logging process %s exited with code %s' % (self.name, process.exitcode)})
+            delay = min(self.restart_delay * 2 ** (self._crashes - 1), self.max_restart_delay)
+
+        if backoff:
+            time.sleep(delay)
+        with self._lock:
+            if self.process is not process:
+                return
+            self._spawn()
+            self.restarts += 1
+            msg = 'Logging process %s exited with code %s and was restarted. %d commands were lost.'
+            self.batcher.add([None, 'broadcast', (capture_record(
+                'plogging', logging.WARNING, msg, (self.name, process.exitcode, self._lost),
+                extra={'plogging_restarts': self.restarts, 'plogging_lost': self._lost}),), {}])
+
+    def stop(self, timeout=None):
+        """Stop running the process.
+
+        Every command that was sent before stop is run before the process exits. If the process does not finish in
+        timeout seconds it is terminated and the commands it did not run are abandoned.
+
+        Warning:
+            This will also stop the logging for every logger using this process.
+
+        Args:
+            timeout (float)[None]: Maximum seconds to wait. Default shutdown_timeout (None waits forever).
+
+        Returns:
+            report (dict): None if the process was not running, else {'sent': commands sent to the process,
+                'flushed': commands run during the shutdown, 'abandoned': commands that were not run,
+                'terminated': True if the process had to be terminated}
+        """
+        with self._lock:
+            return self._stop(timeout)
+
+    def _stop(self, timeout):
+        try:
+            atexit.unregister(self.stop)
+        except:
+            pass
+        if self._attached is not None or self.connect_address is not None:
+            # The parent or the collector owns the logging process. Only send the records of this process.
+            sender = threading.Thread(target=self._send_all, name=self.name + '-stop', daemon=True)
+            sender.start()
+            sender.join(self.shutdown_timeout if timeout is None else timeout)
+            self._attached = None
+            if self.connect_address is not None:
+                self.process_queue.close()
+            return None
+        if self.process is None:
+            return None
+        if self.restart and self.process.exitcode not in (None, 0):
+            self._restart(self.process, backoff=False)  # Run the waiting commands before stopping
+
+        if timeout is None:
+            timeout = self.shutdown_timeout
+        deadline = None if timeout is None else time.monotonic() + timeout
+        processed = self.processed.value
+
+        # Send the held and batched records. This waits while a full transport has no room.
+        sender = threading.Thread(target=self._send_all, name=self.name + '-stop', daemon=True)
+        sender.start()
+        sender.join(timeout)
+        sent = self.batcher.added - self._sent_offset
+
+        remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+        terminated = stop_process(self.process, self.process_alive, self.process_queue, remaining,
+                                  None if sender.is_alive() else sent)
+        report = {'sent': sent, 'flushed': self.processed.value - processed,
+                  'abandoned': max(sent - self.processed.value, 0), 'terminated': terminated}
+        exitcode = self.process.exitcode
+        self.process = None
+        self.generation.value += 1  # Attached children stop sending to this process
+        if exitcode == 0:
+            self._stop_replies()
+        else:
+            self._replace_queues()
+        if terminated and logging.raiseExceptions:
+            sys.stderr.write('--- Logging error ---\nLogging process %s did not stop in %s seconds and was '
+                             'terminated. %d of %d commands were abandoned.\n'
+                             % (self.name, timeout, report['abandoned'], sent))
+        return report
+
+    def _replace_queues(self):
+        """Replace the transport and the reply queue after the logging process was terminated or crashed.
+
+        The process may have died holding a lock of either queue or in the middle of a message, so the old queues
+        are abandoned without waiting for them.
+        """
+        old_queues = (self.process_queue, self.replies)
+        self._reply_thread = None
+        self.process_queue = TRANSPORTS[self.transport](**(self.transport_options or {}))
+        self.batcher.put = self.process_queue.put_nowait
+        self.replies = Queue()
+        for old in old_queues:
+            cancel_join_thread = getattr(old, 'cancel_join_thread', None)
+            if cancel_join_thread is not None:
+                cancel_join_thread()
+        with self._replied:
+            self._replied.notify_all()
+
+    def _send_all(self):
+        SENDER.flush(all_threads=True)
+        self._release_held(force=True)
+        self.batcher.flush()
+
+    def close(self):
+        """Stop the process and release the transport. The LogProcess cannot be used after it is closed."""
+        self.stop()
+        self._close_listener()
+        self.process_queue.close()
+        self.replies.close()
+
+    def serve(self, address):
+        """Make the logging process a collector that also runs the records of the processes connected to address.
+
+        The Unix domain socket is bound here, so processes can connect as soon as this returns, and it is kept when
+        the logging process is restarted. The logging process is started (again). See plogging.collector.
+
+        Args:
+            address (str): Path of the socket.
+        """
+        with self._lock:
+            self._close_listener()
+            self._listener = create_listener(address)
+            self.listen_address = address
+            self.start()
+
+    def _close_listener(self):
+        listener, self._listener = self._listener, None
+        if listener is not None:
+            listener.close()
+            if self.listen_address is not None and os.path.exists(self.listen_address):
+                os.unlink(self.listen_address)
+        self.listen_address = None
+
+    def connect(self, address):
+        """Send the records to the collector that serves address instead of a logging process of this process.
+
+        The running logging process is stopped. Only the records and barriers are run by the collector, it has its own
+        configuration.
+
+        Args:
+            address (str): Path of the socket of the collector. None starts a logging process of this process again
+                with the next record.
+        """
+        with self._lock:
+            self.stop()
+            self.connect_address = address
+            if address is None:
+                self._new_transport()
+            else:
+                self.process_queue = SocketTransport(address)
+                self.batcher.put = self.process_queue.put_nowait
+                self._sent_offset = self.batcher.added
+
+    def put(self, command):
+        """Queue a [logger_name, cmd, args, kwargs] command or compact record to run in the separate process.
+
+        Commands are batched. Use flush() to send the waiting commands right away. A forked child that is attached to
+        the logging process of its parent does not send configuration commands (setLevel, addHandler,
+        configureHandler, ...), they would change the handlers of every process. They are replayed when the child
+        starts its own logging process.
+        """
+        if self._attached is not None and type(command) is list and command[1] in ATTACHED_SKIPPED:
+            return
+        if self.process is None and self._attached is None and self.connect_address is None:
+            with self._lock:
+                if self.process is None and self._attached is None and self.connect_address is None:
+                    self.start()
+        self.batcher.add(command)
+
+    def flush(self):
+        """Send the batched commands to the separate process."""
+        self.batcher.flush()
+
+    def barrier(self, timeout=None):
+        """Wait until every command that was sent before was run and the handlers of the logging process were flushed.
+
+        Args:
+            timeout (float)[None]: Maximum seconds to wait. None waits forever.
+
+        Returns:
+            success (bool): False if the logging process did not reply within timeout seconds or stopped.
+        """
+        if self._attached is not None:
+            return self._barrier_attached(timeout)
+        if self.connect_address is not None:
+            return self._barrier_connected(timeout)
+        if self.process is None:
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        self._release_held(force=True)
+        with self._barrier_lock:
+            self._barriers += 1
+            token = self._barriers
+            self.batcher.add([None, 'barrier', (token,), {}])
+        self.batcher.flush()
+
+        with self._replied:
+            while self._acked < token:
+                process = self.process
+                if process is None or not process.is_alive():
+                    return self._acked >= token
+                interval = self.liveness_interval
+                if deadline is not None:
+                    interval = min(interval, deadline - time.monotonic())
+                    if interval <= 0:
+                        return False
+                self._replied.wait(interval)
+        return True
+
+    def _barrier_attached(self, timeout):
+        """Barrier of a forked child. The reply queue is read by the parent, so the ack comes on a datagram socket."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        self._release_held(force=True)
+
+        directory = tempfile.mkdtemp(prefix='plogging-')
+        address = os.path.join(directory, 'barrier')
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        try:
+            sock.bind(address)
+            with self._barrier_lock:
+                self._barriers += 1
+                self.batcher.add([None, 'barrier', (self._barriers, address), {}])
+            self.batcher.flush()
+
+            while True:
+                if self.generation.value != self._attached:
+                    return False  # The logging process of the parent stopped
+                interval = self.liveness_interval
+                if deadline is not None:
+                    interval = min(interval, deadline - time.monotonic())
+                    if interval <= 0:
+                        return False
+                sock.settimeout(interval)
+                try:
+                    sock.recv(32)
+                    return True
+                except socket.timeout:
+                    pass
+        finally:
+            sock.close()
+            try:
+                os.unlink(address)
+            except OSError:
+                pass
+            os.rmdir(directory)
+
+    def _barrier_connected(self, timeout):
+        """Barrier of a process that is connected to a collector. The ack comes back on the connection."""
+        self._release_held(force=True)
+        with self._barrier_lock:
+            self._barriers += 1
+            token = self._barriers
+            self.batcher.add([None, 'barrier', (token,), {}])
+        self.batcher.flush()
+        return self.process_queue.wait_flushed(token, timeout, self.liveness_interval)
+
+    async def barrier_async(self, timeout=None):
+        """Wait for barrier(timeout) in the default executor of the running event loop."""
+        return await asyncio.get_running_loop().run_in_executor(None, self.barrier, timeout)
+
+    def _run_replies(self, replies):
+        """Read the messages from the logging process until the None sentinel or the queue is replaced."""
+        while True:
+            try:
+                msg = replies.get(timeout=self.liveness_interval)
+            except queue.Empty:
+                if replies is not self.replies:
+                    break
+                continue
+            except Exception:
+                break
+            if msg is None:
+                break
+            self._handle_reply(msg)
+
+    def _handle_reply(self, msg):
+        kind, value = msg
+        if kind == 'flushed':
+            with self._replied:
+                self._acked = max(self._acked, value)
+                self._replied.notify_all()
+        elif kind == 'stats':
+            self.last_stats = value
+            self._check_health(value)
+        elif kind == 'error':
+            self.errors.append(value)
+
+    def _check_health(self, report):
+        """Call the health callback once for every handler that has been failing for unhealthy_after seconds."""
+        failing = set()
+        for handler in report['handlers']:
+            since = handler['failing_since']
+            if since is not None and report['time'] - since >= self.unhealthy_after:
+                key = (handler['name'], since)
+                failing.add(key)
+                if key not in self._unhealthy and self.health_callback is not None:
+                    try:
+                        self.health_callback(self, handler)
+                    except Exception:
+                        if logging.raiseExceptions:
+                            sys.stderr.write('--- Logging error ---\n')
+                            traceback.print_exc(file=sys.stderr)
+        self._unhealthy = failing
+
+    def stats(self):
+        """Return the last stats of the logging process as a dict.
+
+        The logging process sends its stats every liveness_interval seconds: pid, processed, lag (seconds between
+        logging the last record and handling it), rss (bytes), cpu_time, cpu_percent and handlers (emitted, errors,
+        avg_time, max_time, last_error and failing_since of every handler). The parent adds name, running, sent,
+        backlog and the last errors of commands and handlers.
+        """
+        stats = dict(self.last_stats or {'handlers': []})
+        stats.update(name=self.name, running=self.is_running(), sent=self.batcher.added - self._sent_offset,
+                     backlog=self.backlog(), errors=list(self.errors))
+        return stats
+
+    def _stop_replies(self):
+        """Stop reading replies after the logging process exited. Waiting barriers return."""
+        thread, self._reply_thread = self._reply_thread, None
+        if thread is not None:
+            self.replies.put(None)
+            thread.join(1.0)
+        with self._replied:
+            self._replied.notify_all()
+
+    def after_fork(self):
+        """Reset this LogProcess in a forked child of the application.
+
+        With the 'attach' fork_mode a child that is forked while the logging process runs sends its records to the
+        same logging process through the shared transport, so forking N workers does not start N logging processes.
+        Only the parent stops the logging process. When the parent stops or restarts it, the child starts its own
+        logging process with the next record. With the 'new' fork_mode (or when nothing was running) the child gets
+        a new transport and starts its own logging process with its first record.
+
+        A process that is connected to a collector opens its own connection. The collector socket of the parent is
+        closed in the child.
+
+        This is called for every LogProcess by an os.register_at_fork hook.
+        """
+        running = self.process is not None or self._attached is not None
+        attached = self._attached if self.process is None else self.generation.value
+
+        if self.process is not None:
+            mp_process._children.discard(self.process)  # Only the parent can join the logging process
+        self.process = None
+        self._lock = threading.RLock()
+        self._holding = set()
+        self._holding_lock = threading.Lock()
+        self._release_thread = None
+        self._replied = threading.Condition()
+        self._reply_thread = None
+        self._barrier_lock = threading.Lock()
+        self.last_stats = None
+        self.errors.clear()
+        self.batcher.after_fork()
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+            self.listen_address = None
+
+        if self.connect_address is not None:
+            self._attached = None  # The SocketTransport connects again in this process
+        elif running and self.fork_mode == 'attach':
+            after_fork = getattr(self.process_queue, '_after_fork', None)  # multiprocessing.Queue feeder state
+            if after_fork is not None:
+                after_fork()
+            self._attached = attached
+            self._sent_offset = self.batcher.added
+            self.batcher.put = self._put_attached
+        else:
+            self._attached = None
+            self._new_transport()
+
+    def _new_transport(self):
+        """Create the transport and shared state for a logging process of this process."""
+        self.process_queue = TRANSPORTS[self.transport](**(self.transport_options or {}))
+        self.batcher.put = self.process_queue.put_nowait
+        self.replies = Queue()
+        self.process_alive = Event()
+        self.processed = RawValue('Q', 0)
+        self.generation = RawValue('Q', 0)
+        self._sent_offset = self.batcher.added
+
+    def _put_attached(self, batch):
+        """Send a batch to the logging process of the parent or start a logging process if the parent stopped it."""
+        if self.generation.value != self._attached:
+            self._attached = None
+            self._new_transport()
+            self.start()
+        self.process_queue.put_nowait(batch)
+
+    def hold(self, policy):
+        """Register an OverflowPolicy that holds records until the backlog has room."""
+        with self._holding_lock:
+            self._holding.add(policy)
+            if self._release_thread is None:
+                self._release_thread = threading.Thread(target=self._run_release, name=self.name + '-release',
+                                                        daemon=True)
+                self._release_thread.start()
+
+    def _release_held(self, force=False):
+        """Send the records that are held by overflow policies. With force the records that async loggers logged
+        before are sent first (see plogging.aio)."""
+        if force:
+            SENDER.flush()
+        with self._holding_lock:
+            holding = list(self._holding)
+        for policy in holding:
+            policy.release(self, force)
+            with self._holding_lock:
+                if not policy.is_holding():
+                    self._holding.discard(policy)
+
+    def _run_release(self):
+        while True:
+            self._release_held()
+            with self._holding_lock:
+                if not self._holding:
+                    self._release_thread = None
+                    return
+            time.sleep(0.001)
+
+
+# LogProcess instances that are reset in a forked child and the number of logging processes being started
+_instances = weakref.WeakSet()
+_spawning = 0
+
+
+def _after_fork_in_child():
+    if _spawning:
+        return  # This is a new logging process. It does not use the LogProcess objects.
+    for proc in list(_instances):
+        proc.after_fork()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
@@ -1,16 +1,31 @@
-import atexit
+import asyncio
+import logging
+import warnings
+from logging import NOTSET, DEBUG, INFO, WARNING, ERROR, CRITICAL
+from multiprocessing import freeze_support
 
-from multiprocessing import Queue, Process, Event, freeze_support
+from .config import basicConfig
+from .record import capture_record
+from .overflow import OverflowPolicy
+from .serialize import SerializationPolicy, OutOfBand
+from .aio import SENDER
+from .ratelimit import RateLimitPolicy
 
-from .log_process import stop_process, run_process
-from .config import CONFIGS, basicConfig
-
-__all__ = ['basicConfig', 'Logger']
+__all__ = ['basicConfig', 'Logger', 'RECORD_COMMANDS', 'CONFIG_COMMANDS', 'LOGGER_COMMANDS']
 
 
 freeze_support()
 
 
+# Commands that create a log record. Every other command configures the logger (addHandler, setLevel, ...).
+RECORD_COMMANDS = frozenset(['debug', 'info', 'warning', 'warn', 'error', 'exception', 'critical', 'fatal', 'log'])
+
+# Commands that configure a logger. They are replayed by a logging process that starts later. Every other command
+# (handle, callHandlers, ...) is only sent to the running process of the logger like a record.
+CONFIG_COMMANDS = frozenset(['setLevel', 'addHandler', 'removeHandler', 'addFilter', 'removeFilter',
+                             'setLogRecordFactory'])
+
+
 class Logger(object):
 
     root = None
@@ -18,55 +33,353 @@ class Logger(object):
 
     def __init__(self, name=None, level=None):
         self.name = name
-        self.process_alive = Event()
-        self.process_queue = Queue()
-        self.process = None
-        # self.start_process()
+        self.parent = None
+        self.level = NOTSET
+        self.overflow = None
+        self.serialization = None
+        self.async_mode = None
+        self.rate_limit = None
+        self._cache = {}
+        self._log_process = None
 
         if level is not None:
             self.setLevel(level)
 
+    @property
+    def process(self):
+        """Return the LogProcess that runs this logger's records.
+
+        Every logger shares the Manager's process pool unless it was pinned with Manager.pinLogger.
+        """
+        if self._log_process is None:
+            self._log_process = self.manager.getProcess(self.name)
+        return self._log_process
+
     def start_process(self):
-        """Start running the separate process which does the actual logging."""
-        self.stop_process()
-
-        # Create the separate Process
-        self.process_alive.set()
-        self.process = Process(name="Logger-"+self.name, target=run_process,
-                               args=(self.process_alive, self.process_queue, self.name),
-                               kwargs={'configs': CONFIGS})
-        self.process.daemon = True
+        """Start (or restart) running the separate process which does the actual logging for this logger."""
         self.process.start()
 
-        atexit.register(self.stop_process)
-
     def stop_process(self):
         """Stop running the process.
 
         Warning:
-            This will also stop the logging
+            This will also stop the logging for every logger that shares the process.
         """
-        try:
-            atexit.unregister(self.stop_process)
-        except:
-            pass
-        stop_process(self.process, self.process_alive, self.process_queue)
+        return self.process.stop()
+
+    def flush(self, timeout=None):
+        """Wait until every record that was logged before was emitted and the handlers were flushed.
+
+        Use this before a checkpoint or before forking. The logging process keeps running.
+
+        Args:
+            timeout (float)[None]: Maximum seconds to wait. None waits forever.
+
+        Returns:
+            success (bool): False if the logging process did not finish within timeout seconds.
+        """
+        return self.process.barrier(timeout)
+
+    async def flush_async(self, timeout=None):
+        """Awaitable flush that does not block the event loop."""
+        SENDER.end_tick()
+        return await self.process.barrier_async(timeout)
+
+    async def aclose(self, timeout=None):
+        """Awaitable stop_process. Every record that was logged before is written.
+
+        Warning:
+            This will also stop the logging for every logger that shares the process.
+
+        Args:
+            timeout (float)[None]: Maximum seconds to wait. Default LogProcess.shutdown_timeout.
+        """
+        SENDER.end_tick()
+        return await asyncio.get_running_loop().run_in_executor(None, self.process.stop, timeout)
+
+    def stats(self):
+        """Return the stats of the logging process of this logger (see LogProcess.stats)."""
+        return self.process.stats()
+
+    def _inherit(self, attr, default):
+        """Return the attr of this logger or its nearest parent where it is not None, else default."""
+        logger = self
+        while logger:
+            value = getattr(logger, attr)
+            if value is not None:
+                return value
+            logger = logger.parent
+        return default
 
     def _add_command(self, cmd, *args, **kwargs):
-        if not self.process:
-            self.start_process()
-        self.process_queue.put_nowait([cmd, args, kwargs])
+        self.manager.sendCommand(self.name, cmd, args, kwargs)
+
+    def _log(self, level, msg, args, exc_info=None, extra=None, stack_info=False, stacklevel=1):
+        """Capture the record in this process and send it to the logging process."""
+        try:
+            rate_limit = self._cache['rate_limit']
+        except KeyError:
+            rate_limit = self._cache['rate_limit'] = self.getRateLimit()
+        if rate_limit is not None and not rate_limit.allow(self, level, msg):
+            return
+
+        try:
+            serialization = self._cache['serialization']
+        except KeyError:
+            serialization = self._cache['serialization'] = self.getSerializationPolicy()
+        if serialization is not None:
+            msg, args = serialization.prepare(msg, args)
+
+        record = capture_record(self.name, level, msg, args, exc_info, extra, stack_info, stacklevel)
+        try:
+            async_mode = self._cache['async']
+        except KeyError:
+            async_mode = self._cache['async'] = self.getAsyncMode()
+        if async_mode and SENDER.add(self, record):
+            return
+        self._send(record)
+
+    def _send(self, record):
+        """Send a captured record to the logging process with the overflow policy."""
+        process = self._log_process or self.process
+        try:
+            policy = self._cache['overflow']
+        except KeyError:
+            policy = self._cache['overflow'] = self.getOverflowPolicy()
+        if policy is None:
+            process.put(record)
+        else:
+            policy.put(process, record)
+
+    def setOverflowPolicy(self, policy=None, capacity=None, **options):
+        """Limit the number of records from this logger and its children that wait for the logging process.
+
+        Example:
+
+            logger.setOverflowPolicy('drop_oldest', 10000)
+            logger.setOverflowPolicy('spill', 10000, spill_path='app.spill')
+            logger.setOverflowPolicy(None)  # Use the policy of the parent logger
+
+        Args:
+            policy (str/OverflowPolicy)[None]: Policy name (see plogging.overflow.POLICIES) or OverflowPolicy.
+            capacity (int)[None]: Maximum number of records waiting for the logging process.
+            **options (dict): timeout, level, sample_rate or spill_path options for the OverflowPolicy.
+        """
+        if isinstance(policy, str):
+            if capacity is None:
+                raise ValueError('An overflow policy needs a capacity')
+            policy = OverflowPolicy(capacity, policy, **options)
+        self.overflow = policy
+        self.manager._clear_cache()
+
+    def getOverflowPolicy(self):
+        """Return the OverflowPolicy of this logger, its nearest parent with a policy or the Manager default."""
+        return self._inherit('overflow', self.manager.overflow)
+
+    def setSerializationPolicy(self, policy=None, **options):
+        """Set how the args of the records from this logger and its children are sent to the logging process.
+
+        Example:
+
+            logger.setSerializationPolicy('format', max_size=1024)
+            logger.setSerializationPolicy('oob')
+            logger.setSerializationPolicy(None)  # Use the policy of the parent logger
+
+        Args:
+            policy (str/SerializationPolicy)[None]: Mode name (see plogging.serialize.MODES) or SerializationPolicy.
+            **options (dict): max_size option for the SerializationPolicy.
+        """
+        if isinstance(policy, str):
+            policy = SerializationPolicy(policy, **options)
+        self.serialization = policy
+        self.manager._clear_cache()
+
+    def getSerializationPolicy(self):
+        """Return the SerializationPolicy of this logger, its nearest parent with a policy or the Manager default."""
+        return self._inherit('serialization', self.manager.serialization)
+
+    def setRateLimit(self, policy=None, **options):
+        """Limit the records of every message template of this logger and its children before they are captured.
+
+        Example:
+
+            logger.setRateLimit('first', rate=10)  # The first 10 records of every template per second
+            logger.setRateLimit('token_bucket', rate=100, burst=1000)
+            logger.setRateLimit('ratio', ratio=0.001, level=logging.ERROR)
+            logger.setRateLimit(None)  # Use the policy of the parent logger
+
+        Args:
+            policy (str/RateLimitPolicy)[None]: Mode name (see plogging.ratelimit.MODES) or RateLimitPolicy.
+            **options (dict): rate, burst, ratio, interval, level, summary or max_templates options for the
+                RateLimitPolicy.
+        """
+        if isinstance(policy, str):
+            policy = RateLimitPolicy(policy, **options)
+        self.rate_limit = policy
+        self.manager._clear_cache()
+
+    def getRateLimit(self):
+        """Return the RateLimitPolicy of this logger, its nearest parent with a policy or the Manager default."""
+        return self._inherit('rate_limit', self.manager.rateLimit)
+
+    def setAsyncMode(self, enabled=True):
+        """Never block a running asyncio event loop when logging from it with this logger and its children.
+
+        The records that are logged in an event loop are captured and handed to a thread once per loop tick, which
+        sends them with the overflow policy (see plogging.aio). Use flush_async and aclose to wait for them.
+
+        Args:
+            enabled (bool)[True]: Use async mode. None uses the mode of the parent logger.
+        """
+        self.async_mode = enabled
+        self.manager._clear_cache()
+
+    def getAsyncMode(self):
+        """Return the async mode of this logger, its nearest parent with a mode or the Manager default."""
+        return self._inherit('async_mode', self.manager.asyncMode)
+
+    def setLevel(self, level):
+        """Set the logging level of this logger. level must be an int or a str."""
+        self.level = logging._checkLevel(level)
+        self.manager._clear_cache()
+        self._add_command('setLevel', level)
+
+    def getEffectiveLevel(self):
+        """Get the effective level for this logger.
+
+        Loop through this logger and its parents in the logger hierarchy, looking for a non-zero logging level.
+        If no level was set with setLevel use the level of the logging.Logger in this process, which is configured
+        by basicConfig, fileConfig and dictConfig the same way as the logger in the separate process.
+        """
+        logger = self
+        while logger:
+            if logger.level:
+                return logger.level
+            logger = logger.parent
+
+        if self.name is None or self.name == 'root':
+            return logging.root.getEffectiveLevel()
+        return logging.getLogger(self.name).getEffectiveLevel()
+
+    def isEnabledFor(self, level):
+        """Is this logger enabled for level 'level'?
+
+        Records that are not enabled are dropped in this process without being sent to the logging process.
+        """
+        try:
+            return self._cache[level]
+        except KeyError:
+            if self.manager.disable >= level:
+                is_enabled = self._cache[level] = False
+            else:
+                is_enabled = self._cache[level] = (level >= self.getEffectiveLevel())
+            return is_enabled
+
+    def debug(self, msg, *args, exc_info=None, extra=None, stack_info=False, stacklevel=1):
+        """Log 'msg % args' with severity 'DEBUG'."""
+        if self.isEnabledFor(DEBUG):
+            self._log(DEBUG, msg, args, exc_info, extra, stack_info, stacklevel)
+
+    def info(self, msg, *args, exc_info=None, extra=None, stack_info=False, stacklevel=1):
+        """Log 'msg % args' with severity 'INFO'."""
+        if self.isEnabledFor(INFO):
+            self._log(INFO, msg, args, exc_info, extra, stack_info, stacklevel)
+
+    def warning(self, msg, *args, exc_info=None, extra=None, stack_info=False, stacklevel=1):
+        """Log 'msg % args' with severity 'WARNING'."""
+        if self.isEnabledFor(WARNING):
+            self._log(WARNING, msg, args, exc_info, extra, stack_info, stacklevel)
+
+    def warn(self, msg, *args, **kwargs):
+        warnings.warn("The 'warn' method is deprecated, "
+                      "use 'warning' instead", DeprecationWarning, 2)
+        self.warning(msg, *args, **kwargs)
+
+    def error(self, msg, *args, exc_info=None, extra=None, stack_info=False, stacklevel=1):
+        """Log 'msg % args' with severity 'ERROR'."""
+        if self.isEnabledFor(ERROR):
+            self._log(ERROR, msg, args, exc_info, extra, stack_info, stacklevel)
+
+    def exception(self, msg, *args, exc_info=True, extra=None, stack_info=False, stacklevel=1):
+        """Convenience method for logging an ERROR with exception information."""
+        if self.isEnabledFor(ERROR):
+            self._log(ERROR, msg, args, exc_info, extra, stack_info, stacklevel)
+
+    def critical(self, msg, *args, exc_info=None, extra=None, stack_info=False, stacklevel=1):
+        """Log 'msg % args' with severity 'CRITICAL'."""
+        if self.isEnabledFor(CRITICAL):
+            self._log(CRITICAL, msg, args, exc_info, extra, stack_info, stacklevel)
+
+    fatal = critical
+
+    def log(self, level, msg, *args, exc_info=None, extra=None, stack_info=False, stacklevel=1):
+        """Log 'msg % args' with the integer severity 'level'."""
+        if not isinstance(level, int):
+            if logging.raiseExceptions:
+                raise TypeError("level must be an integer")
+            else:
+                return
+        if self.isEnabledFor(level):
+            self._log(level, msg, args, exc_info, extra, stack_info, stacklevel)
+
+    def log_data(self, name, data, level=INFO):
+        """Log binary data (bytes, bytearray, memoryview or any buffer) without formatting it to text.
+
+        The data is sent to the logging process as a pickle protocol 5 out-of-band buffer (see
+        plogging.serialize.OutOfBand). It is copied into the batch and through the transport like the other records,
+        but it is never pickled or formatted. In the logging process the record has the attributes data_name and data
+        (bytes) and the message 'data <name> (<size> bytes)'. Use plogging.handlers.BinaryFileHandler to write the
+        data to a file.
+
+        The data is copied before log_data returns, so the buffer can be changed right away. A record that waits in
+        an async mode tick or in a 'drop_oldest' OverflowPolicy copies the data once more (see
+        plogging.serialize.detach_buffers).
+
+        Args:
+            name (str): Name of the data stream.
+            data (bytes/bytearray/memoryview): Binary data. A buffer that is not contiguous is copied first.
+            level (int)[INFO]: Level of the record.
+        """
+        if self.isEnabledFor(level):
+            view = memoryview(data)
+            if not view.c_contiguous:
+                view = memoryview(view.tobytes())
+            self._log(level, 'data %s (%d bytes)', (name, view.nbytes), None,
+                      {'data_name': name, 'data': OutOfBand(view)})
+
+    def getChild(self, suffix):
+        """Return the logger that is a descendant of this logger."""
+        if self.name is None or self.name == 'root':
+            return self.manager.getLogger(suffix)
+        return self.manager.getLogger('.'.join((self.name, suffix)))
 
     def __getattr__(self, item):
-        """If an attribute is not found assume it is a logging.Logger attribute and make that a command to be run in
-        the separate process.
+        """If an attribute is not found make it a command to be run with the logging.Logger in the separate process.
+
+        The logging.Logger methods are commands on the class (see LOGGER_COMMANDS), so this only runs for other names.
         """
+        if item.startswith('__'):
+            raise AttributeError(item)
+
         def func(*args, **kwargs):
             self._add_command(item, *args, **kwargs)
         return func
 
-    def __del__(self):
-        try:
-            self.stop_process()
-        except:
-            pass
+
+def _make_command(cmd):
+    """Return a Logger method that runs the logging.Logger method cmd in the separate process."""
+    def command(self, *args, **kwargs):
+        self.manager.sendCommand(self.name, cmd, args, kwargs)
+    command.__name__ = command.__qualname__ = cmd
+    command.__doc__ = getattr(logging.Logger, cmd).__doc__
+    return command
+
+
+# Commands for the logging.Logger methods that Logger does not define (addHandler, addFilter, handle, ...). They are
+# made once at import time and kept on the class, so a call is a normal method call that does not create a closure.
+LOGGER_COMMANDS = {name: _make_command(name) for name in dir(logging.Logger)
+                   if not name.startswith('_') and name not in vars(Logger) and callable(getattr(logging.Logger, name))}
+
+for _name, _command in LOGGER_COMMANDS.items():
+    setattr(Logger, _name, _command)
+del _name, _command
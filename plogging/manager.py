@@ -1,7 +1,15 @@
 """Custom Manager that does not have locks to make it picklable."""
 
+import time
+import zlib
+
 from logging import PlaceHolder
-from .logger import Logger
+from .logger import Logger, CONFIG_COMMANDS
+from .log_process import LogProcess, TRANSPORTS, FORK_MODES, SHUTDOWN_TIMEOUT, UNHEALTHY_AFTER, RESTART_DELAY, \
+    MAX_RESTART_DELAY
+from .overflow import OverflowPolicy
+from .serialize import SerializationPolicy
+from .ratelimit import RateLimitPolicy
 
 __all__ = ['Manager']
 
@@ -22,6 +30,25 @@ class Manager(object):
         self.loggerClass = None
         self.logRecordFactory = None
 
+        # Separate logging processes shared by every logger
+        self.processCount = 1
+        self.processes = []
+        self.pinned = {}
+        self.commands = []
+        self.batchOptions = {}
+        self.transport = 'queue'
+        self.transportOptions = {}
+        self.overflow = None
+        self.serialization = None
+        self.asyncMode = False
+        self.rateLimit = None
+        self.shutdownTimeout = SHUTDOWN_TIMEOUT
+        self.healthCallback = None
+        self.unhealthyAfter = UNHEALTHY_AFTER
+        self.restartOptions = {}
+        self.forkMode = 'attach'
+        self.connectAddress = None
+
     def getLogger(self, name):
         """
         Get a logger with the specified name (channel name), creating it
@@ -67,8 +94,363 @@ class Manager(object):
         """
         Set the factory to be used when instantiating a log record with this
         Manager.
+
+        The records are rebuilt in the logging process, so the factory must be
+        picklable.
         """
         self.logRecordFactory = factory
+        self.sendCommand(None, 'setLogRecordFactory', (factory,))
+
+    def setProcessCount(self, count):
+        """
+        Set the number of logging processes shared by the loggers that are not
+        pinned. Records are routed to a process by logger name, so the records
+        of one logger always stay in order.
+
+        Every process receives the configuration commands (addHandler, setLevel,
+        ...) of every logger. Use more than one process only with handlers that
+        can safely be opened by several processes at once.
+        """
+        count = int(count)
+        if count < 1:
+            raise ValueError('The process count must be at least 1')
+        for proc in self.processes[count:]:
+            proc.close()
+        del self.processes[count:]
+        self.processCount = count
+        self._clear_cache()
+
+    def setBatchOptions(self, max_count=None, max_bytes=None, max_latency=None):
+        """
+        Set how records are coalesced before they are sent to the logging
+        processes. A batch is sent when it holds max_count records, when it
+        holds max_bytes pickled bytes or max_latency seconds after its first
+        record. Use max_count=1 to send every record on its own.
+        """
+        options = {'max_count': max_count, 'max_bytes': max_bytes, 'max_latency': max_latency}
+        options = {key: value for key, value in options.items() if value is not None}
+        self.batchOptions.update(options)
+        for proc in self.iterProcesses():
+            proc.batcher.configure(**options)
+
+    def setTransport(self, transport, **options):
+        """
+        Set the transport of the shared logging processes. 'queue' uses a
+        multiprocessing.Queue and 'ring' uses a shared memory RingBuffer. The
+        options are given to the transport (maxsize, capacity, ...).
+
+        The shared processes are stopped and restarted with the new transport
+        when the next record is logged. Pinned loggers keep their transport.
+        """
+        if transport not in TRANSPORTS:
+            raise ValueError('Invalid transport %r. Use one of %s' % (transport, ', '.join(TRANSPORTS)))
+        self.transport = transport
+        self.transportOptions = options
+        for proc in self.processes:
+            proc.close()
+        self.processes = []
+        self._clear_cache()
+
+    def setOverflowPolicy(self, policy=None, capacity=None, **options):
+        """
+        Set the default OverflowPolicy of the loggers that do not have one.
+        The arguments are the same as Logger.setOverflowPolicy. None removes
+        the limit.
+        """
+        if isinstance(policy, str):
+            if capacity is None:
+                raise ValueError('An overflow policy needs a capacity')
+            policy = OverflowPolicy(capacity, policy, **options)
+        self.overflow = policy
+        self._clear_cache()
+
+    def setSerializationPolicy(self, policy=None, **options):
+        """
+        Set the default SerializationPolicy of the loggers that do not have
+        one. The arguments are the same as Logger.setSerializationPolicy.
+        None sends the args as they are.
+        """
+        if isinstance(policy, str):
+            policy = SerializationPolicy(policy, **options)
+        self.serialization = policy
+        self._clear_cache()
+
+    def setRateLimit(self, policy=None, **options):
+        """
+        Set the default RateLimitPolicy of the loggers that do not have one.
+        The arguments are the same as Logger.setRateLimit. None removes the
+        limit.
+        """
+        if isinstance(policy, str):
+            policy = RateLimitPolicy(policy, **options)
+        self.rateLimit = policy
+        self._clear_cache()
+
+    def setAsyncMode(self, enabled=True):
+        """
+        Set the default async mode of the loggers that do not have one. In
+        async mode logging from a running asyncio event loop never blocks the
+        loop (see Logger.setAsyncMode).
+        """
+        self.asyncMode = enabled
+        self._clear_cache()
+
+    def _newProcess(self, name, transport=None, transportOptions=None):
+        if transport is None:
+            transport = self.transport
+            transportOptions = self.transportOptions
+        proc = LogProcess(name, self.commands, transport, transportOptions, **self.batchOptions)
+        proc.shutdown_timeout = self.shutdownTimeout
+        proc.health_callback = self.healthCallback
+        proc.unhealthy_after = self.unhealthyAfter
+        for key, value in self.restartOptions.items():
+            setattr(proc, key, value)
+        proc.fork_mode = self.forkMode
+        if self.connectAddress is not None:
+            proc.connect(self.connectAddress)
+        return proc
+
+    def pinLogger(self, name, transport=None, **options):
+        """
+        Run the records of the named logger and its children in a dedicated
+        logging process. Return the LogProcess.
+
+        The transport and options are the same as setTransport and default to
+        the transport of the shared processes.
+        """
+        if not isinstance(name, str):
+            raise TypeError('A logger name must be a string')
+        if transport is not None and transport not in TRANSPORTS:
+            raise ValueError('Invalid transport %r. Use one of %s' % (transport, ', '.join(TRANSPORTS)))
+        try:
+            return self.pinned[name]
+        except KeyError:
+            proc = self.pinned[name] = self._newProcess('plogging-' + name, transport, options)
+            self._clear_cache()
+            return proc
+
+    def unpinLogger(self, name):
+        """
+        Return the named logger to the shared process pool and stop its
+        dedicated process.
+        """
+        proc = self.pinned.pop(name, None)
+        if proc is not None:
+            proc.close()
+            self._clear_cache()
+
+    def getProcess(self, name):
+        """
+        Return the LogProcess that runs the records of the named logger.
+        """
+        if self.pinned:
+            substr = name
+            while substr:
+                if substr in self.pinned:
+                    return self.pinned[substr]
+                substr = substr[:max(substr.rfind('.'), 0)]
+
+        while len(self.processes) < self.processCount:
+            self.processes.append(self._newProcess('plogging-%d' % len(self.processes)))
+        if self.processCount == 1:
+            return self.processes[0]
+        return self.processes[zlib.crc32(name.encode()) % self.processCount]
+
+    def iterProcesses(self):
+        """
+        Iterate over every shared and pinned LogProcess.
+        """
+        yield from self.processes
+        yield from self.pinned.values()
+
+    def sendCommand(self, name, cmd, args=(), kwargs=None):
+        """
+        Send a command from the named logger to the logging processes.
+
+        Configuration commands (CONFIG_COMMANDS) are remembered and sent to
+        every running process, so a process that starts later replays them
+        before it handles any record. Records and every other command go to the
+        single process that serves the logger.
+        """
+        command = [name, cmd, args, kwargs or {}]
+        if cmd not in CONFIG_COMMANDS:
+            self.getProcess(name or '').put(command)
+        elif self._rememberCommand(command):
+            for proc in self.iterProcesses():
+                if proc.is_running():
+                    proc.put(command)
+
+    def _rememberCommand(self, command):
+        """
+        Add a configuration command to the commands that are replayed, so the
+        history does not grow with repeated commands. A setLevel replaces the
+        previous setLevel of the logger and a removeHandler or removeFilter
+        drops the command that added it. Return False if the command changes
+        nothing (the handler or filter was already added).
+        """
+        name, cmd, args = command[:3]
+        commands = self.commands
+        if cmd in ('addHandler', 'addFilter'):
+            if any(c[0] == name and c[1] == cmd and c[2][0] is args[0] for c in commands):
+                return False
+        elif cmd in ('removeHandler', 'removeFilter'):
+            added = 'addHandler' if cmd == 'removeHandler' else 'addFilter'
+            commands[:] = [c for c in commands if c[0] != name or c[1] != added or c[2][0] is not args[0]]
+            return True
+        elif cmd in ('setLevel', 'setLogRecordFactory'):
+            commands[:] = [c for c in commands if c[0] != name or c[1] != cmd]
+        commands.append(command)
+        return True
+
+    def configureHandler(self, name, **changes):
+        """
+        Change the level, formatter or other settings of the handler with the
+        name in every logging process in place, without closing and opening
+        it again. The settings that can be changed depend on the handler TYPE
+        (see plogging.handlers.HANDLERS). The handler configuration is
+        updated, so a restarted logging process uses the changes.
+        """
+        configs = [command[2][0] for command in self.commands
+                   if command[1] == 'addHandler' and getattr(command[2][0], 'name', None) == name]
+        if not configs:
+            raise ValueError('No handler named %r was added' % name)
+        for config in configs:
+            config.configure(**changes)
+
+        command = [None, 'configureHandler', (name, changes), {}]
+        for proc in self.iterProcesses():
+            if proc.is_running():
+                proc.put(command)
+
+    def flushProcesses(self):
+        """
+        Send the batched records of every logging process.
+        """
+        for proc in self.iterProcesses():
+            proc.flush()
+
+    def barrier(self, timeout=None):
+        """
+        Wait until every logging process ran the records that were logged
+        before and flushed its handlers. Return False if a process did not
+        finish within timeout seconds.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        success = True
+        for proc in list(self.iterProcesses()):
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+            success = proc.barrier(remaining) and success
+        return success
+
+    def stopProcesses(self, timeout=None):
+        """
+        Stop every logging process. Every record that was logged before is
+        written unless a process does not finish within timeout seconds
+        (default LogProcess.shutdown_timeout). Return the LogProcess.stop
+        reports of the processes that were running by process name.
+        """
+        reports = {}
+        for proc in self.iterProcesses():
+            report = proc.stop(timeout)
+            if report is not None:
+                reports[proc.name] = report
+        return reports
+
+    def setShutdownTimeout(self, timeout):
+        """
+        Set the maximum seconds stopping a logging process waits for its
+        records to be written before the process is terminated. None waits
+        forever.
+        """
+        self.shutdownTimeout = timeout
+        for proc in self.iterProcesses():
+            proc.shutdown_timeout = timeout
+
+    def setHealthCallback(self, callback, unhealthyAfter=UNHEALTHY_AFTER):
+        """
+        Call callback(proc, handler_stats) when a handler of a logging
+        process has been failing for unhealthyAfter seconds. The callback
+        runs in a thread of this process. None removes the callback.
+        """
+        self.healthCallback = callback
+        self.unhealthyAfter = unhealthyAfter
+        for proc in self.iterProcesses():
+            proc.health_callback = callback
+            proc.unhealthy_after = unhealthyAfter
+
+    def setRestartPolicy(self, restart=True, delay=RESTART_DELAY, maxDelay=MAX_RESTART_DELAY):
+        """
+        Set if a logging process that exits without being stopped (killed,
+        out of memory, crashed in a handler) is restarted. The new process
+        replays CONFIGS and every configuration command before it runs the
+        records that were not sent yet, and every handler gets a warning
+        record with the number of commands that were lost.
+
+        The first restart waits delay seconds and the delay doubles for every
+        crash up to maxDelay.
+        """
+        self.restartOptions = {'restart': restart, 'restart_delay': delay, 'max_restart_delay': maxDelay}
+        for proc in self.iterProcesses():
+            for key, value in self.restartOptions.items():
+                setattr(proc, key, value)
+
+    def setForkMode(self, mode):
+        """
+        Set what a forked child of the application (a gunicorn or
+        multiprocessing worker) does with the running logging processes.
+        'attach' sends the records of the child to the logging processes of
+        the parent, so N workers do not start N logging processes. Start the
+        logging processes before forking to share them. 'new' gives every
+        child its own logging processes when it logs.
+        """
+        if mode not in FORK_MODES:
+            raise ValueError('Invalid fork mode %r. Use one of %s' % (mode, ', '.join(FORK_MODES)))
+        self.forkMode = mode
+        for proc in self.iterProcesses():
+            proc.fork_mode = mode
+
+    def startProcesses(self):
+        """
+        Start every shared and pinned logging process that is not running,
+        so forked children can attach to them.
+        """
+        self.getProcess('')
+        for proc in self.iterProcesses():
+            if not proc.is_running():
+                proc.start()
+
+    def serve(self, address):
+        """
+        Make the first shared logging process a collector that also runs the
+        records of every process that connects to address (the path of a Unix
+        domain socket) with connect. Return the LogProcess.
+        """
+        self.getProcess('')
+        proc = self.processes[0]
+        proc.serve(address)
+        return proc
+
+    def connect(self, address):
+        """
+        Send the records of this process to the collector that serves address
+        instead of starting logging processes. The collector writes them with
+        its own handlers. None starts logging processes of this process again.
+        """
+        self.connectAddress = address
+        for proc in self.iterProcesses():
+            proc.connect(address)
+
+    def _clear_cache(self):
+        """
+        Clear the cached levels and process of every logger.
+        """
+        for logger in self.loggerDict.values():
+            if isinstance(logger, Logger):
+                logger._cache.clear()
+                logger._log_process = None
+        if self.root is not None:
+            self.root._cache.clear()
+            self.root._log_process = None
 
     def _fixupParents(self, alogger):
         """
@@ -0,0 +1,194 @@
+"""Bound the number of records waiting for the logging process.
+
+The backlog of a LogProcess is the number of records that were sent, but not yet processed by the logging process.
+When the backlog reaches the capacity of the logger's OverflowPolicy the policy decides what happens to new records.
+"""
+import os
+import time
+import pickle
+import random
+import tempfile
+import threading
+from collections import deque
+from logging import ERROR
+
+from .atfork import register_after_fork
+from .serialize import detach_buffers
+
+
+__all__ = ['POLICIES', 'OverflowPolicy']
+
+
+POLICIES = ('block', 'drop_newest', 'drop_oldest', 'level', 'sample', 'spill')
+
+
+class OverflowPolicy(object):
+    """What to do with a record when the logging process has a full backlog.
+
+    Policies:
+        * 'block' - Wait until the backlog has room. Drop the record after timeout seconds (None waits forever).
+        * 'drop_newest' - Drop the new record.
+        * 'drop_oldest' - Hold at most capacity records in this process and drop the oldest held record.
+        * 'level' - Drop records below level. Records at or above level are always sent.
+        * 'sample' - Send a random sample_rate fraction of the records and drop the rest.
+        * 'spill' - Write the records to spill_path and send them when the backlog has room again.
+
+    Held (drop_oldest) and spilled records are sent in order before any new record and are all sent when the
+    process is stopped.
+
+    Args:
+        capacity (int): Maximum number of records waiting for the logging process.
+        policy (str)['block']: Name of the policy in POLICIES.
+        timeout (float)[None]: Seconds the 'block' policy waits before dropping the record.
+        level (int)[ERROR]: Records at or above this level are never dropped by the 'level' policy.
+        sample_rate (float)[0.1]: Fraction of records the 'sample' policy sends.
+        spill_path (str)[None]: File the 'spill' policy appends records to. The records that are in the file already
+            are kept. Default is a temporary file that is deleted when the spilled records were sent or the policy is
+            closed.
+    """
+    def __init__(self, capacity, policy='block', timeout=None, level=ERROR, sample_rate=0.1, spill_path=None):
+        if policy not in POLICIES:
+            raise ValueError('Invalid overflow policy %r. Use one of %s' % (policy, ', '.join(POLICIES)))
+        if capacity < 1:
+            raise ValueError('The capacity must be at least 1')
+
+        self.capacity = capacity
+        self.policy = policy
+        self.timeout = timeout
+        self.level = level
+        self.sample_rate = sample_rate
+        self.spill_path = spill_path
+
+        # Counters
+        self.dropped = 0
+        self.spilled = 0
+
+        self._lock = threading.RLock()
+        self._held = deque()
+        self._spill_file = None
+        self._spill_count = 0
+        self._spill_temp = False
+        register_after_fork(self)
+
+    def __repr__(self):
+        return '<%s %s (capacity=%d, dropped=%d, spilled=%d)>' % (self.__class__.__name__, self.policy,
+                                                                  self.capacity, self.dropped, self.spilled)
+
+    def after_fork(self):
+        """Reset the policy in a forked child process. The held and spilled records belong to the parent."""
+        self._lock = threading.RLock()
+        self._held = deque()
+        self._spill_file = None
+        self._spill_count = 0
+        if self._spill_temp:
+            self.spill_path = None
+            self._spill_temp = False
+        elif self.spill_path is not None:
+            self.spill_path = '%s.%d' % (self.spill_path, os.getpid())
+
+    def close(self):
+        """Close the spill file. A temporary spill file is deleted with the records that were not sent."""
+        with self._lock:
+            self._close_spill_file()
+
+    def is_holding(self):
+        """Return if records are held or spilled and waiting to be sent."""
+        return bool(self._held) or self._spill_count > 0
+
+    def put(self, proc, record):
+        """Send the record to the LogProcess or apply the policy when its backlog is full."""
+        if not self.is_holding() and proc.backlog() < self.capacity:
+            proc.put(record)
+            return
+
+        policy = self.policy
+        if policy == 'block':
+            proc.flush()
+            deadline = None if self.timeout is None else time.monotonic() + self.timeout
+            while proc.backlog() >= self.capacity:
+                if deadline is not None and time.monotonic() >= deadline:
+                    self.dropped += 1
+                    return
+                time.sleep(0.0005)
+            proc.put(record)
+        elif policy == 'drop_newest':
+            self.dropped += 1
+        elif policy == 'level':
+            if record[2] >= self.level:
+                proc.put(record)
+            else:
+                self.dropped += 1
+        elif policy == 'sample':
+            if random.random() < self.sample_rate:
+                proc.put(record)
+            else:
+                self.dropped += 1
+        elif policy == 'drop_oldest':
+            detach_buffers(record)
+            with self._lock:
+                if len(self._held) >= self.capacity:
+                    self._held.popleft()
+                    self.dropped += 1
+                self._held.append(record)
+            proc.hold(self)
+        elif policy == 'spill':
+            with self._lock:
+                self._spill(record)
+            proc.hold(self)
+
+    def release(self, proc, force=False):
+        """Send held and spilled records while the backlog of the LogProcess has room.
+
+        Args:
+            proc (LogProcess): Process to send the records to.
+            force (bool)[False]: Send every record even if the backlog is full.
+
+        Returns:
+            is_holding (bool): True if records are still waiting to be sent.
+        """
+        with self._lock:
+            while self._held and (force or proc.backlog() < self.capacity):
+                proc.put(self._held.popleft())
+            while self._spill_count > 0 and (force or proc.backlog() < self.capacity):
+                proc.put(self._unspill())
+            return self.is_holding()
+
+    # ===== Spill file =====
+    def _spill(self, record):
+        if self._spill_file is None:
+            if self.spill_path is None:
+                fd, self.spill_path = tempfile.mkstemp(prefix='plogging-spill-', suffix='.pkl')
+                os.close(fd)
+                self._spill_temp = True
+            self._spill_file = open(self.spill_path, 'a+b')
+            self._spill_start = self._spill_read = self._spill_file.seek(0, os.SEEK_END)
+        self._spill_file.seek(0, os.SEEK_END)
+        pickle.dump(record, self._spill_file, pickle.HIGHEST_PROTOCOL)
+        self._spill_count += 1
+        self.spilled += 1
+
+    def _unspill(self):
+        self._spill_file.seek(self._spill_read)
+        record = pickle.load(self._spill_file)
+        self._spill_read = self._spill_file.tell()
+        self._spill_count -= 1
+        if self._spill_count == 0:
+            if self._spill_temp:
+                self._close_spill_file()
+            else:
+                self._spill_file.truncate(self._spill_start)
+                self._spill_read = self._spill_start
+        return record
+
+    def _close_spill_file(self):
+        if self._spill_file is not None:
+            self._spill_file.close()
+            self._spill_file = None
+        if self._spill_temp:
+            try:
+                os.remove(self.spill_path)
+            except OSError:
+                pass
+            self.spill_path = None
+            self._spill_temp = False
+        self._spill_count = 0
@@ -0,0 +1,177 @@
+"""Limit how many records of one call site are sent to the logging process.
+
+A RateLimitPolicy runs in the application process before a record is captured. Records are counted by
+(logger name, level, msg template), so a hot call site is limited without hiding the other messages of the logger.
+A suppressed record costs a dict lookup and is never formatted, pickled or sent. Every interval the number of
+suppressed records of every template is logged as one summary record.
+"""
+import time
+import threading
+
+from .atfork import register_after_fork
+from .record import capture_record
+
+
+__all__ = ['MODES', 'RateLimitPolicy']
+
+
+MODES = ('first', 'token_bucket', 'ratio')
+
+SUMMARY_MSG = 'Suppressed %d records like %r in the last %.1f seconds'
+
+# Index of the values in the state list of a template
+_LOGGER, _VALUE, _TIME, _SUPPRESSED, _SINCE = range(5)
+
+
+class RateLimitPolicy(object):
+    """Limit the records of every (logger name, level, msg template).
+
+    Modes:
+        * 'first' - Send the first rate records of every interval and suppress the rest.
+        * 'token_bucket' - Send rate records per second on average with bursts of up to burst records.
+        * 'ratio' - Send every 1 / ratio-th record (the first record is always sent).
+
+    Args:
+        mode (str)['first']: Name of the mode in MODES.
+        rate (float)[10]: Records per interval ('first') or per second ('token_bucket').
+        burst (int)[None]: Size of the token bucket. Default rate.
+        ratio (float)[0.01]: Fraction of the records the 'ratio' mode sends.
+        interval (float)[1.0]: Seconds of the 'first' window and between summaries.
+        level (int)[None]: Records at or above this level are never suppressed.
+        summary (bool)[True]: Log how many records of a template were suppressed every interval.
+        max_templates (int)[10000]: Number of templates that are counted. When more templates are logged (a message
+            that is formatted before logging) the suppressed records are summarized and the counts start over.
+    """
+    def __init__(self, mode='first', rate=10, burst=None, ratio=0.01, interval=1.0, level=None, summary=True,
+                 max_templates=10000):
+        if mode not in MODES:
+            raise ValueError('Invalid rate limit mode %r. Use one of %s' % (mode, ', '.join(MODES)))
+        if rate <= 0 or not 0 < ratio <= 1:
+            raise ValueError('The rate must be positive and the ratio between 0 and 1')
+
+        self.mode = mode
+        self.rate = rate
+        self.burst = burst if burst is not None else rate
+        self.ratio = ratio
+        self.interval = interval
+        self.level = level
+        self.summary = summary
+        self.max_templates = max_templates
+
+        # Counters
+        self.allowed = 0
+        self.suppressed = 0
+        self.summaries = 0
+
+        self._lock = threading.Lock()
+        self._templates = {}
+        self._thread = None
+        register_after_fork(self)
+
+    def __repr__(self):
+        return '<%s %s (rate=%s, allowed=%d, suppressed=%d)>' % (self.__class__.__name__, self.mode, self.rate,
+                                                                 self.allowed, self.suppressed)
+
+    def allow(self, logger, level, msg):
+        """Return if the record of the logger should be sent or count it as suppressed."""
+        if self.level is not None and level >= self.level:
+            return True
+        key = (logger.name, level, msg)
+        now = time.monotonic()
+        summaries = None
+        with self._lock:
+            try:
+                state = self._templates[key]
+            except KeyError:
+                if len(self._templates) >= self.max_templates:
+                    if self.summary:
+                        summaries = self._take_summaries(now)
+                    self._templates.clear()
+                state = self._templates[key] = self._new_state(logger, now)
+            except TypeError:
+                return True  # A msg that is not hashable is not limited
+
+            allowed = self._allow(state, now)
+            if allowed:
+                self.allowed += 1
+            else:
+                if not state[_SUPPRESSED]:
+                    state[_SINCE] = now
+                state[_SUPPRESSED] += 1
+                self.suppressed += 1
+                if self.summary and self._thread is None:
+                    self._thread = threading.Thread(target=self._run_summaries, name='plogging-ratelimit',
+                                                    daemon=True)
+                    self._thread.start()
+
+        if summaries:
+            self._send_summaries(summaries)
+        return allowed
+
+    def _new_state(self, logger, now):
+        if self.mode == 'first':
+            return [logger, 0, now, 0, None]
+        elif self.mode == 'token_bucket':
+            return [logger, self.burst, now, 0, None]
+        return [logger, 1.0, now, 0, None]
+
+    def _allow(self, state, now):
+        mode = self.mode
+        if mode == 'first':
+            if now - state[_TIME] >= self.interval:
+                state[_TIME] = now
+                state[_VALUE] = 0
+            state[_VALUE] += 1
+            return state[_VALUE] <= self.rate
+        elif mode == 'token_bucket':
+            tokens = min(self.burst, state[_VALUE] + (now - state[_TIME]) * self.rate)
+            state[_TIME] = now
+            if tokens >= 1:
+                state[_VALUE] = tokens - 1
+                return True
+            state[_VALUE] = tokens
+            return False
+
+        # ratio
+        allowed = state[_VALUE] >= 1
+        if allowed:
+            state[_VALUE] -= 1
+        state[_VALUE] += self.ratio
+        return allowed
+
+    def summarize(self):
+        """Log a summary record for every template with suppressed records now. Return the number of summaries."""
+        with self._lock:
+            summaries = self._take_summaries(time.monotonic())
+        self._send_summaries(summaries)
+        return len(summaries)
+
+    def _take_summaries(self, now):
+        """Return the summaries of the templates with suppressed records and reset their counts (holding the lock)."""
+        summaries = []
+        for (name, level, msg), state in self._templates.items():
+            if state[_SUPPRESSED]:
+                summaries.append((state[_LOGGER], level, msg, state[_SUPPRESSED], now - state[_SINCE]))
+                state[_SUPPRESSED] = 0
+        return summaries
+
+    def _send_summaries(self, summaries):
+        for logger, level, msg, count, elapsed in summaries:
+            logger._send(capture_record(logger.name, level, SUMMARY_MSG, (count, msg, elapsed), None,
+                                        {'plogging_suppressed': count, 'plogging_template': str(msg)}))
+        self.summaries += len(summaries)
+
+    def _run_summaries(self):
+        while True:
+            time.sleep(self.interval)
+            self.summarize()
+            with self._lock:
+                if not any(state[_SUPPRESSED] for state in self._templates.values()):
+                    self._thread = None
+                    return
+
+    def after_fork(self):
+        """Reset the policy in a forked child process. The counts of the parent are not summarized twice."""
+        self._lock = threading.Lock()
+        self._templates = {}
+        self._thread = None
@@ -0,0 +1,126 @@
+"""Capture log records in the application process and rebuild them in the logging process.
+
+A record is sent as a compact tuple instead of a [cmd, args, kwargs] command, so the time, caller, thread and process
+of the record describe the call site and not the logging process.
+"""
+import os
+import sys
+import time
+import pickle
+import logging
+import threading
+import traceback
+import multiprocessing
+
+
+__all__ = ['capture_record', 'make_record', 'find_caller', 'RECORD_FIELDS']
+
+
+# Fields of the compact record tuple in order
+RECORD_FIELDS = ('name', 'created', 'levelno', 'msg', 'args', 'pathname', 'lineno', 'funcName', 'thread',
+                 'threadName', 'process', 'processName', 'exc_text', 'stack_info', 'extra')
+
+
+_srcdir = os.path.normcase(os.path.dirname(os.path.abspath(__file__)))
+
+_pid = os.getpid()
+_process_name = multiprocessing.current_process().name
+
+
+def _reset_process():
+    global _pid, _process_name
+    _pid = os.getpid()
+    _process_name = multiprocessing.current_process().name
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_process)
+
+
+# Cache of code file name to True if the file is part of the plogging package
+_internal_files = {}
+
+
+def _is_internal(filename):
+    try:
+        return _internal_files[filename]
+    except KeyError:
+        is_internal = _internal_files[filename] = (os.path.dirname(os.path.normcase(filename)) == _srcdir)
+        return is_internal
+
+
+def find_caller(stack_info=False, stacklevel=1):
+    """Find the stack frame of the caller outside of the plogging package.
+
+    Returns:
+        caller (tuple): (pathname, lineno, funcName, stack_info text or None)
+    """
+    frame = sys._getframe(1)
+    while frame is not None and _is_internal(frame.f_code.co_filename):
+        frame = frame.f_back
+    while stacklevel > 1 and frame is not None and frame.f_back is not None:
+        frame = frame.f_back
+        stacklevel -= 1
+    if frame is None:
+        return '(unknown file)', 0, '(unknown function)', None
+
+    sinfo = None
+    if stack_info:
+        sinfo = 'Stack (most recent call last):\n' + ''.join(traceback.format_stack(frame)).rstrip('\n')
+    code = frame.f_code
+    return code.co_filename, frame.f_lineno, code.co_name, sinfo
+
+
+def _format_exc_info(exc_info):
+    """Return the traceback text for the exc_info argument of a logging call."""
+    if isinstance(exc_info, BaseException):
+        exc_info = (type(exc_info), exc_info, exc_info.__traceback__)
+    elif not isinstance(exc_info, tuple):
+        exc_info = sys.exc_info()
+    if exc_info[0] is None:
+        return None
+    return ''.join(traceback.format_exception(*exc_info)).rstrip('\n')
+
+
+def capture_record(name, level, msg, args, exc_info=None, extra=None, stack_info=False, stacklevel=1):
+    """Capture the metadata of a logging call as a compact tuple (see RECORD_FIELDS).
+
+    The traceback of exc_info is formatted to text here, because traceback objects cannot be pickled.
+    """
+    pathname, lineno, func, sinfo = find_caller(stack_info, stacklevel)
+    exc_text = _format_exc_info(exc_info) if exc_info else None
+    thread = threading.current_thread()
+    return (name, time.time(), level, msg, args, pathname, lineno, func, thread.ident, thread.name,
+            _pid, _process_name, exc_text, sinfo, extra)
+
+
+def make_record(compact, factory=None):
+    """Rebuild a real logging.LogRecord from a compact record tuple.
+
+    Args:
+        compact (tuple): Record tuple from capture_record.
+        factory (callable)[None]: LogRecord factory. By default use logging.getLogRecordFactory().
+    """
+    (name, created, level, msg, args, pathname, lineno, func, thread, thread_name,
+     pid, process_name, exc_text, sinfo, extra) = compact
+    if type(args) is bytes:
+        args = pickle.loads(args)  # The SerializationPolicy pickled the args to measure them
+    if factory is None:
+        factory = logging.getLogRecordFactory()
+
+    record = factory(name, level, pathname, lineno, msg, args, None, func, sinfo)
+    record.created = created
+    record.msecs = int((created - int(created)) * 1000) + 0.0
+    record.relativeCreated = (created - logging._startTime) * 1000
+    record.thread = thread
+    record.threadName = thread_name
+    record.process = pid
+    record.processName = process_name
+    record.exc_text = exc_text
+
+    if extra is not None:
+        for key in extra:
+            if (key in ["message", "asctime"]) or (key in record.__dict__):
+                raise KeyError("Attempt to overwrite %r in LogRecord" % key)
+            record.__dict__[key] = extra[key]
+    return record
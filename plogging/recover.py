@@ -0,0 +1,82 @@
+"""Read and recover the segment files written by plogging.handlers.SegmentFileHandler.
+
+Example:
+
+    python -m plogging.recover app.log            # Print the committed records of every segment
+    python -m plogging.recover app.log --summary  # Print the committed offset of every segment
+    python -m plogging.recover app.log --repair   # Truncate crashed segments to their committed records
+"""
+import os
+import sys
+import struct
+import argparse
+
+from .sinks import list_segments, read_segment, lock_segment, _CLOSED_OFFSET
+
+
+__all__ = ['recover', 'iter_records', 'main']
+
+
+def recover(filename, repair=False):
+    """Return the read_segment info of every segment of filename with its 'path' and 'active'.
+
+    Args:
+        filename (str): Base file name given to the SegmentFileHandler.
+        repair (bool)[False]: Truncate the segments that were not closed (the writer crashed) to the committed
+            records and mark them closed. A segment that a running SegmentFileHandler has open is 'active' and is
+            not repaired, truncating it would crash the writer.
+    """
+    infos = []
+    for index, path in list_segments(filename):
+        info = read_segment(path)
+        info['path'] = path
+        info['active'] = False
+        if repair and not info['closed']:
+            with open(path, 'r+b') as f:
+                if lock_segment(f):
+                    f.seek(_CLOSED_OFFSET)
+                    f.write(struct.pack('<I', 1))
+                    f.truncate(info['committed'])
+                    info['closed'] = True
+                    info['uncommitted'] = 0
+                else:
+                    info['active'] = True
+        infos.append(info)
+    return infos
+
+
+def iter_records(filename, encoding='utf-8'):
+    """Iterate over the committed records of every segment of filename in order."""
+    for index, path in list_segments(filename):
+        for record in read_segment(path)['records']:
+            yield record.decode(encoding, 'replace')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Read and recover plogging segment files.')
+    parser.add_argument('filename', help='Base file name given to the SegmentFileHandler')
+    parser.add_argument('--summary', action='store_true', help='Print the committed offset of every segment')
+    parser.add_argument('--repair', action='store_true', help='Truncate crashed segments to the committed records')
+    parser.add_argument('--encoding', default='utf-8', help='Encoding of the records')
+    args = parser.parse_args(argv)
+
+    infos = recover(args.filename, args.repair)
+    if not infos:
+        print('No segments found for %s' % os.path.abspath(args.filename), file=sys.stderr)
+        return 1
+
+    if args.summary or args.repair:
+        for info in infos:
+            print('%s: %d records, committed offset %d, %s%s' % (
+                info['path'], len(info['records']), info['committed'],
+                'closed' if info['closed'] else 'active' if info['active'] else 'open',
+                ', %d uncommitted bytes' % info['uncommitted'] if info['uncommitted'] else ''))
+    else:
+        for info in infos:
+            for record in info['records']:
+                sys.stdout.write(record.decode(args.encoding, 'replace'))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
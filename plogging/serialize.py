@@ -0,0 +1,181 @@
+"""Decide how the args of a record are sent to the logging process.
+
+By default the args are pickled as they are. A large object (an array or a dataframe that is only printed with %s) is
+pickled in full and an object that cannot be pickled loses the record. A SerializationPolicy checks the args in the
+application process and formats the message there when sending the args would be expensive or impossible.
+"""
+import sys
+import pickle
+from collections.abc import Mapping
+
+
+__all__ = ['MODES', 'SerializationPolicy', 'OutOfBand', 'detach_buffers']
+
+
+MODES = ('raw', 'format', 'oob')
+
+# Args of these types are always sent as they are
+PRIMITIVES = frozenset([type(None), bool, int, float, complex, str])
+
+
+class OutOfBand(object):
+    """Send a binary arg as a pickle protocol 5 out-of-band buffer.
+
+    The data is not pickled. The RecordBatcher copies the raw buffer into the batch after the pickled record and the
+    logging process rebuilds the arg from the received batch as bytes (bytearray stays a bytearray).
+    """
+    __slots__ = ('obj',)
+
+    def __init__(self, obj):
+        self.obj = obj
+
+    def __reduce_ex__(self, protocol):
+        cls = bytearray if isinstance(self.obj, bytearray) else bytes
+        if protocol >= 5:
+            return cls, (pickle.PickleBuffer(self.obj),)
+        return cls, (bytes(self.obj),)
+
+    def detach(self):
+        """Copy a buffer that belongs to the caller, so it can change the buffer before the record is sent."""
+        if type(self.obj) is not bytes:
+            self.obj = bytearray(self.obj) if isinstance(self.obj, bytearray) else bytes(self.obj)
+
+
+def detach_buffers(record):
+    """Detach the OutOfBand args and extra values of a compact record (see plogging.record).
+
+    The RecordBatcher copies a buffer while it is logged. A record that waits before it is batched (in an async mode
+    tick or held by an OverflowPolicy) copies the buffer first, else the caller could change it in the meantime.
+    """
+    args = record[4]
+    if type(args) is tuple:
+        for arg in args:
+            if type(arg) is OutOfBand:
+                arg.detach()
+    extra = record[14]
+    if extra:
+        for value in extra.values():
+            if type(value) is OutOfBand:
+                value.detach()
+
+
+def format_message(msg, args):
+    """Return the message of a record the same way as LogRecord.getMessage."""
+    if len(args) == 1 and isinstance(args[0], Mapping) and args[0]:
+        args = args[0]
+    return str(msg) % args
+
+
+def safe_str(obj):
+    try:
+        return str(obj)
+    except Exception:
+        return '<unprintable %s object>' % type(obj).__name__
+
+
+class SerializationPolicy(object):
+    """How the args of a record are sent to the logging process.
+
+    Modes:
+        * 'raw' - Send every arg as it is.
+        * 'format' - Send primitive args (None, bool, int, float, complex, str) as they are. Other args are pickled
+          once in this process and the pickle is sent as the args (see plogging.record.make_record), so they are not
+          pickled again. If the pickled args are larger than max_size bytes or cannot be pickled the message is
+          formatted in this process and sent without args. An arg (bytes included) whose sys.getsizeof is larger than
+          max_size is formatted without pickling it.
+        * 'oob' - Same as 'format', but binary args (bytes, bytearray, memoryview and arrays) larger than max_size
+          are sent as pickle protocol 5 out-of-band buffers instead of being formatted.
+
+    Every record is counted in one of the counters shipped (args sent as they are), formatted (message formatted in
+    this process) or out_of_band (binary args sent out-of-band).
+
+    Args:
+        mode (str)['format']: Name of the mode in MODES.
+        max_size (int)[4096]: Args larger than this many bytes are formatted or sent out-of-band.
+    """
+    def __init__(self, mode='format', max_size=4096):
+        if mode not in MODES:
+            raise ValueError('Invalid serialization mode %r. Use one of %s' % (mode, ', '.join(MODES)))
+        if mode == 'oob' and pickle.HIGHEST_PROTOCOL < 5:
+            raise ValueError('The oob mode needs pickle protocol 5 (Python 3.8)')
+
+        self.mode = mode
+        self.max_size = max_size
+
+        # Counters
+        self.shipped = 0
+        self.formatted = 0
+        self.out_of_band = 0
+
+    def __repr__(self):
+        return '<%s %s (max_size=%d, shipped=%d, formatted=%d, out_of_band=%d)>' % (
+            self.__class__.__name__, self.mode, self.max_size, self.shipped, self.formatted, self.out_of_band)
+
+    def prepare(self, msg, args):
+        """Return the (msg, args) to send to the logging process. args is a tuple or the bytes of its pickle."""
+        if self.mode == 'raw' or not args:
+            self.shipped += 1
+            return msg, args
+
+        oob = None
+        measure = []
+        for i, arg in enumerate(args):
+            if type(arg) in PRIMITIVES:
+                continue
+            if self.mode == 'oob' and self._is_binary(arg) and self._nbytes(arg) > self.max_size:
+                if oob is None:
+                    oob = list(args)
+                oob[i] = arg if hasattr(arg, '__array__') else OutOfBand(arg)
+            elif sys.getsizeof(arg) > self.max_size:
+                return self._format(msg, args)  # Rejected without pickling it
+            else:
+                measure.append(arg)
+
+        if oob is not None:
+            # The out-of-band buffers are added by the RecordBatcher, so the other args are pickled twice
+            if measure and self._dumps(tuple(measure)) is None:
+                return self._format(msg, args)
+            self.out_of_band += 1
+            return msg, tuple(oob)
+
+        if measure:
+            data = self._dumps(args)
+            if data is None:
+                return self._format(msg, args)
+            args = data
+        self.shipped += 1
+        return msg, args
+
+    def _dumps(self, args):
+        """Return the pickle of the args tuple or None if it is larger than max_size or cannot be pickled."""
+        try:
+            data = pickle.dumps(args, pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            return None
+        if len(data) > self.max_size:
+            return None
+        return data
+
+    @staticmethod
+    def _is_binary(arg):
+        if isinstance(arg, (bytes, bytearray)):
+            return True
+        try:
+            with memoryview(arg) as view:
+                return view.c_contiguous
+        except (TypeError, ValueError):
+            return False
+
+    @staticmethod
+    def _nbytes(arg):
+        with memoryview(arg) as view:
+            return view.nbytes
+
+    def _format(self, msg, args):
+        """Format the message in this process. If formatting fails send the args as strings."""
+        self.formatted += 1
+        try:
+            return format_message(msg, args), ()
+        except Exception:
+            return msg, tuple(arg if type(arg) in PRIMITIVES or type(arg) is bytes else safe_str(arg)
+                              for arg in args)
@@ -0,0 +1,718 @@
+"""Handlers that write records efficiently in the logging process.
+
+These are real logging.Handler classes that are created in the logging process by the handler configurations in
+plogging.handlers.
+"""
+import os
+import io
+import re
+import glob
+import gzip
+import mmap
+import time
+import zlib
+import struct
+import logging
+import logging.handlers
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+
+__all__ = ['BufferedStreamMixin', 'BufferedFileHandler', 'BufferedRotatingFileHandler',
+           'BufferedTimedRotatingFileHandler', 'BufferedWatchedFileHandler', 'BUFFERED_CLASSES',
+           'DATA_FRAME', 'BinaryFileHandler', 'iter_data_file',
+           'SEGMENT_HEADER', 'SEGMENT_FRAME', 'SegmentFileHandler', 'lock_segment', 'list_segments', 'read_segment',
+           'CODECS', 'Codec', 'get_codec', 'CompressedStreamMixin', 'CompressedFileHandler',
+           'CompressedRotatingFileHandler', 'CompressedTimedRotatingFileHandler', 'COMPRESSED_CLASSES',
+           'RotationCompressor', 'iter_decompressed', 'read_compressed']
+
+
+class BufferedStreamMixin(object):
+    """Gather formatted records in a buffer and write the whole buffer to the stream at once.
+
+    The buffer is written when it holds buffer_size characters, flush_interval seconds after the first record was
+    buffered, when a record at or above flush_level is emitted and when the handler is flushed or closed.
+
+    Args:
+        buffer_size (int)[65536]: Write when this many characters are buffered.
+        flush_interval (float)[1.0]: Maximum seconds a record stays in the buffer.
+        flush_level (int)[ERROR]: Records at or above this level are written immediately.
+        fsync (bool/float)[False]: False never calls os.fsync, True calls it after every write and a number calls it
+            at most every fsync seconds.
+    """
+    buffer_size = 65536
+    flush_interval = 1.0
+    flush_level = logging.ERROR
+    fsync = False
+
+    def setBuffering(self, buffer_size=65536, flush_interval=1.0, flush_level=logging.ERROR, fsync=False):
+        """Set when the buffer is written (see BufferedStreamMixin)."""
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.flush_level = flush_level
+        self.fsync = fsync
+
+    def _init_buffer(self):
+        self._buffer = []
+        self._buffered = 0
+        self._last_fsync = time.monotonic()
+        self._pending = threading.Event()
+        self._timer = None
+
+    def emit(self, record):
+        try:
+            msg = self.format(record) + self.terminator
+            if self._should_rollover(record, msg):
+                self._write_buffer()
+                self.doRollover()
+
+            self._buffer.append(msg)
+            self._buffered += len(msg)
+            if self._buffered >= self.buffer_size or record.levelno >= self.flush_level:
+                self._write_buffer()
+            elif len(self._buffer) == 1:
+                self._start_timer()
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+    def _should_rollover(self, record, msg):
+        """Return if the file should be rotated before the msg is buffered."""
+        return False
+
+    def _write_buffer(self):
+        """Write the buffer with one write call and flush the stream. The handler lock must be held."""
+        self._pending.clear()
+        if self._buffer:
+            data = ''.join(self._buffer)
+            self._buffer.clear()
+            self._buffered = 0
+            if self.stream is None:
+                self.stream = self._open()
+            self._write_text(data)
+
+        if self.stream is not None and hasattr(self.stream, 'flush'):
+            self.stream.flush()
+            if self.fsync:
+                now = time.monotonic()
+                if self.fsync is True or now - self._last_fsync >= self.fsync:
+                    os.fsync(self.stream.fileno())
+                    self._last_fsync = now
+
+    def _write_text(self, text):
+        self.stream.write(text)
+
+    def flush(self):
+        self.acquire()
+        try:
+            self._write_buffer()
+        finally:
+            self.release()
+
+    def close(self):
+        self.flush()
+        self._stop_timer()
+        super().close()
+
+    def _start_timer(self):
+        """Wake the thread that writes the buffer after flush_interval seconds."""
+        if self._timer is None:
+            self._timer_closed = threading.Event()
+            self._timer = threading.Thread(target=self._run_timer, args=(self._timer_closed,), name='plogging-flush',
+                                           daemon=True)
+            self._timer.start()
+        self._pending.set()
+
+    def _stop_timer(self):
+        """Let the timer thread exit. It is not joined, it may be waiting for the handler lock."""
+        if self._timer is not None:
+            self._timer = None
+            self._timer_closed.set()
+            self._pending.set()
+
+    def _run_timer(self, closed):
+        while not closed.is_set():
+            self._pending.wait()
+            if closed.wait(self.flush_interval):
+                return
+            self.flush()
+
+
+class BufferedFileHandler(BufferedStreamMixin, logging.FileHandler):
+    """FileHandler that writes the records in batches."""
+    def __init__(self, filename, mode='a', encoding=None, delay=False):
+        super().__init__(filename, mode, encoding, delay)
+        self._init_buffer()
+
+
+class BufferedRotatingFileHandler(BufferedStreamMixin, logging.handlers.RotatingFileHandler):
+    """RotatingFileHandler that writes the records in batches. The buffered size counts toward maxBytes.
+
+    The size of the file is read when it is opened and then counted in characters like the stdlib handler, so no
+    record seeks the file.
+    """
+    def __init__(self, filename, mode='a', maxBytes=0, backupCount=0, encoding=None, delay=False):
+        self._size = 0
+        super().__init__(filename, mode, maxBytes, backupCount, encoding, delay)
+        self._init_buffer()
+
+    def _open(self):
+        stream = super()._open()
+        stream.seek(0, 2)
+        self._size = stream.tell()
+        return stream
+
+    def _write_text(self, text):
+        super()._write_text(text)
+        self._size += len(text)
+
+    def _should_rollover(self, record, msg):
+        if self.maxBytes <= 0:
+            return False
+        if self.stream is None:
+            self.stream = self._open()
+        return self._size + self._buffered + len(msg) >= self.maxBytes
+
+
+class BufferedTimedRotatingFileHandler(BufferedStreamMixin, logging.handlers.TimedRotatingFileHandler):
+    """TimedRotatingFileHandler that writes the records in batches."""
+    def __init__(self, filename, when='h', interval=1, backupCount=0, encoding=None, delay=False, utc=False,
+                 atTime=None):
+        super().__init__(filename, when, interval, backupCount, encoding, delay, utc, atTime)
+        self._init_buffer()
+
+    def _should_rollover(self, record, msg):
+        return self.shouldRollover(record)
+
+
+class BufferedWatchedFileHandler(BufferedStreamMixin, logging.handlers.WatchedFileHandler):
+    """WatchedFileHandler that writes the records in batches. The file is checked before every write."""
+    def __init__(self, filename, mode='a', encoding=None, delay=False):
+        super().__init__(filename, mode, encoding, delay)
+        self._init_buffer()
+
+    def _write_buffer(self):
+        if self._buffer:
+            self.reopenIfNeeded()
+        super()._write_buffer()
+
+
+# Stdlib file handler class to the buffered handler class
+BUFFERED_CLASSES = {
+    logging.FileHandler: BufferedFileHandler,
+    logging.handlers.RotatingFileHandler: BufferedRotatingFileHandler,
+    logging.handlers.TimedRotatingFileHandler: BufferedTimedRotatingFileHandler,
+    logging.handlers.WatchedFileHandler: BufferedWatchedFileHandler,
+    }
+
+
+# ========== Compression ==========
+class Codec(object):
+    """Compress data into independent frames (gzip members, zstd frames or lz4 frames).
+
+    Concatenated frames are a valid file for the codec's command line tool and every complete frame can be read
+    after a crash.
+
+    Args:
+        name (str): Codec name.
+        extension (str): File name extension.
+        default_level (int): Compression level that is used when the level is None.
+        compress (callable): compress(data, level) returns one frame.
+        decompressor (callable): Return an object with decompress(data), eof and unused_data for one frame.
+    """
+    def __init__(self, name, extension, default_level, compress, decompressor):
+        self.name = name
+        self.extension = extension
+        self.default_level = default_level
+        self._compress = compress
+        self.decompressor = decompressor
+
+    def __repr__(self):
+        return '<%s %s>' % (self.__class__.__name__, self.name)
+
+    def compress(self, data, level=None):
+        return self._compress(data, self.default_level if level is None else level)
+
+
+CODECS = {
+    'gzip': Codec('gzip', '.gz', 6, lambda data, level: gzip.compress(data, level, mtime=0),
+                  lambda: zlib.decompressobj(31)),
+    }
+
+if zstandard is not None:
+    CODECS['zstd'] = Codec('zstd', '.zst', 3, lambda data, level: zstandard.ZstdCompressor(level).compress(data),
+                           lambda: zstandard.ZstdDecompressor().decompressobj())
+
+if lz4 is not None:
+    CODECS['lz4'] = Codec('lz4', '.lz4', 0,
+                          lambda data, level: lz4.frame.compress(data, compression_level=level),
+                          lambda: lz4.frame.LZ4FrameDecompressor())
+
+
+def get_codec(codec):
+    """Return the Codec for the codec name. zstd needs the zstandard package and lz4 needs the lz4 package."""
+    if isinstance(codec, Codec):
+        return codec
+    try:
+        return CODECS[codec]
+    except KeyError:
+        if codec in ('zstd', 'lz4'):
+            raise ValueError('The %s codec needs the %s package' % (codec, 'zstandard' if codec == 'zstd' else codec))
+        raise ValueError('Invalid codec %r. Use one of %s' % (codec, ', '.join(CODECS))) from None
+
+
+class CompressedStreamMixin(BufferedStreamMixin):
+    """Buffer the formatted records and write every buffer as one compressed frame.
+
+    A frame is written when the buffer is written (see BufferedStreamMixin), so at most the records of one buffer are
+    lost in a crash.
+    """
+    codec = CODECS['gzip']
+    compress_level = None
+
+    def setCompression(self, codec='gzip', level=None):
+        """Set the codec name (see CODECS) and compression level (None uses the codec's default)."""
+        self.codec = get_codec(codec)
+        self.compress_level = level
+
+    def _init_compression(self, encoding):
+        self.text_encoding = encoding or 'utf-8'
+        self._init_buffer()
+
+    def _open(self):
+        return open(self.baseFilename, 'wb' if 'w' in self.mode else 'ab')
+
+    def _write_text(self, text):
+        self.stream.write(self.codec.compress(text.encode(self.text_encoding), self.compress_level))
+
+
+class CompressedFileHandler(CompressedStreamMixin, logging.FileHandler):
+    """FileHandler that writes compressed frames."""
+    def __init__(self, filename, mode='a', encoding=None, delay=False):
+        super().__init__(filename, mode, None, True)
+        self._init_compression(encoding)
+        if not delay:
+            self.stream = self._open()
+
+
+class CompressedRotatingFileHandler(CompressedStreamMixin, logging.handlers.RotatingFileHandler):
+    """RotatingFileHandler that writes compressed frames. maxBytes is the compressed size of the file.
+
+    The size of the file is read when it is opened and then counted with every frame, so no record seeks the file.
+    """
+    def __init__(self, filename, mode='a', maxBytes=0, backupCount=0, encoding=None, delay=False):
+        self._size = 0
+        super().__init__(filename, mode, maxBytes, backupCount, None, True)
+        self._init_compression(encoding)
+        if not delay:
+            self.stream = self._open()
+
+    def _open(self):
+        stream = super()._open()
+        stream.seek(0, 2)
+        self._size = stream.tell()
+        return stream
+
+    def _write_text(self, text):
+        data = self.codec.compress(text.encode(self.text_encoding), self.compress_level)
+        self.stream.write(data)
+        self._size += len(data)
+
+    def _should_rollover(self, record, msg):
+        return self.maxBytes > 0 and self.stream is not None and self._size >= self.maxBytes
+
+
+class CompressedTimedRotatingFileHandler(CompressedStreamMixin, logging.handlers.TimedRotatingFileHandler):
+    """TimedRotatingFileHandler that writes compressed frames."""
+    def __init__(self, filename, when='h', interval=1, backupCount=0, encoding=None, delay=False, utc=False,
+                 atTime=None):
+        super().__init__(filename, when, interval, backupCount, None, True, utc, atTime)
+        self._init_compression(encoding)
+        if not delay:
+            self.stream = self._open()
+
+    def _should_rollover(self, record, msg):
+        return self.shouldRollover(record)
+
+
+# Stdlib file handler class to the compressed handler class
+COMPRESSED_CLASSES = {
+    logging.FileHandler: CompressedFileHandler,
+    logging.handlers.RotatingFileHandler: CompressedRotatingFileHandler,
+    logging.handlers.TimedRotatingFileHandler: CompressedTimedRotatingFileHandler,
+    }
+
+
+class RotationCompressor(object):
+    """Rotator and namer for the rotating handlers that compresses the rotated file in a helper thread.
+
+    The rotation only renames the file, so the handler continues logging right away. The compressed file is written
+    next to the rotated file and renamed when it is complete. A rotation waits for the previous compression in the
+    namer, which the handler calls before it renames the backups, so the backup being compressed is renamed too.
+
+    Example:
+
+        compressor = RotationCompressor('gzip')
+        handler.rotator = compressor
+        handler.namer = compressor.namer
+
+    Args:
+        codec (str)['gzip']: Codec name (see CODECS).
+        level (int)[None]: Compression level. None uses the codec's default.
+        chunk_size (int)[1048576]: Bytes of the file that are compressed into one frame.
+    """
+    def __init__(self, codec='gzip', level=None, chunk_size=1048576):
+        self.codec = get_codec(codec)
+        self.level = level
+        self.chunk_size = chunk_size
+        self._thread = None
+
+    def namer(self, name):
+        self.wait()
+        return name + self.codec.extension
+
+    def __call__(self, source, dest):
+        self.wait()
+        if not os.path.exists(source):
+            return
+        rotated = dest + '.rotated'
+        os.replace(source, rotated)
+        self._thread = threading.Thread(target=self.compress_file, args=(rotated, dest), name='plogging-compress')
+        self._thread.start()
+
+    def compress_file(self, source, dest):
+        """Compress source into dest and remove source."""
+        part = dest + '.part'
+        with open(source, 'rb') as src, open(part, 'wb') as dst:
+            for chunk in iter(lambda: src.read(self.chunk_size), b''):
+                dst.write(self.codec.compress(chunk, self.level))
+        os.replace(part, dest)
+        os.remove(source)
+
+    def wait(self):
+        """Wait for the running compression to finish."""
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+def iter_decompressed(filename, codec=None, chunk_size=1048576):
+    """Iterate over the decompressed data of a file of compressed frames.
+
+    A frame that was cut off by a crash is decompressed as far as possible.
+
+    Args:
+        filename (str): Compressed file.
+        codec (str)[None]: Codec name. None selects the codec by the file name extension.
+        chunk_size (int)[1048576]: Bytes to read at once.
+    """
+    if codec is None:
+        codec = next((c for c in CODECS.values() if filename.endswith(c.extension)), CODECS['gzip'])
+    codec = get_codec(codec)
+
+    decompressor = codec.decompressor()
+    with open(filename, 'rb') as f:
+        for data in iter(lambda: f.read(chunk_size), b''):
+            while data:
+                out = decompressor.decompress(data)
+                if out:
+                    yield out
+                if not decompressor.eof:
+                    break
+                data = decompressor.unused_data
+                decompressor = codec.decompressor()
+
+
+def read_compressed(filename, codec=None):
+    """Return the decompressed bytes of a file of compressed frames (see iter_decompressed)."""
+    return b''.join(iter_decompressed(filename, codec))
+
+
+# ========== Binary data ==========
+# Frame header of a BinaryFileHandler file: created time, data name size, data size. The name and data follow.
+DATA_FRAME = struct.Struct('<dHI')
+
+
+class BinaryFileHandler(logging.Handler):
+    """Append the data of the records from Logger.log_data to a file as framed binary records.
+
+    Every frame is a DATA_FRAME header (created, name size, data size) followed by the UTF-8 data name and the data.
+    Records without data are ignored. Read the file with iter_data_file.
+
+    Args:
+        filename (str): File to append to.
+        mode (str)['ab']: File mode.
+        buffer_size (int)[1048576]: Size of the file buffer. Larger data is written directly.
+        flush_interval (float)[1.0]: Flush the file buffer when it was not flushed for this many seconds.
+        delay (bool)[False]: Open the file when the first record is written.
+    """
+    def __init__(self, filename, mode='ab', buffer_size=1048576, flush_interval=1.0, delay=False):
+        super().__init__()
+        self.baseFilename = os.path.abspath(os.fspath(filename))
+        self.mode = mode
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.stream = None
+        self._last_flush = time.monotonic()
+        if not delay:
+            self.stream = self._open()
+
+    def _open(self):
+        return open(self.baseFilename, self.mode, buffering=self.buffer_size)
+
+    def emit(self, record):
+        data = getattr(record, 'data', None)
+        if data is None:
+            return
+        try:
+            name = str(getattr(record, 'data_name', '')).encode('utf-8')
+            if self.stream is None:
+                self.stream = self._open()
+            with memoryview(data) as view:
+                self.stream.write(DATA_FRAME.pack(record.created, len(name), view.nbytes))
+                self.stream.write(name)
+                self.stream.write(view)
+
+            now = time.monotonic()
+            if now - self._last_flush >= self.flush_interval:
+                self.stream.flush()
+                self._last_flush = now
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        self.acquire()
+        try:
+            if self.stream is not None:
+                self.stream.flush()
+                self._last_flush = time.monotonic()
+        finally:
+            self.release()
+
+    def close(self):
+        self.acquire()
+        try:
+            try:
+                if self.stream is not None:
+                    self.stream.close()
+            finally:
+                self.stream = None
+                super().close()
+        finally:
+            self.release()
+
+
+def iter_data_file(filename, buffer_size=1048576):
+    """Iterate over the frames of a BinaryFileHandler file.
+
+    A truncated frame at the end of the file (the writer crashed) is ignored.
+
+    Yields:
+        frame (tuple): (created, data name, data bytes)
+    """
+    header_size = DATA_FRAME.size
+    unpack = DATA_FRAME.unpack
+    with io.open(filename, 'rb', buffering=buffer_size) as f:
+        read = f.read
+        while True:
+            header = read(header_size)
+            if len(header) < header_size:
+                return
+            created, name_size, data_size = unpack(header)
+            name = read(name_size)
+            data = read(data_size)
+            if len(data) < data_size:
+                return
+            yield created, name.decode('utf-8'), data
+
+
+# ========== Memory mapped segments ==========
+# Segment header: magic, committed offset, segment index, closed flag. Records start at SEGMENT_HEADER_SIZE.
+SEGMENT_MAGIC = b'PLOGSEG1'
+SEGMENT_HEADER = struct.Struct('<8sQQI')
+SEGMENT_HEADER_SIZE = 64
+SEGMENT_FRAME = struct.Struct('<I')  # Record size. The encoded record follows.
+_COMMITTED_OFFSET = 8
+_CLOSED_OFFSET = 24
+
+
+class SegmentFileHandler(logging.Handler):
+    """Write formatted records into pre-allocated memory mapped segment files.
+
+    A record is written with memory copies and committed by updating the committed offset in the segment header,
+    without a system call per record. Records that were committed are in the page cache and survive a crash of the
+    application and of the logging process. Use read_segment or python -m plogging.recover to read the committed
+    records of the segments.
+
+    Segments are named <filename>.000001, <filename>.000002, ... A new segment is started when a record does not fit
+    in the current one and when the handler is created. A finished segment is truncated to its committed size.
+
+    A segment is allocated with os.posix_fallocate where it is available, so a full disk raises an error when the
+    segment is started instead of a SIGBUS when a record is written. The open segment is locked (flock), so
+    plogging.recover does not repair it while it is mapped.
+
+    Args:
+        filename (str): Base file name of the segments.
+        segment_size (int)[16777216]: Size of a segment file in bytes.
+        backupCount (int)[0]: Number of finished segments to keep. 0 keeps every segment.
+        encoding (str)['utf-8']: Encoding of the formatted records.
+        sync (bool)[False]: Flush the mapped pages to disk (msync) when the handler is flushed.
+    """
+    terminator = '\n'
+
+    def __init__(self, filename, segment_size=16777216, backupCount=0, encoding='utf-8', sync=False):
+        super().__init__()
+        self.baseFilename = os.path.abspath(os.fspath(filename))
+        self.segment_size = segment_size
+        self.backupCount = backupCount
+        self.encoding = encoding
+        self.sync = sync
+
+        self.segment_index = max([index for index, _ in list_segments(self.baseFilename)] or [0])
+        self.segment_path = None
+        self._file = None
+        self._map = None
+        self._pos = 0
+        self._open_segment(segment_size)
+
+    def _open_segment(self, size):
+        self.segment_index += 1
+        self.segment_path = '%s.%06d' % (self.baseFilename, self.segment_index)
+        self._file = open(self.segment_path, 'w+b')
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            if hasattr(os, 'posix_fallocate'):
+                os.posix_fallocate(self._file.fileno(), 0, size)
+            else:
+                self._file.truncate(size)
+            self._map = mmap.mmap(self._file.fileno(), size)
+        except BaseException:
+            self._file.close()
+            self._file = None
+            raise
+        SEGMENT_HEADER.pack_into(self._map, 0, SEGMENT_MAGIC, SEGMENT_HEADER_SIZE, self.segment_index, 0)
+        self._pos = SEGMENT_HEADER_SIZE
+
+    def _close_segment(self):
+        """Mark the segment closed, unmap it and truncate the file to the committed records."""
+        if self._map is None:
+            return
+        struct.pack_into('<I', self._map, _CLOSED_OFFSET, 1)
+        self._map.flush()
+        self._map.close()
+        self._file.truncate(self._pos)
+        self._file.close()
+        self._map = self._file = None
+
+    def _remove_old_segments(self):
+        if self.backupCount > 0:
+            for index, path in list_segments(self.baseFilename)[:-(self.backupCount + 1)]:
+                os.remove(path)
+
+    def emit(self, record):
+        try:
+            data = (self.format(record) + self.terminator).encode(self.encoding)
+            size = SEGMENT_FRAME.size + len(data)
+            if self._map is None or self._pos + size > len(self._map):
+                self._close_segment()
+                self._open_segment(max(self.segment_size, SEGMENT_HEADER_SIZE + size))
+                self._remove_old_segments()
+
+            pos = self._pos
+            SEGMENT_FRAME.pack_into(self._map, pos, len(data))
+            self._map[pos + SEGMENT_FRAME.size: pos + size] = data
+            self._pos = pos + size
+            struct.pack_into('<Q', self._map, _COMMITTED_OFFSET, self._pos)  # Commit the record
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        if self.sync:
+            self.acquire()
+            try:
+                if self._map is not None:
+                    self._map.flush()
+            finally:
+                self.release()
+
+    def close(self):
+        self.acquire()
+        try:
+            try:
+                self._close_segment()
+            finally:
+                super().close()
+        finally:
+            self.release()
+
+
+def lock_segment(f):
+    """Lock an open segment file (flock). Return False if a SegmentFileHandler has the segment open."""
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        return False
+    return True
+
+
+def list_segments(filename):
+    """Return the sorted [(index, path)] of the segment files of a SegmentFileHandler."""
+    filename = os.path.abspath(os.fspath(filename))
+    pattern = re.compile(re.escape(os.path.basename(filename)) + r'\.(\d{6,})$')
+    segments = []
+    for path in glob.glob(glob.escape(filename) + '.*'):
+        match = pattern.match(os.path.basename(path))
+        if match:
+            segments.append((int(match.group(1)), path))
+    return sorted(segments)
+
+
+def read_segment(path):
+    """Read the committed records of a segment file.
+
+    Returns:
+        info (dict): {'index', 'committed', 'closed', 'records' (list of bytes), 'uncommitted' (number of bytes after
+            the committed offset up to the last non-zero byte, when the writer crashed while writing a record)}
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < SEGMENT_HEADER_SIZE:
+        raise ValueError('%s is not a plogging segment file' % path)
+    magic, committed, index, closed = SEGMENT_HEADER.unpack_from(data, 0)
+    if magic != SEGMENT_MAGIC:
+        raise ValueError('%s is not a plogging segment file' % path)
+    committed = min(committed, len(data))
+
+    records = []
+    pos = SEGMENT_HEADER_SIZE
+    while pos + SEGMENT_FRAME.size <= committed:
+        size, = SEGMENT_FRAME.unpack_from(data, pos)
+        pos += SEGMENT_FRAME.size
+        if pos + size > committed:
+            break
+        records.append(data[pos: pos + size])
+        pos += size
+    return {'index': index, 'committed': committed, 'closed': bool(closed), 'records': records,
+            'uncommitted': len(data[committed:].rstrip(b'\0'))}
@@ -0,0 +1,415 @@
+"""Move commands from the application process to the logging process."""
+import io
+import os
+import sys
+import time
+import queue
+import struct
+import pickle
+import logging
+import weakref
+import threading
+import traceback
+import multiprocessing
+
+try:
+    from multiprocessing.shared_memory import SharedMemory
+except ImportError:  # Python < 3.8
+    SharedMemory = None
+
+_PICKLE5 = pickle.HIGHEST_PROTOCOL >= 5
+
+
+__all__ = ['RecordBatcher', 'iter_batch', 'RingBuffer']
+
+
+# A pickled (OUT_OF_BAND, pickle size, buffer sizes) header is followed by a pickle and its out-of-band buffers
+OUT_OF_BAND = 'plogging.out_of_band'
+
+
+def iter_batch(batch):
+    """Iterate over the commands in a batch created by a RecordBatcher.
+
+    Args:
+        batch (bytes/list): Pickled commands that were joined together or a single command list.
+    """
+    if not isinstance(batch, (bytes, bytearray)):
+        yield batch
+        return
+
+    # Every command is a separate pickle with its own memo, so one Unpickler cannot load them all
+    stream = io.BytesIO(batch)
+    load = pickle.load
+    size = len(batch)
+    while stream.tell() < size:
+        command = load(stream)
+        if type(command) is tuple and len(command) == 3 and command[0] == OUT_OF_BAND:
+            command = _load_out_of_band(batch, stream, command[1], command[2])
+        yield command
+
+
+def _load_out_of_band(batch, stream, pickle_size, buffer_sizes):
+    """Load the pickle after an out-of-band header. The buffers are given to pickle as views of the batch."""
+    view = memoryview(batch)
+    start = stream.tell()
+    end = start + pickle_size
+    buffers = []
+    for nbytes in buffer_sizes:
+        buffers.append(view[end: end + nbytes])
+        end += nbytes
+    stream.seek(end)
+    return pickle.loads(view[start: start + pickle_size], buffers=buffers)
+
+
+class RecordBatcher(object):
+    """Coalesce many commands into one queue put.
+
+    Every command is pickled when it is added and appended to a buffer. The buffer is given to the put function as
+    one bytes object when it holds max_count commands, when it holds max_bytes bytes or max_latency seconds after the
+    first command was added.
+
+    Args:
+        put (callable): Function that sends a batch (bytes) to the logging process.
+        max_count (int)[512]: Flush when this many commands are waiting.
+        max_bytes (int)[65536]: Flush when the pickled commands are at least this many bytes.
+        max_latency (float)[0.01]: Maximum number of seconds a command waits before it is flushed.
+    """
+    def __init__(self, put, max_count=512, max_bytes=65536, max_latency=0.01):
+        self.put = put
+        self.max_count = max_count
+        self.max_bytes = max_bytes
+        self.max_latency = max_latency
+
+        self.added = 0  # Total number of commands added
+
+        self._lock = threading.Lock()
+        self._buffer = bytearray()
+        self._count = 0
+        self._pending = threading.Event()
+        self._thread = None
+
+    def configure(self, max_count=None, max_bytes=None, max_latency=None):
+        """Change the flush limits. None keeps the current value."""
+        with self._lock:
+            if max_count is not None:
+                self.max_count = max_count
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+            if max_latency is not None:
+                self.max_latency = max_latency
+
+    def add(self, command):
+        """Add a command to the batch. Return True if the command was added.
+
+        Buffers that the command gives to pickle protocol 5 (see plogging.serialize.OutOfBand) are copied into the
+        batch after the pickle as they are instead of being pickled.
+        """
+        buffers = []
+        try:
+            if _PICKLE5:
+                data = pickle.dumps(command, pickle.HIGHEST_PROTOCOL, buffer_callback=buffers.append)
+            else:
+                data = pickle.dumps(command, pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            if logging.raiseExceptions:
+                sys.stderr.write('--- Logging error ---\n')
+                traceback.print_exc(file=sys.stderr)
+                sys.stderr.write('Command dropped: %r\n' % (command[:2],))
+            return False
+
+        with self._lock:
+            if buffers:
+                raws = [buf.raw() for buf in buffers]
+                self._buffer += pickle.dumps((OUT_OF_BAND, len(data), [raw.nbytes for raw in raws]),
+                                             pickle.HIGHEST_PROTOCOL)
+                self._buffer += data
+                for raw in raws:
+                    self._buffer += raw
+            else:
+                self._buffer += data
+            self._count += 1
+            self.added += 1
+            if self._count >= self.max_count or len(self._buffer) >= self.max_bytes:
+                self._flush()
+            elif self._count == 1:
+                self._start_timer()
+        return True
+
+    def flush(self):
+        """Send all of the waiting commands to the logging process."""
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        self._pending.clear()
+        if self._count:
+            batch, self._buffer = self._buffer, bytearray()  # The batch is given away instead of copied
+            self._count = 0
+            self.put(batch)
+
+    def after_fork(self):
+        """Reset the batcher in a forked child process.
+
+        The waiting commands belong to the parent, which sends them. The lock may have been held by a thread that
+        does not exist in the child and the flush thread is not running.
+        """
+        self._lock = threading.Lock()
+        self._buffer = bytearray()
+        self._count = 0
+        self._pending = threading.Event()
+        self._thread = None
+
+    def _start_timer(self):
+        """Wake the thread that flushes the batch after max_latency seconds."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run_timer, name='plogging-batcher', daemon=True)
+            self._thread.start()
+        self._pending.set()
+
+    def _run_timer(self):
+        while True:
+            self._pending.wait()
+            time.sleep(self.max_latency)
+            self.flush()
+
+
+# ========== Shared memory ring buffer ==========
+_HEADER_SIZE = 64  # head (Q), tail (Q), consumer waiting (I), producer waiting (I), padding
+_INDEX = struct.Struct('Q')
+_FLAG = struct.Struct('I')
+_FRAME = struct.Struct('I')
+_HEAD_OFFSET = 0
+_TAIL_OFFSET = 8
+_WAITING_OFFSET = 16
+_FULL_OFFSET = 20
+
+_MORE = 0x80000000  # Frame flag: the next frame continues this data
+_WRAP = 0xFFFFFFFF  # Frame marker: skip to the start of the buffer
+
+# Maximum seconds a producer sleeps on a full ring before it checks for room again (in case it missed the wakeup)
+ROOM_INTERVAL = 0.1
+
+
+def _unlink_shared_memory(shm, owner_pid):
+    if os.getpid() == owner_pid:
+        shm.close()
+        shm.unlink()
+
+
+class RingBuffer(object):
+    """Single producer, single consumer ring buffer in shared memory with a second ring for forked producers.
+
+    This can replace the multiprocessing.Queue of a LogProcess. There is no feeder thread or pipe. put_nowait copies
+    the data into shared memory as length framed chunks and only releases a semaphore when the consumer is idle.
+    get returns every complete item that is waiting as one bytes object, so the logging process reads in bulk.
+
+    The head and tail indexes only ever increase. The data position is the index modulo the capacity. A frame that
+    does not fit before the end of the buffer is written at the start after a wraparound marker. Data larger than a
+    quarter of the capacity is split into several frames. A producer waits on a semaphore while the ring is full.
+
+    Items must be bytes (batches from a RecordBatcher). Other objects are pickled. The process that creates the ring
+    writes to the first ring without a lock, so only one thread may call put_nowait at a time (the RecordBatcher
+    holds its lock). Forked children of the application (after _after_fork) and put_shared write to the second ring,
+    which is shared with a process lock.
+
+    Args:
+        capacity (int)[4 MiB]: Number of bytes in each ring.
+    """
+    def __init__(self, capacity=4 * 1024 * 1024):
+        if SharedMemory is None:
+            raise RuntimeError('The RingBuffer requires multiprocessing.shared_memory (Python 3.8+)')
+
+        self.capacity = capacity
+        self.shm = SharedMemory(create=True, size=2 * (_HEADER_SIZE + capacity))
+        self.semaphore = multiprocessing.Semaphore(0)
+        self.room = (multiprocessing.Semaphore(0), multiprocessing.Semaphore(0))
+        self.producer_lock = multiprocessing.Lock()
+        self._init_local()
+        for base in self._bases:
+            self.shm.buf[base:base + _HEADER_SIZE] = bytes(_HEADER_SIZE)
+        self._finalizer = weakref.finalize(self, _unlink_shared_memory, self.shm, os.getpid())
+
+    def _init_local(self):
+        self._bases = (0, _HEADER_SIZE + self.capacity)
+        self._ring = 0
+        self._partial = (bytearray(), bytearray())
+        self._max_chunk = max(self.capacity // 4 - _FRAME.size, 1)
+
+    def __getstate__(self):
+        return {'capacity': self.capacity, 'name': self.shm.name, 'semaphore': self.semaphore, 'room': self.room,
+                'producer_lock': self.producer_lock}
+
+    def __setstate__(self, state):
+        self.capacity = state['capacity']
+        self.shm = SharedMemory(name=state['name'])
+        self.semaphore = state['semaphore']
+        self.room = state['room']
+        self.producer_lock = state['producer_lock']
+        self._init_local()
+        self._finalizer = None
+
+    def _after_fork(self):
+        """Write to the shared ring in a forked child. The parent keeps writing to the first ring."""
+        self._ring = 1
+
+    def qsize(self):
+        """Return 1 if there is data waiting else 0. All waiting data is returned by one get."""
+        buf = self.shm.buf
+        return int(any(_INDEX.unpack_from(buf, base + _HEAD_OFFSET) != _INDEX.unpack_from(buf, base + _TAIL_OFFSET)
+                       for base in self._bases))
+
+    def empty(self):
+        return not self.qsize()
+
+    # ===== Producer =====
+    def put_nowait(self, item):
+        """Copy the item into the ring. This only waits if the ring is full."""
+        if self._ring:
+            self.put_shared(item)
+        else:
+            self._put(0, item)
+
+    put = put_nowait
+
+    def put_shared(self, item):
+        """Copy the item into the ring of the forked producers. Any thread or process can call this."""
+        with self.producer_lock:
+            self._put(1, item)
+
+    def _put(self, ring, item):
+        if not isinstance(item, (bytes, bytearray)):
+            item = pickle.dumps(item, pickle.HIGHEST_PROTOCOL)
+
+        view = memoryview(item)
+        size = len(view)
+        for start in range(0, size, self._max_chunk):
+            end = start + self._max_chunk
+            self._write_frame(ring, view[start:end], end < size)
+        view.release()
+        self._wake()
+
+    def _wake(self):
+        """Wake the consumer if it is waiting for data."""
+        buf = self.shm.buf
+        if _FLAG.unpack_from(buf, _WAITING_OFFSET)[0]:
+            _FLAG.pack_into(buf, _WAITING_OFFSET, 0)
+            self.semaphore.release()
+
+    def _write_frame(self, ring, chunk, more):
+        buf = self.shm.buf
+        base = self._bases[ring]
+        capacity = self.capacity
+        need = _FRAME.size + len(chunk)
+
+        # Wait for the consumer to make room. It releases the room semaphore after it read the ring.
+        while True:
+            head = _INDEX.unpack_from(buf, base + _HEAD_OFFSET)[0]
+            tail = _INDEX.unpack_from(buf, base + _TAIL_OFFSET)[0]
+            pos = head % capacity
+            to_end = capacity - pos
+            total = need if need <= to_end else to_end + need
+            if capacity - (head - tail) >= total:
+                break
+            if _FLAG.unpack_from(buf, base + _FULL_OFFSET)[0]:
+                self.room[ring].acquire(timeout=ROOM_INTERVAL)
+            else:
+                _FLAG.pack_into(buf, base + _FULL_OFFSET, 1)  # Check again in case the consumer read in between
+            self._wake()
+
+        if need > to_end:
+            if to_end >= _FRAME.size:
+                _FRAME.pack_into(buf, base + _HEADER_SIZE + pos, _WRAP)
+            head += to_end
+            pos = 0
+
+        offset = base + _HEADER_SIZE + pos
+        _FRAME.pack_into(buf, offset, len(chunk) | (_MORE if more else 0))
+        buf[offset + _FRAME.size:offset + need] = chunk
+        _INDEX.pack_into(buf, base + _HEAD_OFFSET, head + need)
+
+    # ===== Consumer =====
+    def _read(self, ring):
+        """Return all of the complete data in a ring as one bytes object and free the space."""
+        buf = self.shm.buf
+        base = self._bases[ring]
+        data_offset = base + _HEADER_SIZE
+        partial = self._partial[ring]
+        capacity = self.capacity
+        head = _INDEX.unpack_from(buf, base + _HEAD_OFFSET)[0]
+        tail = _INDEX.unpack_from(buf, base + _TAIL_OFFSET)[0]
+
+        items = []
+        while tail < head:
+            pos = tail % capacity
+            to_end = capacity - pos
+            if to_end < _FRAME.size:
+                tail += to_end
+                continue
+            size = _FRAME.unpack_from(buf, data_offset + pos)[0]
+            if size == _WRAP:
+                tail += to_end
+                continue
+
+            length = size & ~_MORE
+            start = data_offset + pos + _FRAME.size
+            if size & _MORE or partial:
+                partial += buf[start:start + length]
+                if not size & _MORE:
+                    items.append(bytes(partial))
+                    partial.clear()
+            else:
+                items.append(bytes(buf[start:start + length]))
+            tail += _FRAME.size + length
+
+        _INDEX.pack_into(buf, base + _TAIL_OFFSET, tail)
+        if _FLAG.unpack_from(buf, base + _FULL_OFFSET)[0]:
+            _FLAG.pack_into(buf, base + _FULL_OFFSET, 0)
+            self.room[ring].release()
+        if len(items) == 1:
+            return items[0]
+        return b''.join(items)
+
+    def _read_all(self):
+        data = self._read(0)
+        shared = self._read(1)
+        if shared:
+            return data + shared if data else shared
+        return data
+
+    def get(self, block=True, timeout=None):
+        """Return all of the waiting items of both rings joined together as one bytes object.
+
+        Raises:
+            queue.Empty: If block is False or the timeout expired before any data was available.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        buf = self.shm.buf
+        while True:
+            data = self._read_all()
+            if data or not block:
+                break
+
+            # Tell the producers to wake this consumer, then check again in case data arrived in between
+            _FLAG.pack_into(buf, _WAITING_OFFSET, 1)
+            data = self._read_all()
+            if data:
+                break
+
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+            if not self.semaphore.acquire(timeout=remaining):
+                break
+
+        _FLAG.pack_into(buf, _WAITING_OFFSET, 0)
+        if not data:
+            raise queue.Empty
+        return data
+
+    def get_nowait(self):
+        return self.get(False)
+
+    def close(self):
+        """Release the shared memory. The process that created the ring also unlinks it."""
+        if self._finalizer is not None:
+            self._finalizer()
+        else:
+            self.shm.close()
@@ -0,0 +1,242 @@
+"""Run handlers on their own worker in the logging process, so a slow handler does not hold back the others.
+
+These are real logging.Handler classes that are created in the logging process. Use Handler.setWorker on the handler
+configuration to select one.
+"""
+import queue
+import asyncio
+import logging
+import logging.handlers
+import threading
+
+
+__all__ = ['WORKERS', 'ThreadedHandler', 'AsyncioHandler', 'AsyncSocketHandler', 'wrap_handler']
+
+
+class ThreadedHandler(logging.Handler):
+    """Handle records with the wrapped handler in a dedicated thread.
+
+    The wrapped handler checks its own level and filters. An exception from the wrapped handler is given to its
+    handleError and counted, and does not stop the thread.
+
+    Args:
+        handler (logging.Handler): Handler that does the work.
+        maxsize (int)[1000]: Maximum number of records waiting for the handler.
+        block (bool)[True]: Wait for room when the queue is full. If False the record is dropped.
+        timeout (float)[None]: Seconds to wait for room before dropping the record.
+    """
+    def __init__(self, handler, maxsize=1000, block=True, timeout=None):
+        super().__init__()
+        self.handler = handler
+        self.name = handler.name
+        self.block = block
+        self.timeout = timeout
+        self.handled = 0
+        self.dropped = 0
+        self.errors = 0
+        self._start(maxsize)
+
+    def _start(self, maxsize):
+        self.queue = queue.Queue(maxsize)
+        self.thread = threading.Thread(target=self._run, name='plogging-' + self.get_handler_name(), daemon=True)
+        self.thread.start()
+
+    def get_handler_name(self):
+        return self.handler.name or self.handler.__class__.__name__
+
+    def __repr__(self):
+        return '<%s %r>' % (self.__class__.__name__, self.handler)
+
+    def emit(self, record):
+        if record.levelno < self.handler.level:
+            return
+        try:
+            self.queue.put(record, self.block, self.timeout)
+        except queue.Full:
+            self.dropped += 1
+
+    def _handle(self, record):
+        try:
+            self.handler.handle(record)
+            self.handled += 1
+        except Exception:
+            self.errors += 1
+            self.handler.handleError(record)
+
+    def _run(self):
+        while True:
+            record = self.queue.get()
+            try:
+                if record is None:
+                    break
+                self._handle(record)
+            finally:
+                self.queue.task_done()
+
+    def flush(self):
+        """Wait for the waiting records to be handled and flush the wrapped handler."""
+        self.queue.join()
+        self.handler.flush()
+
+    def close(self):
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+        self.handler.close()
+        super().close()
+
+
+class AsyncioHandler(ThreadedHandler):
+    """Handle records with the wrapped handler from a coroutine in a shared asyncio event loop thread.
+
+    Every AsyncioHandler gets its own asyncio.Queue and task, so many network handlers can wait on I/O at the same time
+    without a thread each. Records are given to emit_async, which runs the blocking handler in the loop's executor.
+    Subclasses override emit_async to do non-blocking I/O.
+    """
+    _loop = None
+    _loop_lock = threading.Lock()
+
+    @classmethod
+    def get_loop(cls):
+        """Return the event loop that runs in a daemon thread, starting it if needed."""
+        with cls._loop_lock:
+            if AsyncioHandler._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='plogging-asyncio', daemon=True).start()
+                AsyncioHandler._loop = loop
+            return AsyncioHandler._loop
+
+    def _start(self, maxsize):
+        self.loop = self.get_loop()
+        self.queue = asyncio.run_coroutine_threadsafe(self._create_queue(maxsize), self.loop).result()
+        self.task = asyncio.run_coroutine_threadsafe(self._run(), self.loop)
+
+    async def _create_queue(self, maxsize):
+        return asyncio.Queue(maxsize)
+
+    def _put_nowait(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    def emit(self, record):
+        if record.levelno < self.handler.level:
+            return
+        if self.block:
+            future = asyncio.run_coroutine_threadsafe(self.queue.put(record), self.loop)
+            try:
+                future.result(self.timeout)
+            except Exception:
+                future.cancel()
+                self.dropped += 1
+        else:
+            self.loop.call_soon_threadsafe(self._put_nowait, record)
+
+    async def emit_async(self, record):
+        """Handle the record. The default runs the blocking handler in the loop's executor."""
+        await self.loop.run_in_executor(None, self.handler.handle, record)
+
+    async def _run(self):
+        while True:
+            record = await self.queue.get()
+            try:
+                if record is None:
+                    break
+                await self.emit_async(record)
+                self.handled += 1
+            except Exception:
+                self.errors += 1
+                self.handler.handleError(record)
+            finally:
+                self.queue.task_done()
+
+    async def _join(self):
+        await self.queue.join()
+
+    def flush(self):
+        asyncio.run_coroutine_threadsafe(self._join(), self.loop).result()
+        self.handler.flush()
+
+    def close(self):
+        if not self.task.done():
+            asyncio.run_coroutine_threadsafe(self.queue.put(None), self.loop).result()
+            self.task.result()
+        self.handler.close()
+        logging.Handler.close(self)
+
+
+class AsyncSocketHandler(AsyncioHandler):
+    """Send records like logging.handlers.SocketHandler with non-blocking asyncio streams.
+
+    The wrapped SocketHandler pickles the records (makePickle) and its retry settings are used when the connection
+    fails.
+    """
+    def __init__(self, handler, maxsize=1000, block=True, timeout=None):
+        self.writer = None
+        self.retry_time = None
+        self.retry_period = handler.retryStart
+        super().__init__(handler, maxsize, block, timeout)
+
+    async def _connect(self):
+        loop_time = self.loop.time()
+        if self.retry_time is not None and loop_time < self.retry_time:
+            return False
+        try:
+            if self.handler.port is None:
+                _, self.writer = await asyncio.open_unix_connection(self.handler.host)
+            else:
+                _, self.writer = await asyncio.open_connection(self.handler.host, self.handler.port)
+            self.retry_time = None
+            self.retry_period = self.handler.retryStart
+            return True
+        except OSError:
+            self.retry_time = loop_time + self.retry_period
+            self.retry_period = min(self.retry_period * self.handler.retryFactor, self.handler.retryMax)
+            return False
+
+    async def emit_async(self, record):
+        if self.writer is None and not await self._connect():
+            return  # Dropped like SocketHandler while the connection is down
+        try:
+            self.writer.write(self.handler.makePickle(record))
+            await self.writer.drain()
+        except OSError:
+            self.writer.close()
+            self.writer = None
+            raise
+
+    def close(self):
+        super().close()
+        if self.writer is not None:
+            self.loop.call_soon_threadsafe(self.writer.close)
+            self.writer = None
+
+
+# Worker mode to the handler wrapper class
+WORKERS = {
+    'thread': ThreadedHandler,
+    'asyncio': AsyncioHandler,
+    }
+
+
+def wrap_handler(handler, worker=None):
+    """Wrap the handler in its worker.
+
+    Args:
+        handler (logging.Handler): Handler that was created in the logging process.
+        worker (dict)[None]: Worker settings from Handler.setWorker. {'mode': 'thread', 'maxsize': 1000, ...}
+
+    Returns:
+        handler (logging.Handler): The handler or the worker handler that wraps it.
+    """
+    if not worker:
+        return handler
+
+    options = dict(worker)
+    mode = options.pop('mode')
+    worker_class = WORKERS[mode]
+    if mode == 'asyncio' and isinstance(handler, logging.handlers.SocketHandler) \
+            and not isinstance(handler, logging.handlers.DatagramHandler):
+        worker_class = AsyncSocketHandler
+    return worker_class(handler, **options)
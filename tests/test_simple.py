@@ -1,4 +1,10 @@
+import os
+import time
+import asyncio
 import sys
+import signal
+import pickle
+import shutil
 
 import plogging
 from plogging import STANDARD_FMT, STANDARD_FORMATTER
@@ -44,8 +50,897 @@ def test_configs():
     logger.start_process()
 
 
+def test_shared_process():
+    logger1 = plogging.getLogger('test_shared_process.one')
+    logger2 = plogging.getLogger('test_shared_process.two')
+    assert logger1.process is logger2.process
+
+    pinned = plogging.pinLogger('test_shared_process.two')
+    try:
+        assert logger2.process is pinned
+        assert logger1.process is not pinned
+        assert plogging.getLogger('test_shared_process.two.child').process is pinned
+    finally:
+        plogging.unpinLogger('test_shared_process.two')
+    assert logger1.process is logger2.process
+
+
+def test_record_batcher():
+    from plogging.transport import RecordBatcher, iter_batch
+
+    batches = []
+    batcher = RecordBatcher(batches.append, max_count=3, max_latency=0.05)
+    for i in range(4):
+        batcher.add(['test', 'info', ('msg %d', i), {}])
+    assert len(batches) == 1
+    assert list(iter_batch(batches[0])) == [['test', 'info', ('msg %d', i), {}] for i in range(3)]
+
+    time.sleep(0.2)  # Flushed by the max latency
+    assert len(batches) == 2
+    assert list(iter_batch(batches[1])) == [['test', 'info', ('msg %d', 3), {}]]
+
+    # Every command has its own pickle memo
+    commands = [['first', 'setLevel', (10,), {}], ['second', 'info', ('%s %s', 'arg', 'arg'), {}]]
+    for command in commands:
+        batcher.add(command)
+    batcher.flush()
+    assert list(iter_batch(batches[2])) == commands
+
+
+def test_level_short_circuit():
+    parent = plogging.getLogger('test_level')
+    logger = plogging.getLogger('test_level.child')
+    parent.setLevel(plogging.WARNING)
+    assert logger.getEffectiveLevel() == plogging.WARNING
+    assert not logger.isEnabledFor(plogging.DEBUG)
+    assert logger.isEnabledFor(plogging.ERROR)
+
+    sent = []
+    logger._log = lambda level, msg, args, *rest: sent.append(level)
+    logger.debug('dropped')
+    logger.info('dropped')
+    logger.error('sent')
+    assert sent == [plogging.ERROR]
+
+    parent.setLevel(plogging.DEBUG)
+    logger.debug('sent')
+    assert sent == [plogging.ERROR, plogging.DEBUG]
+
+    plogging.disable(plogging.INFO)
+    try:
+        logger.info('dropped')
+        assert sent == [plogging.ERROR, plogging.DEBUG]
+    finally:
+        plogging.disable(plogging.NOTSET)
+
+
+def test_capture_record():
+    from plogging.record import capture_record, make_record
+
+    try:
+        raise ValueError('bad value')
+    except ValueError:
+        compact = capture_record('test_capture_record', plogging.ERROR, 'value %s', (1,), exc_info=True,
+                                 extra={'key': 'abc'})
+
+    record = make_record(compact)
+    assert record.name == 'test_capture_record'
+    assert record.levelno == plogging.ERROR
+    assert record.getMessage() == 'value 1'
+    assert record.funcName == 'test_capture_record'
+    assert record.pathname == __file__
+    assert record.created == compact[1]
+    assert 'ValueError: bad value' in record.exc_text
+    assert record.key == 'abc'
+
+
+def test_ring_buffer():
+    import threading
+    from plogging.transport import RingBuffer, iter_batch
+
+    ring = RingBuffer(capacity=1024)
+    items = [bytes([i % 256]) * (i * 7) for i in range(300)]  # Some items are split into several frames
+    received = []
+
+    def consume(count):
+        while len(received) < count:
+            received.extend(iter_batch(ring.get(timeout=5)))
+
+    def produce(put):
+        for item in items:
+            put(pickle.dumps(item))
+
+    th = threading.Thread(target=consume, args=(len(items),))
+    th.start()
+    try:
+        produce(ring.put_nowait)
+    finally:
+        th.join()
+    assert received == items
+
+    # The shared ring of the forked producers is read together with the single producer ring
+    received.clear()
+    th = threading.Thread(target=consume, args=(2 * len(items),))
+    shared = threading.Thread(target=produce, args=(ring.put_shared,))
+    th.start()
+    shared.start()
+    try:
+        produce(ring.put_nowait)
+    finally:
+        shared.join()
+        th.join()
+        ring.close()
+    assert sorted(received) == sorted(items * 2)
+
+
+def test_is_parent_process_alive():
+    assert plogging.is_parent_process_alive(os.getppid())
+    if os.name != 'nt':
+        assert not plogging.is_parent_process_alive(-1)
+
+
+class FakeProcess(object):
+    """LogProcess stand in whose logging process never consumes anything."""
+    def __init__(self):
+        self.sent = []
+
+    def backlog(self):
+        return len(self.sent)
+
+    def put(self, record):
+        self.sent.append(record)
+
+    def flush(self):
+        pass
+
+    def hold(self, policy):
+        pass
+
+
+def test_overflow_policy(tmp_path):
+    records = [plogging.record.capture_record('test_overflow', level, 'msg', ())
+               for level in (plogging.INFO, plogging.INFO, plogging.ERROR)]
+
+    for policy, sent, dropped in [('drop_newest', records[:1], 2), ('level', records[:1] + records[2:], 1),
+                                  ('block', records[:1], 2), ('drop_oldest', records[:1], 1)]:
+        proc = FakeProcess()
+        overflow = plogging.OverflowPolicy(1, policy, timeout=0.01)
+        for record in records:
+            overflow.put(proc, record)
+        assert proc.sent == sent, policy
+        assert overflow.dropped == dropped, policy
+
+    # Held records are sent in order when the backlog has room
+    proc = FakeProcess()
+    overflow = plogging.OverflowPolicy(1, 'spill')
+    for record in records:
+        overflow.put(proc, record)
+    assert overflow.spilled == 2 and overflow.is_holding()
+    spill_path = overflow.spill_path
+    assert os.path.exists(spill_path)
+    proc.sent.clear()
+    assert not overflow.release(proc, force=True)
+    assert proc.sent == records[1:]
+    assert not os.path.exists(spill_path)  # The temporary file is deleted when it is drained
+
+    overflow.put(proc, records[0])
+    spill_path = overflow.spill_path
+    overflow.close()
+    assert not os.path.exists(spill_path)
+
+    # A spill file of the caller is appended to and keeps its content
+    spill_path = str(tmp_path / 'spill.pkl')
+    with open(spill_path, 'wb') as f:
+        f.write(b'kept')
+    proc = FakeProcess()
+    overflow = plogging.OverflowPolicy(1, 'spill', spill_path=spill_path)
+    for record in records:
+        overflow.put(proc, record)
+    proc.sent.clear()
+    assert not overflow.release(proc, force=True)
+    assert proc.sent == records[1:]
+    overflow.close()
+    with open(spill_path, 'rb') as f:
+        assert f.read() == b'kept'
+
+
+def test_handler_workers():
+    import logging
+    from plogging.workers import wrap_handler
+
+    class ListHandler(logging.Handler):
+        def __init__(self):
+            super().__init__()
+            self.records = []
+
+        def emit(self, record):
+            if record.msg == 'fail':
+                raise ValueError('handler failure')
+            self.records.append(record.msg)
+
+    for mode in ('thread', 'asyncio'):
+        inner = ListHandler()
+        inner.handleError = lambda record: None
+        handler = wrap_handler(inner, {'mode': mode, 'maxsize': 10})
+        for msg in ('a', 'fail', 'b'):
+            handler.handle(logging.makeLogRecord({'msg': msg, 'levelno': plogging.INFO}))
+        handler.flush()
+        assert inner.records == ['a', 'b'], mode
+        assert handler.handled == 2 and handler.errors == 1, mode
+        handler.close()
+
+
+def test_buffered_file_handler(tmp_path):
+    import logging
+    filename = str(tmp_path / 'buffered.log')
+
+    config = plogging.FileHandler(filename)
+    config.setBuffering(buffer_size=1000, flush_interval=60)
+    handler = config.create_handler()
+    try:
+        handler.handle(logging.makeLogRecord({'msg': 'buffered', 'levelno': plogging.INFO}))
+        with open(filename) as f:
+            assert f.read() == ''
+
+        handler.handle(logging.makeLogRecord({'msg': 'error', 'levelno': plogging.ERROR}))
+        with open(filename) as f:
+            assert f.read() == 'buffered\nerror\n'
+    finally:
+        handler.close()
+
+    # The size of a rotating file is counted without seeking and the flush timer stops when the handler is closed
+    filename = str(tmp_path / 'rotating.log')
+    with open(filename, 'w') as f:
+        f.write('x' * 20 + '\n')
+    config = plogging.handlers.RotatingFileHandler(filename, maxBytes=50, backupCount=2)
+    config.setBuffering(buffer_size=1000, flush_interval=60)
+    handler = config.create_handler()
+    for i in range(6):
+        handler.handle(logging.makeLogRecord({'msg': 'record %d' % i, 'levelno': plogging.INFO}))
+    timer = handler._timer
+    assert timer.is_alive()
+    handler.close()
+    timer.join(5)
+    assert not timer.is_alive()
+    with open(filename + '.1') as f:
+        assert f.read() == 'x' * 20 + '\nrecord 0\nrecord 1\nrecord 2\n'
+    with open(filename) as f:
+        assert f.read() == 'record 3\nrecord 4\nrecord 5\n'
+
+
+def test_command_dispatch():
+    logger = plogging.getLogger('test_dispatch')
+    sent = []
+    send = plogging.Logger.manager.sendCommand
+    plogging.Logger.manager.sendCommand = lambda *args: sent.append(args)
+    assert 'addFilter' in vars(plogging.Logger)  # The commands are made when the module is imported
+    try:
+        logger.addFilter('a')
+        logger.addFilter('b')
+        logger.custom_command(1, key=2)
+        assert 'custom_command' not in vars(plogging.Logger)
+    finally:
+        plogging.Logger.manager.sendCommand = send
+    assert sent == [('test_dispatch', 'addFilter', ('a',), {}), ('test_dispatch', 'addFilter', ('b',), {}),
+                    ('test_dispatch', 'custom_command', (1,), {'key': 2})]
+    assert logger.getChild('child') is plogging.getLogger('test_dispatch.child')
+
+
+def test_command_history():
+    manager = plogging.Logger.manager
+    logger = plogging.getLogger('test_history')
+    handler = plogging.StreamHandler()
+    for level in range(10):
+        logger.setLevel(level)
+    logger.addHandler(handler)
+    logger.addHandler(handler)
+    history = [command for command in manager.commands if command[0] == 'test_history']
+    assert history == [['test_history', 'setLevel', (9,), {}], ['test_history', 'addHandler', (handler,), {}]]
+
+    logger.removeHandler(handler)
+    logger.callHandlers(plogging.makeLogRecord({'msg': 'not replayed'}))
+    logger.setLevel(plogging.NOTSET)
+    history = [command for command in manager.commands if command[0] == 'test_history']
+    assert history == [['test_history', 'setLevel', (plogging.NOTSET,), {}]]
+
+
+def test_serialization_policy():
+    from plogging.transport import RecordBatcher, iter_batch
+    from plogging.record import capture_record, make_record
+
+    class Unpicklable(object):
+        def __reduce__(self):
+            raise TypeError('Cannot pickle')
+
+        def __str__(self):
+            return 'unpicklable'
+
+    policy = plogging.SerializationPolicy('oob', max_size=100)
+    assert policy.prepare('%s %s', (1, 'a')) == ('%s %s', (1, 'a'))
+    assert policy.prepare('%s', (Unpicklable(),)) == ('unpicklable', ())
+    assert policy.prepare('%(a)s', ({'a': list(range(100))},)) == (str(list(range(100))), ())
+    msg, args = policy.prepare('%r %r', (b'x' * 1000, bytearray(200)))
+    assert msg == '%r %r'
+    assert (policy.shipped, policy.formatted, policy.out_of_band) == (1, 2, 1)
+
+    batches = []
+    batcher = RecordBatcher(batches.append)
+    batcher.add(['name', 'info', args, {}])
+    batcher.add(['name', 'info', (1,), {}])
+    batcher.flush()
+    commands = list(iter_batch(batches[0]))
+    assert commands[0][2] == (b'x' * 1000, bytearray(200))
+    assert type(commands[0][2][1]) is bytearray
+    assert commands[1] == ['name', 'info', (1,), {}]
+
+    # Other args are pickled once and the pickle is sent. Large bytes are formatted.
+    policy = plogging.SerializationPolicy('format', max_size=100)
+    msg, args = policy.prepare('%s %r', ('a', [1, 2]))
+    assert type(args) is bytes
+    assert make_record(capture_record('name', plogging.INFO, msg, args)).getMessage() == 'a [1, 2]'
+    assert policy.prepare('%r', (b'x' * 100,)) == ("b'" + 'x' * 100 + "'", ())
+    assert (policy.shipped, policy.formatted) == (1, 1)
+
+    logger = plogging.getLogger('test_serialization')
+    logger.setSerializationPolicy('format')
+    assert plogging.getLogger('test_serialization.child').getSerializationPolicy() is logger.serialization
+    logger.setSerializationPolicy(None)
+    assert logger.getSerializationPolicy() is None
+
+
+def test_log_data(tmp_path):
+    from plogging.transport import RecordBatcher, iter_batch
+    from plogging.sinks import BinaryFileHandler, iter_data_file, DATA_FRAME
+
+    async def log_in_tick():
+        buffer = bytearray(b'abc')
+        logger.log_data('tick', buffer)
+        buffer[:] = b'wxyz'  # A bytearray cannot be resized while a view of it is alive
+
+    logger = plogging.getLogger('test_log_data')
+    logger.setLevel(plogging.INFO)
+    records = []
+    logger.process.put = records.append  # Keep the records in this process
+    try:
+        logger.log_data('samples', bytearray(b'abc'))
+        logger.log_data('strided', memoryview(b'abcdef')[::2])
+
+        # A record that waits for the end of the tick keeps a copy of the data
+        logger.setAsyncMode()
+        asyncio.run(log_in_tick())
+        assert plogging.aio.SENDER.flush(timeout=10)
+    finally:
+        logger.setAsyncMode(None)
+        del logger.process.put
+    assert pickle.loads(pickle.dumps(records.pop()))[14]['data'] == b'abc'
+
+    # So does a record that an overflow policy holds
+    buffer = bytearray(b'abc')
+    proc = FakeProcess()
+    proc.sent.append(None)  # The backlog is full
+    overflow = plogging.OverflowPolicy(1, 'drop_oldest')
+    overflow.put(proc, plogging.record.capture_record('test_log_data', plogging.INFO, 'data', (), None,
+                                                      {'data': plogging.serialize.OutOfBand(memoryview(buffer))}))
+    buffer[:] = b'wxyz'
+    assert not overflow.release(proc, force=True)
+    assert pickle.loads(pickle.dumps(proc.sent[-1]))[14]['data'] == b'abc'
+
+    batches = []
+    batcher = RecordBatcher(batches.append)
+    for record in records:
+        batcher.add(record)
+    batcher.flush()
+    received = [plogging.record.make_record(compact) for compact in iter_batch(batches[0])]
+    assert received[0].getMessage() == 'data samples (3 bytes)'
+    assert received[0].data == b'abc' and type(received[0].data) is bytes
+    assert received[1].data_name == 'strided' and received[1].data == b'ace'
+    assert pickle.loads(pickle.dumps(received[0].__dict__))['data'] == b'abc'  # SocketHandler pickles the record
+
+    filename = str(tmp_path / 'data.bin')
+    handler = BinaryFileHandler(filename)
+    for record in received:
+        handler.handle(record)
+    handler.handle(plogging.LogRecord('test', plogging.INFO, __file__, 1, 'text', (), None))  # Ignored
+    handler.close()
+    with open(filename, 'ab') as f:
+        f.write(DATA_FRAME.pack(0, 1, 100) + b'x')  # Truncated frame
+    frames = list(iter_data_file(filename))
+    assert [frame[1:] for frame in frames] == [('samples', b'abc'), ('strided', b'ace')]
+    assert frames[0][0] == received[0].created
+
+
+def test_segment_file_handler(tmp_path):
+    from plogging.sinks import SegmentFileHandler, list_segments, read_segment
+    from plogging.recover import recover, iter_records
+
+    filename = str(tmp_path / 'app.log')
+    handler = SegmentFileHandler(filename, segment_size=128, backupCount=2)
+    for i in range(30):
+        handler.handle(plogging.LogRecord('test', plogging.INFO, __file__, 1, 'record %d', (i,), None))
+
+    # Read the open segment like after a crash
+    segments = list_segments(filename)
+    assert [index for index, _ in segments] == [6, 7, 8]  # backupCount removed the oldest segments
+    info = read_segment(segments[-1][1])
+    assert not info['closed'] and info['records'][-1] == b'record 29\n'
+    assert os.path.getsize(segments[-1][1]) == 128
+
+    # The open segment is not repaired while the handler has it mapped
+    infos = recover(filename, repair=True)
+    assert infos[-1]['active'] and not infos[-1]['closed']
+    assert os.path.getsize(segments[-1][1]) == 128
+
+    # A copy of the open segment is a segment of a crashed writer
+    crashed = '%s.%06d' % (filename, 9)
+    shutil.copyfile(segments[-1][1], crashed)
+    handler.close()
+
+    infos = recover(filename, repair=True)
+    assert all(info['closed'] and not info['active'] for info in infos)
+    assert os.path.getsize(crashed) == infos[-1]['committed']
+    records = list(iter_records(filename))
+    assert records[-1] == 'record 29\n'
+    os.remove(crashed)
+    records = list(iter_records(filename))
+    assert [int(r.split()[1]) for r in records] == list(range(30 - len(records), 30))
+
+
+def test_compressed_file_handler(tmp_path):
+    import gzip
+    from plogging.sinks import CompressedRotatingFileHandler, RotationCompressor, read_compressed
+
+    def make_record(i):
+        return plogging.LogRecord('test', plogging.INFO, __file__, 1, 'record %d', (i,), None)
+
+    filename = str(tmp_path / 'app.log.gz')
+    handler = CompressedRotatingFileHandler(filename, maxBytes=1000, backupCount=5)
+    handler.setBuffering(buffer_size=500)
+    for i in range(1000):
+        handler.handle(make_record(i))
+    handler.flush()
+    assert handler._size == os.path.getsize(filename)  # The compressed size is counted, not read
+    handler.close()
+    assert os.path.exists(filename + '.1') and os.path.getsize(filename + '.1') >= 1000
+    handler = CompressedRotatingFileHandler(filename, maxBytes=1000, backupCount=5)
+    assert handler._size == os.path.getsize(filename)
+    handler.close()
+    lines = gzip.open(filename).read().decode().splitlines()
+    assert lines[-1] == 'record 999'
+    assert read_compressed(filename).decode().splitlines() == lines
+
+    with open(filename, 'rb') as f:
+        data = f.read()
+    with open(filename, 'wb') as f:
+        f.write(data[:-10])  # Crash while writing the last frame
+    assert read_compressed(filename).decode().splitlines()[0] == lines[0]
+
+    filename = str(tmp_path / 'plain.log')
+    config = plogging.handlers.RotatingFileHandler(filename, maxBytes=1000, backupCount=2)
+    config.setCompression('gzip', on_rotate=True)
+    handler = config.create_handler()
+    assert isinstance(handler.rotator, RotationCompressor)
+    for i in range(200):
+        handler.handle(make_record(i))
+    handler.rotator.wait()
+    handler.close()
+    with open(filename) as f:
+        first = int(f.readline().split()[1])
+    assert read_compressed(filename + '.1.gz').decode().splitlines()[-1] == 'record %d' % (first - 1)
+    assert not os.path.exists(filename + '.1')
+
+
+def test_rotation_compressor_overlap(tmp_path):
+    import logging.handlers
+    from plogging.sinks import RotationCompressor, read_compressed
+
+    class SlowCompressor(RotationCompressor):
+        def compress_file(self, source, dest):
+            time.sleep(0.3)
+            super().compress_file(source, dest)
+
+    filename = str(tmp_path / 'app.log')
+    handler = logging.handlers.RotatingFileHandler(filename, maxBytes=1, backupCount=3)
+    handler.rotator = compressor = SlowCompressor('gzip')
+    handler.namer = compressor.namer
+    for i in range(3):  # The second rotation starts while the first one is compressed
+        handler.handle(plogging.LogRecord('test', plogging.INFO, __file__, 1, 'record %d', (i,), None))
+    compressor.wait()
+    handler.close()
+    assert read_compressed(filename + '.2.gz') == b'record 0\n'
+    assert read_compressed(filename + '.1.gz') == b'record 1\n'
+    assert not [name for name in os.listdir(str(tmp_path)) if name.endswith(('.part', '.rotated'))]
+
+
+def test_formatters():
+    import json
+    import logging
+
+    record = logging.LogRecord('test', plogging.INFO, __file__, 10, 'hello %s', ('world',), None)
+    record.user = 'me'
+    for fmt, style in [(plogging.STANDARD_FMT['format'], '%'), ('%(levelname)-8s %(lineno)04d %%(x) %(message)s', '%'),
+                       ('{asctime} {message}', '{')]:
+        formatter = plogging.FastFormatter(fmt, plogging.STANDARD_FMT['datefmt'], style)
+        expected = logging.Formatter(fmt, plogging.STANDARD_FMT['datefmt'], style).format(record)
+        assert formatter.format(record) == expected
+        assert pickle.loads(pickle.dumps(formatter)).format(record) == expected
+    assert plogging.FastFormatter('%(asctime)s').format(record) == logging.Formatter('%(asctime)s').format(record)
+
+    formatter = pickle.loads(pickle.dumps(plogging.JsonFormatter(fields=('levelname', 'message'))))
+    assert json.loads(formatter.format(record)) == {'levelname': 'INFO', 'message': 'hello world', 'user': 'me'}
+
+
+class SleepFormatter(object):
+    def format(self, record):
+        time.sleep(0.2)
+        return record.getMessage()
+
+
+def test_graceful_shutdown(tmp_path):
+    filename = str(tmp_path / 'shutdown.log')
+    proc = plogging.pinLogger('test_shutdown')
+    logger = plogging.getLogger('test_shutdown')
+    logger.setLevel(plogging.INFO)
+    logger.addHandler(plogging.FileHandler(filename))
+    for i in range(5000):
+        logger.info('record %d', i)
+    report = proc.stop()
+    assert report == {'sent': 5000, 'flushed': report['flushed'], 'abandoned': 0, 'terminated': False}
+    with open(filename) as f:
+        assert len(f.readlines()) == 5000
+
+    handler = plogging.StreamHandler()
+    handler.setFormatter(SleepFormatter())
+    logger.addHandler(handler)
+    for i in range(20):
+        logger.info('slow %d', i)
+    report = proc.stop(timeout=0.5)
+    assert report['terminated'] and report['abandoned'] > 0
+    assert report['sent'] == report['flushed'] + report['abandoned'] == 20
+    plogging.unpinLogger('test_shutdown')
+
+
+def test_flush_barrier(tmp_path):
+    filename = str(tmp_path / 'barrier.log')
+    proc = plogging.pinLogger('test_barrier')
+    logger = plogging.getLogger('test_barrier')
+    logger.setLevel(plogging.INFO)
+    logger.addHandler(plogging.FileHandler(filename))
+    for i in range(1000):
+        logger.info('record %d', i)
+    assert logger.flush(timeout=10)
+    with open(filename) as f:
+        assert len(f.readlines()) == 1000
+    assert proc.is_running()
+
+    logger.info('async')
+    assert asyncio.run(logger.flush_async(timeout=10))
+    with open(filename) as f:
+        assert len(f.readlines()) == 1001
+    plogging.unpinLogger('test_barrier')
+
+
+def test_health_stats():
+    unhealthy = []
+    plogging.setHealthCallback(lambda proc, handler: unhealthy.append(handler['name']), unhealthyAfter=0)
+    proc = plogging.pinLogger('test_health')
+    proc.liveness_interval = 0.05
+    logger = plogging.getLogger('test_health')
+    logger.setLevel(plogging.INFO)
+    logger.addHandler(plogging.FileHandler('/nonexistent/dir/test_health.log'))
+    syslog = plogging.handlers.SysLogHandler(socktype=None)
+    syslog.set_name('syslog')
+    logger.addHandler(syslog)
+
+    for i in range(10):
+        logger.info('record %d', i)
+    assert logger.flush(timeout=10)
+    time.sleep(0.3)
+    stats = logger.stats()
+    plogging.setHealthCallback(None)
+    plogging.unpinLogger('test_health')
+
+    assert stats['sent'] == 11 and stats['backlog'] == 0 and stats['processed'] == 11
+    assert stats['rss'] is None or stats['rss'] > 0
+    assert stats['errors'][0]['command'] == 'addHandler' and 'FileNotFoundError' in stats['errors'][0]['error']
+    handlers = {handler['name']: handler for handler in stats['handlers']}
+    assert handlers['FileHandler']['failing_since'] is not None
+    assert handlers['syslog']['emitted'] == 10
+    assert unhealthy == ['FileHandler']
+
+
+def test_restart_crashed_process(tmp_path):
+    filename = str(tmp_path / 'restart.log')
+    proc = plogging.pinLogger('test_restart')
+    logger = plogging.getLogger('test_restart')
+    logger.setLevel(plogging.INFO)
+    handler = plogging.FileHandler(filename)
+    handler.setFormatter(plogging.Formatter('%(name)s %(message)s'))
+    logger.addHandler(handler)
+    logger.info('before')
+    assert logger.flush(timeout=10)
+
+    pid = proc.process.pid
+    os.kill(pid, signal.SIGKILL)
+    proc.process.join()
+    for i in range(10):
+        logger.info('after %d', i)
+    deadline = time.monotonic() + 10
+    while proc.restarts == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert proc.restarts == 1 and proc.process.pid != pid
+    assert logger.flush(timeout=10)
+    plogging.unpinLogger('test_restart')
+
+    with open(filename) as f:
+        lines = f.read().splitlines()
+    # The records that were flushed to the killed process before the restart are lost and counted
+    assert lines[0] == 'test_restart before'
+    assert proc.lost <= 10
+    assert lines[1:-1] == ['test_restart after %d' % i for i in range(proc.lost, 10)]
+    assert lines[-1].startswith('plogging Logging process plogging-test_restart exited with code -9')
+
+
+def test_fork_attach(tmp_path):
+    for transport, options in [('queue', {}), ('ring', {'capacity': 4096})]:  # The children fill the small ring
+        filename = str(tmp_path / ('fork_%s.log' % transport))
+        child_filename = str(tmp_path / ('child_%s.log' % transport))
+        name = 'test_fork_' + transport
+        proc = plogging.pinLogger(name, transport, **options)
+        logger = plogging.getLogger(name)
+        logger.setLevel(plogging.INFO)
+        handler = plogging.FileHandler(filename)
+        handler.setFormatter(plogging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+        plogging.startProcesses()
+        assert proc.is_running()
+
+        pids = []
+        for n in range(3):
+            pid = os.fork()
+            if pid == 0:
+                code = 1
+                try:
+                    logger.addHandler(plogging.FileHandler(child_filename))  # Not sent to the process of the parent
+                    for i in range(100):
+                        logger.info('child %d %d', n, i)
+                    if logger.flush(timeout=10) and proc.process is None and proc._attached is not None:
+                        code = 0
+                finally:
+                    os._exit(code)
+            pids.append(pid)
+        for pid in pids:
+            assert os.waitpid(pid, 0)[1] == 0
+        assert logger.flush(timeout=10)
+        plogging.unpinLogger(name)
+
+        with open(filename) as f:
+            lines = f.read().splitlines()
+        assert sorted(lines) == sorted('child %d %d' % (n, i) for n in range(3) for i in range(100))
+        assert not os.path.exists(child_filename)
+
+
+def test_collector(tmp_path):
+    filename = str(tmp_path / 'collector.log')
+    address = str(tmp_path / 'collector.sock')
+    proc = plogging.pinLogger('test_collector')
+    logger = plogging.getLogger('test_collector')
+    logger.setLevel(plogging.INFO)
+    handler = plogging.FileHandler(filename)
+    handler.setFormatter(plogging.Formatter('%(message)s'))
+    logger.addHandler(handler)
+    proc.serve(address)
+    assert os.path.exists(address)
+
+    pids = []
+    for n in range(3):
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                plogging.connect(address)
+                # Configuration commands of a connected process are not run by the collector
+                logger.addHandler(plogging.FileHandler(str(tmp_path / 'ignored.log')))
+                for i in range(200):
+                    logger.info('producer %d %d', n, i)
+                if logger.flush(timeout=10) and logger.process.connect_address == address:
+                    code = 0
+            finally:
+                os._exit(code)
+        pids.append(pid)
+    for pid in pids:
+        assert os.waitpid(pid, 0)[1] == 0
+    assert logger.flush(timeout=10)
+    plogging.unpinLogger('test_collector')
+    assert not os.path.exists(address)
+    assert not os.path.exists(str(tmp_path / 'ignored.log'))
+
+    with open(filename) as f:
+        lines = f.read().splitlines()
+    assert len(lines) == 600
+    for n in range(3):
+        assert [line for line in lines if line.startswith('producer %d ' % n)] == \
+            ['producer %d %d' % (n, i) for i in range(200)]
+
+
+def test_async_mode(tmp_path):
+    filename = str(tmp_path / 'async.log')
+    logger = plogging.getLogger('test_async')
+    logger.setLevel(plogging.INFO)
+    logger.setAsyncMode()
+    handler = plogging.FileHandler(filename)
+    handler.setFormatter(plogging.Formatter('%(message)s %(funcName)s'))
+    logger.addHandler(handler)
+    assert plogging.getLogger('test_async.child').getAsyncMode()
+
+    async def produce(n):
+        for i in range(100):
+            logger.info('task %d %d', n, i)
+            await asyncio.sleep(0)
+
+    async def main():
+        sent = plogging.aio.SENDER.sent
+        await asyncio.gather(*(produce(n) for n in range(3)))
+        assert await logger.flush_async(timeout=10)
+        assert plogging.aio.SENDER.sent - sent == 300
+
+        # flush_async sends the records of the tick, so the end of the tick does not send them again
+        logger.info('flushed in the tick')
+        assert await logger.flush_async(timeout=10)
+        await asyncio.sleep(0.05)
+        assert await logger.flush_async(timeout=10)
+        assert plogging.aio.SENDER.sent - sent == 301
+        logger.info('last')
+        return await logger.aclose(timeout=10)
+
+    report = asyncio.run(main())
+    assert report['abandoned'] == 0 and not report['terminated']
+    logger.info('outside of a loop')
+    assert logger.flush(timeout=10)
+
+    with open(filename) as f:
+        lines = f.read().splitlines()
+    assert lines[-2:] == ['last main', 'outside of a loop test_async_mode']
+    assert lines.count('flushed in the tick main') == 1
+    for n in range(3):
+        assert [line for line in lines if line.startswith('task %d ' % n)] == \
+            ['task %d %d produce' % (n, i) for i in range(100)]
+
+
+def test_configure_handler(tmp_path):
+    filename = str(tmp_path / 'configure.log')
+    plogging.pinLogger('test_configure')
+    logger = plogging.getLogger('test_configure')
+    logger.setLevel(plogging.DEBUG)
+    handler = plogging.FileHandler(filename)
+    handler.set_name('test_configure_file')
+    handler.setLevel(plogging.INFO)
+    handler.setFormatter(plogging.Formatter('first %(message)s'))
+    logger.addHandler(handler)
+    logger.debug('hidden')
+    logger.info('one')
+    assert logger.flush(timeout=10)
+    inode = os.stat(filename).st_ino
+
+    plogging.configureHandler('test_configure_file', level=plogging.DEBUG,
+                              formatter=plogging.Formatter('second %(levelname)s %(message)s'))
+    assert handler.level == plogging.DEBUG
+    logger.debug('two')
+    assert logger.flush(timeout=10)
+    try:
+        plogging.configureHandler('test_configure_file', filename=filename + '.new')
+        raise AssertionError('The filename cannot be changed in place')
+    except ValueError:
+        pass
+    try:
+        plogging.configureHandler('missing', level=plogging.INFO)
+        raise AssertionError('The handler does not exist')
+    except ValueError:
+        pass
+
+    # Every handler that was created from the configuration is changed
+    created = [handler.create_handler() for _ in range(2)]
+    plogging.handlers.configure_handler('test_configure_file', {'level': plogging.ERROR})
+    assert [h.level for h in created] == [plogging.ERROR, plogging.ERROR]
+    for h in created:
+        h.close()
+
+    # A restarted process creates the handler with the changed settings
+    logger.process.stop()
+    logger.debug('three')
+    assert logger.flush(timeout=10)
+    plogging.unpinLogger('test_configure')
+
+    assert os.stat(filename).st_ino == inode
+    with open(filename) as f:
+        assert f.read().splitlines() == ['first one', 'second DEBUG two', 'second DEBUG three']
+    assert plogging.handlers.get_handler_type('FileHandler').args == ('filename', 'mode', 'encoding', 'delay')
+
+
+def test_rate_limit(tmp_path):
+    filename = str(tmp_path / 'rate_limit.log')
+    logger = plogging.getLogger('test_rate_limit')
+    logger.setLevel(plogging.DEBUG)
+    handler = plogging.FileHandler(filename)
+    handler.setFormatter(plogging.Formatter('%(levelname)s %(message)s'))
+    logger.addHandler(handler)
+
+    # First N of every template. Other templates and levels at or above level are not limited.
+    policy = plogging.RateLimitPolicy('first', rate=3, interval=60, level=plogging.ERROR, summary=False)
+    logger.setRateLimit(policy)
+    assert plogging.getLogger('test_rate_limit.child').getRateLimit() is policy
+    for i in range(10):
+        logger.info('hot %d', i)
+        logger.error('error %d', i)
+    logger.info('cold')
+    assert policy.allowed == 4
+    assert policy.suppressed == 7
+    assert policy.summarize() == 1
+    assert policy.summarize() == 0
+
+    ratio = plogging.RateLimitPolicy('ratio', ratio=0.25, summary=False)
+    assert [ratio.allow(logger, plogging.INFO, 'ratio') for _ in range(8)].count(True) == 2
+    bucket = plogging.RateLimitPolicy('token_bucket', rate=0.001, burst=2, summary=False)
+    assert [bucket.allow(logger, plogging.INFO, 'bucket') for _ in range(5)].count(True) == 2
+    try:
+        plogging.RateLimitPolicy('missing')
+        raise AssertionError('The mode does not exist')
+    except ValueError:
+        pass
+
+    # The suppressed records are summarized before the counts of too many templates start over
+    limited = plogging.RateLimitPolicy('first', rate=1, interval=60, max_templates=1)
+    logger.setRateLimit(limited)
+    for i in range(3):
+        logger.info('full %d', i)
+    logger.info('new template')
+    assert limited.summaries == 1
+
+    logger.setRateLimit(None)
+    logger.info('hot %d', 10)
+    assert logger.flush(timeout=10)
+
+    with open(filename) as f:
+        lines = f.read().splitlines()
+    assert lines[:3] == ['INFO hot 0', 'ERROR error 0', 'INFO hot 1']
+    assert len([line for line in lines if line.startswith('ERROR error')]) == 10
+    assert lines[-6] == 'INFO cold'
+    assert lines[-5].startswith("INFO Suppressed 7 records like 'hot %d' in the last")
+    assert lines[-4] == 'INFO full 0'
+    assert lines[-3].startswith("INFO Suppressed 2 records like 'full %d' in the last")
+    assert lines[-2:] == ['INFO new template', 'INFO hot 10']
+
+
 if __name__ == '__main__':
+    import pathlib
+    import tempfile
+
     test_getLogger()
     test_basicConfig()
     test_print_logging()
     test_configs()
+    test_shared_process()
+    test_record_batcher()
+    test_level_short_circuit()
+    test_capture_record()
+    test_ring_buffer()
+    test_is_parent_process_alive()
+    test_overflow_policy(pathlib.Path(tempfile.mkdtemp()))
+    test_handler_workers()
+    test_buffered_file_handler(pathlib.Path(tempfile.mkdtemp()))
+    test_command_dispatch()
+    test_command_history()
+    test_serialization_policy()
+    test_log_data(pathlib.Path(tempfile.mkdtemp()))
+    test_segment_file_handler(pathlib.Path(tempfile.mkdtemp()))
+    test_compressed_file_handler(pathlib.Path(tempfile.mkdtemp()))
+    test_rotation_compressor_overlap(pathlib.Path(tempfile.mkdtemp()))
+    test_formatters()
+    test_graceful_shutdown(pathlib.Path(tempfile.mkdtemp()))
+    test_flush_barrier(pathlib.Path(tempfile.mkdtemp()))
+    test_health_stats()
+    test_restart_crashed_process(pathlib.Path(tempfile.mkdtemp()))
+    test_fork_attach(pathlib.Path(tempfile.mkdtemp()))
+    test_collector(pathlib.Path(tempfile.mkdtemp()))
+    test_async_mode(pathlib.Path(tempfile.mkdtemp()))
+    test_configure_handler(pathlib.Path(tempfile.mkdtemp()))
+    test_rate_limit(pathlib.Path(tempfile.mkdtemp()))